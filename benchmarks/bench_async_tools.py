@@ -0,0 +1,106 @@
+# benchmarks/bench_async_tools.py
+"""
+Concurrent tool-call throughput: blocking vs async-native pipeline path.
+
+"blocking" reproduces the old behaviour (sync helpers called from inside
+`async def` tools); "async" uses the *_async helpers that main.py now
+awaits. A heartbeat task measures how long the event loop was stalled.
+
+Needs real credentials (.env) because it talks to Tavily / OpenAI / Mongo:
+
+    python benchmarks/bench_async_tools.py --concurrency 8 --scenario research
+    python benchmarks/bench_async_tools.py --concurrency 8 --scenario search
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Measure network latency, not the response cache
+os.environ.setdefault("TAVILY_CACHE_DISABLED", "1")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.db import search_similar_strategies, search_similar_strategies_async
+from src.research_tools import (
+    _research_competitors_core,
+    _research_pains_core,
+    _research_trends_core,
+    build_research_bundle_async,
+)
+
+
+async def _research_blocking(i: int):
+    # Old tool body: three sequential sync Tavily calls inside an async tool
+    product = f"AI onboarding assistant variant {i}"
+    users = "product managers at B2B SaaS companies"
+    _research_pains_core(product, users)
+    _research_competitors_core(product, users)
+    _research_trends_core(product, users)
+
+
+async def _research_async(i: int):
+    await build_research_bundle_async(
+        product_name=f"AI onboarding assistant variant {i}",
+        target_users="product managers at B2B SaaS companies",
+        goal="increase activation",
+    )
+
+
+async def _search_blocking(i: int):
+    search_similar_strategies(f"onboarding strategy #{i}", 3)
+
+
+async def _search_async(i: int):
+    await search_similar_strategies_async(f"onboarding strategy #{i}", 3)
+
+
+SCENARIOS = {
+    "research": (_research_blocking, _research_async),
+    "search": (_search_blocking, _search_async),
+}
+
+
+async def _heartbeat(stop: asyncio.Event, interval: float, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def _run(fn, concurrency: int):
+    stop = asyncio.Event()
+    lags: list = []
+    beat = asyncio.create_task(_heartbeat(stop, 0.01, lags))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(fn(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await beat
+    return elapsed, max(lags) if lags else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="research")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    blocking, non_blocking = SCENARIOS[args.scenario]
+    print(f"scenario={args.scenario} concurrency={args.concurrency}")
+    for label, fn in (("blocking", blocking), ("async", non_blocking)):
+        elapsed, max_lag = asyncio.run(_run(fn, args.concurrency))
+        print(
+            f"{label:>9}: {elapsed:7.2f}s total · "
+            f"{args.concurrency / elapsed:6.2f} calls/s · "
+            f"max loop stall {max_lag * 1000:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_embedding_batcher.py
+"""
+Embeds/sec at several concurrency levels, with and without micro-batching.
+
+By default the embeddings endpoint is simulated (fixed per-call latency,
+a small per-input cost, and a cap on concurrent requests standing in for
+rate limits) so the batching mechanics can be measured without spending
+quota. Pass --live to hit the real OpenAI endpoint.
+
+    python benchmarks/bench_embedding_batcher.py
+    python benchmarks/bench_embedding_batcher.py --live --levels 1,8,32
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.embeddings import EmbeddingBatcher, _openai_embed
+
+
+def _simulated_embed(call_latency: float, per_input: float, max_parallel: int):
+    slots = threading.Semaphore(max_parallel)
+
+    def embed(model, texts, dimensions):
+        with slots:
+            time.sleep(call_latency + per_input * len(texts))
+        return [[0.0] * 8 for _ in texts]
+
+    return embed
+
+
+def _run(embed_one, concurrency: int, requests_per_worker: int) -> float:
+    def worker(w: int):
+        for i in range(requests_per_worker):
+            embed_one(f"worker {w} request {i}")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return concurrency * requests_per_worker / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--live", action="store_true")
+    parser.add_argument("--model", default="text-embedding-3-small")
+    parser.add_argument("--levels", default="1,4,16,64")
+    parser.add_argument("--requests", type=int, default=10, help="requests per worker")
+    parser.add_argument("--latency-ms", type=float, default=120.0)
+    parser.add_argument("--max-parallel", type=int, default=4, help="simulated request cap")
+    parser.add_argument("--window-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    if args.live:
+        embed_fn = _openai_embed
+    else:
+        embed_fn = _simulated_embed(args.latency_ms / 1000, 0.0002, args.max_parallel)
+    batcher = EmbeddingBatcher(embed_fn, window_ms=args.window_ms)
+
+    def direct(text):
+        embed_fn(args.model, [text], None)
+
+    def batched(text):
+        batcher.submit(args.model, [text]).result()
+
+    print(f"{'concurrency':>11} {'direct/s':>10} {'batched/s':>10} {'speedup':>8}")
+    for level in (int(x) for x in args.levels.split(",")):
+        d = _run(direct, level, args.requests)
+        b = _run(batched, level, args.requests)
+        print(f"{level:>11} {d:>10.1f} {b:>10.1f} {b / d:>7.2f}x")
+
+    print("batcher:", batcher.stats())
+
+
+if __name__ == "__main__":
+    main()
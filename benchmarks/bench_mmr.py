@@ -0,0 +1,122 @@
+# benchmarks/bench_mmr.py
+"""
+Cost and effect of MMR re-ranking (src/mmr.py) on a synthetic corpus of
+regenerated strategies: a few "ideas", each saved as several near-copies,
+which is what crowds the plain top-k on the Memory Search page.
+
+- latency: `mmr()` alone for candidate pools of top_k * factor, plus
+  the decode of the candidates' stored vectors (what db.py adds on
+  Atlas), median over repeats
+- payload: extra bytes per candidate when the vector search also
+  projects the vectors (arrays are cut to MMR_VECTOR_DIMS server-side)
+- prefix: how often MMR on the leading MMR_VECTOR_DIMS dimensions picks
+  the same ideas as on full vectors (which copy of an idea wins is
+  arbitrary) (variance decays along the
+  dimensions, as in bench_quantization.py)
+- effect: per lambda, distinct ideas in the top-k, mean pairwise cosine
+  of the top-k, and mean query cosine (relevance kept)
+
+No keys needed:
+
+    python benchmarks/bench_mmr.py
+    python benchmarks/bench_mmr.py --dim 1024 --top-k 10 --factor 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import bson
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.mmr import MMR_VECTOR_DIMS, mmr, mmr_prefix
+from src.quantization import from_bson_vector, normalize, to_bson_vector, to_float32_blob
+
+
+def _corpus(rng, ideas: int, copies: int, dim: int):
+    decay = 1.0 / np.sqrt(1.0 + np.arange(dim) / 64.0)
+    centers = normalize(rng.standard_normal((ideas, dim)) * decay)
+    noise = rng.standard_normal((ideas * copies, dim)) * decay
+    docs = np.repeat(centers, copies, axis=0) + 0.15 * normalize(noise)
+    return normalize(docs), np.repeat(np.arange(ideas), copies)
+
+
+def _median_ms(fn, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ideas", type=int, default=40)
+    parser.add_argument("--copies", type=int, default=6, help="near-identical saves per idea")
+    parser.add_argument("--dim", type=int, default=3072)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--factor", type=int, default=4, help="MMR_CANDIDATE_FACTOR")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    docs, idea_of = _corpus(rng, args.ideas, args.copies, args.dim)
+    pool = args.top_k * args.factor
+    print(f"{len(docs)} docs ({args.ideas} ideas x {args.copies} copies), {args.dim} dims, "
+          f"top-k {args.top_k}, candidates {pool}")
+
+    print(f"\n{'candidates':>10} {'mmr ms':>8} {'+ decode float32 ms':>20}")
+    for n in sorted({pool, 20, 40, 100, 200}):
+        scores = rng.random(n)
+        vectors = docs[:n]
+        blobs = [to_float32_blob(v) for v in vectors]
+        mmr_ms = _median_ms(lambda: mmr(scores, vectors, args.top_k, 0.7), args.repeats)
+        decode_ms = _median_ms(
+            lambda: mmr(scores, np.stack([np.frombuffer(b, np.float32) for b in blobs]), args.top_k, 0.7),
+            args.repeats,
+        )
+        print(f"{n:>10} {mmr_ms:>8.3f} {decode_ms:>20.3f}")
+
+    vec = docs[0]
+    print("\nextra response bytes per candidate with vectors projected:")
+    layouts = [(storage, to_bson_vector(vec, storage)) for storage in ("array", "float32", "int8")]
+    if MMR_VECTOR_DIMS:
+        layouts.insert(1, (f"array[:{MMR_VECTOR_DIMS}]", to_bson_vector(vec[:MMR_VECTOR_DIMS], "array")))
+    for name, stored in layouts:
+        size = len(bson.encode({"vector": stored}))
+        print(f"  {name:<11} {size / 1024:8.1f} KB  (x{pool} = {size * pool / 1024:,.0f} KB)")
+    int8 = from_bson_vector(to_bson_vector(vec, "int8"))
+    print(f"  int8 decoded vs float cosine: {float(normalize(int8) @ vec):.4f}")
+
+    # Queries sit near one idea, leaning toward a second one
+    anchors = rng.integers(0, args.ideas, (args.queries, 2))
+    print(f"\n{'lambda':>6} {'distinct ideas':>15} {'pairwise cos':>13} {'query cos':>10} {'prefix same':>12}")
+    for lam in (1.0, 0.9, 0.7, 0.5, 0.3):
+        distinct, pairwise, relevance, same = [], [], [], []
+        for a, b in anchors:
+            query = normalize(docs[a * args.copies] + 0.5 * docs[b * args.copies])
+            sims = docs @ query
+            candidates = np.argsort(-sims)[:pool]
+            picked = candidates[mmr(sims[candidates], docs[candidates], args.top_k, lam)]
+            prefix = np.stack([mmr_prefix(v) for v in docs[candidates]])
+            prefix_picked = candidates[mmr(sims[candidates], prefix, args.top_k, lam)]
+            same.append(sorted(idea_of[prefix_picked]) == sorted(idea_of[picked]))
+            top = docs[picked]
+            gram = top @ top.T
+            distinct.append(len(set(idea_of[picked])))
+            pairwise.append(gram[np.triu_indices(len(top), 1)].mean())
+            relevance.append(sims[picked].mean())
+        print(
+            f"{lam:>6.1f} {np.mean(distinct):>15.2f} {np.mean(pairwise):>13.3f} "
+            f"{np.mean(relevance):>10.3f} {np.mean(same):>12.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
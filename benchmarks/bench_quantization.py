@@ -0,0 +1,112 @@
+# benchmarks/bench_quantization.py
+"""
+Recall@k vs bytes-per-document for shortened and quantized strategy
+vectors, on a synthetic corpus.
+
+The corpus mimics Matryoshka embeddings: clustered unit vectors whose
+variance decays along the dimension axis, so a prefix keeps most of the
+signal. Ground truth is exact cosine on the full float vectors. Each
+operating point searches the compressed vectors, then optionally rescores
+the top `k * factor` candidates with the float32 copy (what
+STRATEGY_RESCORE_FACTOR does in db.py).
+
+    python benchmarks/bench_quantization.py
+    python benchmarks/bench_quantization.py --docs 50000 --dims 3072,1024,256
+"""
+import argparse
+import os
+import sys
+
+import bson
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.quantization import (
+    normalize,
+    quantize_binary,
+    quantize_int8,
+    shorten,
+    to_bson_vector,
+    to_float32_blob,
+)
+
+
+def _corpus(n_docs: int, n_queries: int, dim: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    decay = 1.0 / np.sqrt(1.0 + np.arange(dim) / 64.0)
+    centers = rng.standard_normal((max(8, n_docs // 50), dim)) * decay
+    labels = rng.integers(0, centers.shape[0], n_docs)
+    docs = normalize(centers[labels] + 0.5 * rng.standard_normal((n_docs, dim)) * decay)
+    picks = rng.integers(0, n_docs, n_queries)
+    queries = normalize(docs[picks] + 0.2 * rng.standard_normal((n_queries, dim)) * decay)
+    return docs.astype(np.float32), queries.astype(np.float32)
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, idx, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(idx, order, axis=1)
+
+
+def _compressed_scores(docs: np.ndarray, queries: np.ndarray, storage: str) -> np.ndarray:
+    if storage in ("array", "float32"):
+        return queries @ docs.T
+    if storage == "int8":
+        # Cosine over the int8 codes, as the Atlas index computes it
+        return normalize(quantize_int8(queries)) @ normalize(quantize_int8(docs)).T
+    # binary: Hamming similarity via +/-1 dot product
+    q = np.unpackbits(quantize_binary(queries), axis=1).astype(np.float32) * 2 - 1
+    d = np.unpackbits(quantize_binary(docs), axis=1).astype(np.float32) * 2 - 1
+    return q @ d.T
+
+
+def _doc_bytes(vector: np.ndarray, storage: str, rescored: bool) -> int:
+    doc = {"vector": to_bson_vector(vector, storage)}
+    if rescored:
+        doc["vector_full"] = to_float32_blob(vector)
+    return len(bson.encode(doc))
+
+
+def _recall(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dims", default="3072,1536,1024,512,256")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--factor", type=int, default=4, help="rescore over-fetch factor")
+    args = parser.parse_args()
+
+    dims = [int(d) for d in args.dims.split(",")]
+    docs, queries = _corpus(args.docs, args.queries, max(dims))
+    truth = _top(queries @ docs.T, args.k)
+
+    print(f"{args.docs} docs, {args.queries} queries, recall@{args.k}, rescore x{args.factor}")
+    print(f"{'dims':>5} {'storage':>8} {'bytes/doc':>10} {'recall':>7} "
+          f"{'+rescore bytes':>15} {'+rescore recall':>16}")
+    for dim in dims:
+        d_short, q_short = shorten(docs, dim), shorten(queries, dim)
+        for storage in ("array", "float32", "int8", "binary"):
+            scores = _compressed_scores(d_short, q_short, storage)
+            recall = _recall(_top(scores, args.k), truth)
+            size = _doc_bytes(d_short[0], storage, rescored=False)
+
+            line = f"{dim:>5} {storage:>8} {size:>10} {recall:>7.3f}"
+            if storage in ("int8", "binary"):
+                pool = _top(scores, args.k * args.factor)
+                exact = np.einsum("qd,qcd->qc", q_short, d_short[pool])
+                rescored = np.take_along_axis(pool, _top(exact, args.k), axis=1)
+                line += (f" {_doc_bytes(d_short[0], storage, rescored=True):>15}"
+                         f" {_recall(rescored, truth):>16.3f}")
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# benchmarks/bench_storage_layout.py
+"""
+Inline vs split strategy storage: document size, working set and search
+response size, on a synthetic corpus shaped like real saves (three
+Tavily facets of ~8 results, a full strategy_json and its markdown).
+
+- bytes/doc: the `strategies` document as stored (vector included), and
+  the compressed blob that the split layout moves to `strategy_blobs`
+- working set: `strategies` bytes for the whole corpus, i.e. what Mongo
+  must keep cached to serve search and listings, and the Python heap
+  for the local backend's in-memory payloads
+- search response: BSON bytes of a top-k result list (full markdown vs
+  preview)
+- lazy load: time to decompress one field vs decode a full inline doc
+
+No keys needed:
+
+    python benchmarks/bench_storage_layout.py
+    python benchmarks/bench_storage_layout.py --docs 2000 --top-k 10
+    python benchmarks/bench_storage_layout.py --live   # sizes of the configured backend
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import bson
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src import blob_store
+from src.blob_store import BLOB_FIELDS, compress, decompress, preview, split_doc
+
+_WORDS = (
+    "onboarding activation retention churn pricing seats workflow integration "
+    "dashboard analytics admin permissions sso audit compliance template "
+    "assistant automation insight adoption trial conversion enterprise team "
+    "feedback roadmap backlog experiment cohort funnel latency export api"
+).split()
+
+
+def _text(rng, words: int) -> str:
+    return " ".join(rng.choice(_WORDS, words)).capitalize() + "."
+
+
+def _strategy(rng, dim: int, n: int) -> dict:
+    tavily_raw = {
+        facet: {
+            "query": f"{facet} for product {n}",
+            "answer": _text(rng, 80),
+            "results": [
+                {
+                    "title": _text(rng, 8),
+                    "url": f"https://example.com/{facet}/{n}/{i}",
+                    "content": _text(rng, 160),
+                    "score": float(rng.random()),
+                }
+                for i in range(8)
+            ],
+        }
+        for facet in ("pains", "competitors", "trends")
+    }
+    features = [
+        {"name": _text(rng, 4), "description": _text(rng, 30), "scores": {"impact": 4, "effort": 2}}
+        for _ in range(6)
+    ]
+    strategy_json = {
+        "product_name": f"Product {n}",
+        "market_gaps": [_text(rng, 25) for _ in range(5)],
+        "prioritized_features": features,
+        "roadmap": {"now": [f["name"] for f in features[:2]], "next": [f["name"] for f in features[2:]]},
+        "prds": [{"feature_name": f["name"], "problem": _text(rng, 60), "requirements": [_text(rng, 15)] * 4}
+                 for f in features[:3]],
+    }
+    markdown = "\n\n".join(f"## Section {i}\n{_text(rng, 120)}" for i in range(10))
+    vector = rng.standard_normal(dim).astype(np.float32).tolist()
+    return {
+        "product_name": f"Product {n}",
+        "target_users": "product managers at B2B SaaS companies",
+        "goal": "increase activation",
+        "company_type": "mid-size B2B SaaS",
+        "constraints": "",
+        "strategy_markdown": markdown,
+        "vector": vector,
+        "tavily_raw": tavily_raw,
+        "strategy_json": strategy_json,
+        "extra_instructions": "",
+        "parent_id": None,
+        "version": 1,
+    }
+
+
+def _heap_bytes(docs: list) -> int:
+    # Round-trip through JSON so the measured objects are fresh allocations
+    payload = json.dumps(docs)
+    tracemalloc.start()
+    held = json.loads(payload)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return size
+
+
+def _fmt(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:,.1f} {unit}"
+        n /= 1024
+    return f"{n:,.1f} TB"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=3072)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--live", action="store_true", help="print storage_stats() of the configured backend")
+    args = parser.parse_args()
+
+    if args.live:
+        from src.db import storage_stats
+
+        print(json.dumps(storage_stats(), indent=2, default=str))
+        return
+
+    rng = np.random.default_rng(0)
+    corpus = [_strategy(rng, args.dim, n) for n in range(args.docs)]
+    codecs = ["zlib"] + (["zstd"] if blob_store.zstandard is not None else [])
+
+    print(f"{args.docs} docs, {args.dim}-dim array vectors, top-k {args.top_k}")
+    if blob_store.zstandard is None:
+        print("(zstandard not installed: zlib only)")
+
+    inline = [len(bson.encode(doc)) for doc in corpus]
+    print(f"\n{'layout':<14} {'strategies/doc':>15} {'blob/doc':>10} {'total/doc':>10}")
+    print(f"{'inline':<14} {_fmt(np.mean(inline)):>15} {'-':>10} {_fmt(np.mean(inline)):>10}")
+    slim_docs = []
+    for codec in codecs:
+        blob_store.STRATEGY_BLOB_CODEC = codec
+        pairs = [split_doc(doc) for doc in corpus]
+        slim_docs = [slim for slim, _ in pairs]
+        slim = np.mean([len(bson.encode(s)) for s in slim_docs])
+        blob = np.mean([len(bson.encode(b)) for _, b in pairs])
+        print(f"{'split/' + codec:<14} {_fmt(slim):>15} {_fmt(blob):>10} {_fmt(slim + blob):>10}")
+
+    print("\nworking set (whole corpus)")
+    no_vec = lambda d: {k: v for k, v in d.items() if k != "vector"}
+    print(f"  strategies collection: inline {_fmt(sum(inline))}"
+          f" -> split {_fmt(sum(len(bson.encode(s)) for s in slim_docs))}")
+    print(f"  local payload heap:    inline {_fmt(_heap_bytes([no_vec(d) for d in corpus]))}"
+          f" -> split {_fmt(_heap_bytes([no_vec(s) for s in slim_docs]))}")
+
+    hits = corpus[: args.top_k]
+    full = [{"id": str(i), "product_name": d["product_name"], "score": 0.9,
+             "strategy_markdown": d["strategy_markdown"]} for i, d in enumerate(hits)]
+    slim_hits = [{"id": str(i), "product_name": d["product_name"], "score": 0.9,
+                  "preview": preview(d["strategy_markdown"])} for i, d in enumerate(hits)]
+    print(f"\nsearch response (top {args.top_k}): full markdown {_fmt(len(bson.encode({'r': full})))}"
+          f" -> preview {_fmt(len(bson.encode({'r': slim_hits})))}")
+
+    encoded = [bson.encode(no_vec(d)) for d in corpus[:200]]
+    start = time.perf_counter()
+    for raw in encoded:
+        bson.decode(raw)
+    inline_ms = (time.perf_counter() - start) / len(encoded) * 1000
+    print(f"\nload one strategy without vectors: inline decode {inline_ms:.3f} ms")
+    for codec in codecs:
+        blobs = [compress(d["strategy_markdown"], codec) for d in corpus[:200]]
+        start = time.perf_counter()
+        for c, data in blobs:
+            decompress(c, data)
+        lazy_ms = (time.perf_counter() - start) / len(blobs) * 1000
+        print(f"  markdown only from {codec} blob: {lazy_ms:.3f} ms")
+
+    raw = sum(len(json.dumps(d[f]).encode()) for d in corpus for f in BLOB_FIELDS)
+    for codec in codecs:
+        stored = sum(len(compress(d[f], codec)[1]) for d in corpus for f in BLOB_FIELDS)
+        print(f"bulky fields {codec}: {_fmt(raw)} -> {_fmt(stored)} ({raw / stored:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,7 @@
 # main.py — MCPApp for LastMile Cloud (no create_mcp_server_for_app)
 
 import os
-import json
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 from openai import OpenAI
 from mcp_agent.app import MCPApp
@@ -13,10 +12,29 @@ PROJECT_ROOT = CURRENT_DIR  # main.py is already at project root
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from src.research_tools import research_bundle
-from src.db import save_strategy_to_db, search_similar_strategies
+from src.research_tools import build_research_bundle_async
+from src.context_packer import pack_research
+from src.db import search_strategies_async
 from src.agent_prompt import SYSTEM_PROMPT
-from src.llm_client import generate_full_strategy_struct, render_strategy_markdown
+from src.llm_client import (
+    generate_full_strategy_struct_async,
+    llm_cache_stats,
+    refine_strategy_struct_async,
+    render_strategy_markdown,
+)
+from src.model_cascade import cascade_stats
+from src.dedup import dedup_stats
+from src.write_behind import (
+    lookup_strategies_async,
+    lookup_strategy_async,
+    persist_strategy_async,
+    start_write_behind,
+    write_behind_stats,
+)
+from src.tavily_client import tavily_cache_stats
+from src.singleflight import singleflight_stats
+from src.embeddings import embedding_batcher_stats, embedding_cache_stats
+from src import clients
 
 # ---------------------------------------------------------------------
 # Define the MCPApp that Cloud will load
@@ -24,15 +42,16 @@ from src.llm_client import generate_full_strategy_struct, render_strategy_markdo
 
 app = MCPApp(name="ai-product-strategist")
 
+# Saves queued before a restart are replayed in the background
+start_write_behind()
+
 
 def _get_openai_client() -> OpenAI:
     """
     Use OPENAI_API_KEY from env (LastMile will inject it from secrets).
+    Shared with every other module via the client registry.
     """
-    api_key = os.getenv("OPENAI_API_KEY")
-    if api_key:
-        return OpenAI(api_key=api_key)
-    return OpenAI()
+    return clients.get_openai()
 
 
 # ---------------------------------------------------------------------
@@ -47,6 +66,9 @@ async def strategy_run(
     company_type: str = "mid-size B2B SaaS",
     constraints: str = "",
     extra_instructions: str = "",
+    generation_mode: str = "",
+    use_cache: bool = True,
+    tags: str = "",
 ) -> Dict[str, Any]:
     """
     End-to-end strategy workflow aligned with abstract:
@@ -64,10 +86,19 @@ async def strategy_run(
     3. Render markdown for human reading.
     4. Save full result into MongoDB with embeddings.
     5. Return research + structured strategy + markdown.
+
+    generation_mode: "monolithic" or "sectioned" (parallel per-section
+    calls); empty uses STRATEGY_GENERATION_MODE.
+    use_cache=False forces a fresh model call; `llm_cache.hit` in the
+    result says whether the strategy was served from cache.
+    `model_cascade` lists sections repaired locally or escalated to a
+    stronger model tier.
+    tags: comma-separated labels stored with the strategy for filtered
+    memory search.
     """
 
-    # 1) Tavily research via your existing helper
-    research = research_bundle(
+    # 1) Tavily research – facets run concurrently
+    research = await build_research_bundle_async(
         product_name=product_name,
         target_users=target_users,
         goal=goal,
@@ -75,10 +106,13 @@ async def strategy_run(
         constraints=constraints,
     )
 
-    tavily_raw_json = json.dumps(research["tavily_raw"], indent=2)
+    # Compact, token-budgeted research context for the prompt
+    packed = pack_research(research["tavily_raw"])
+    tavily_raw_json = packed["context"]
+    research["context_tokens"] = packed["stats"]
 
     # 2) Call LLM to generate full structured strategy JSON
-    strategy_struct = generate_full_strategy_struct(
+    strategy_struct = await generate_full_strategy_struct_async(
         product_name=product_name,
         target_users=target_users,
         goal=goal,
@@ -86,7 +120,13 @@ async def strategy_run(
         constraints=constraints or "none specified",
         tavily_raw_json=tavily_raw_json,
         extra_instructions=extra_instructions,
+        generation_mode=generation_mode or None,
+        use_cache=use_cache,
     )
+    research["llm_cache"] = strategy_struct.pop("_cache", None)
+    research["model_cascade"] = strategy_struct.pop("_cascade", None)
+    research["extra_instructions"] = extra_instructions
+    research["tags"] = tags
 
     # 3) Render markdown for humans
     strategy_markdown = render_strategy_markdown(strategy_struct)
@@ -98,7 +138,7 @@ async def strategy_run(
    # 5) Save to MongoDB + embeddings (now includes strategy_json)
     mongo_status = {"status": "skipped"}
     try:
-        mongo_status = save_strategy_to_db(research)
+        mongo_status = await persist_strategy_async(research)
     except Exception as e:
         # Don’t crash the tool if Mongo is unreachable
         mongo_status = {"status": "error", "error": str(e)}
@@ -110,13 +150,118 @@ async def strategy_run(
 
 
 @app.tool
-async def memory_search_similar(query: str, top_k: int = 3) -> Dict[str, Any]:
+async def strategy_refine(
+    parent_id: str,
+    goal: str = "",
+    constraints: str = "",
+    extra_instructions: str = "",
+    use_cache: bool = True,
+) -> Dict[str, Any]:
     """
-    Semantic search over previously saved strategies
-    using MongoDB Atlas Vector Search.
+    Refine a saved strategy (id from `mongo_save.id`) without re-running
+    research: only the sections affected by the changed goal, constraints
+    or extra instructions are regenerated. Empty arguments keep the
+    parent's value. The result is saved as a new version linked to the
+    parent (`parent_id`, `version`).
     """
-    results = search_similar_strategies(query, top_k)
-    return {"results": results}
+    parent = await lookup_strategy_async(parent_id, fields=("tavily_raw", "strategy_json"))
+    if parent is None:
+        return {"status": "error", "error": f"No saved strategy with id {parent_id}"}
+
+    research = {
+        "product_name": parent.get("product_name"),
+        "target_users": parent.get("target_users"),
+        "goal": goal or parent.get("goal"),
+        "company_type": parent.get("company_type"),
+        "constraints": constraints or parent.get("constraints") or "",
+        "extra_instructions": extra_instructions or parent.get("extra_instructions") or "",
+        "tavily_raw": parent.get("tavily_raw") or {},
+        "parent_id": parent_id,
+        "version": (parent.get("version") or 1) + 1,
+    }
+    packed = pack_research(research["tavily_raw"])
+    research["context_tokens"] = packed["stats"]
+
+    strategy_struct = await refine_strategy_struct_async(
+        previous=parent.get("strategy_json") or {},
+        product_name=research["product_name"],
+        target_users=research["target_users"],
+        goal=research["goal"],
+        company_type=research["company_type"],
+        constraints=research["constraints"] or "none specified",
+        tavily_raw_json=packed["context"],
+        extra_instructions=research["extra_instructions"],
+        previous_extra_instructions=parent.get("extra_instructions") or "",
+        use_cache=use_cache,
+    )
+    research["llm_cache"] = strategy_struct.pop("_cache", None)
+    research["model_cascade"] = strategy_struct.pop("_cascade", None)
+    research["refinement"] = strategy_struct.pop("_refinement", None)
+
+    research["strategy_json"] = strategy_struct
+    research["strategy_markdown"] = render_strategy_markdown(strategy_struct)
+
+    mongo_status = {"status": "skipped"}
+    try:
+        mongo_status = await persist_strategy_async(research)
+    except Exception as e:
+        mongo_status = {"status": "error", "error": str(e)}
+    research["mongo_save"] = mongo_status
+    return research
+
+
+@app.tool
+async def memory_search_similar(
+    query: str,
+    top_k: int = 3,
+    mode: str = "vector",
+    company_type: str = "",
+    product_name: str = "",
+    tags: str = "",
+    created_after: str = "",
+    created_before: str = "",
+    include_duplicates: bool = False,
+    mmr_lambda: float = 1.0,
+) -> Dict[str, Any]:
+    """
+    Search previously saved strategies.
+    mode: "vector" (Atlas Vector Search), "lexical" (BM25 on names, goal and
+    markdown) or "hybrid" (both, rank-fused). Includes per-stage timings.
+    Optional filters narrow the search before ranking: exact company_type /
+    product_name, any of the comma-separated tags, and an ISO date range on
+    created_at. `plan` reports the candidate pool used. Near-duplicate
+    runs (see dedup.py) are hidden unless include_duplicates is set.
+    mmr_lambda < 1 re-ranks an over-fetched candidate set with maximal
+    marginal relevance so near-identical strategies don't crowd the top-k
+    (0 = most diverse, 1 = plain ranking); `timings.mmr` is its cost.
+    """
+    filters = {
+        "company_type": company_type,
+        "product_name": product_name,
+        "tags": tags,
+        "created_after": created_after,
+        "created_before": created_before,
+        "include_duplicates": include_duplicates,
+    }
+    try:
+        return await search_strategies_async(query, top_k, mode, filters, mmr_lambda)
+    except ValueError as e:
+        return {"error": str(e)}
+
+
+@app.tool
+async def memory_get_strategies(ids: List[str], view: str = "summary", fields: str = "") -> Dict[str, Any]:
+    """
+    Fetch several saved strategies in one round trip, in the order given.
+    view: "summary" (inputs + preview), "roadmap" (+ prioritized features
+    and roadmap) or "full" (+ research, strategy JSON and markdown).
+    `fields` (comma list of dotted paths, e.g. "goal,strategy_json.prds")
+    overrides the view. Unknown ids come back as {"id", "error"}.
+    """
+    try:
+        return {"results": [doc async for doc in lookup_strategies_async(ids, view, fields or None)]}
+    except ValueError as e:
+        return {"error": str(e)}
 
 
 @app.tool
@@ -130,7 +275,7 @@ async def research_only(
     """
     Run only the Tavily research bundle without synthesizing a strategy.
     """
-    return research_bundle(
+    return await build_research_bundle_async(
         product_name=product_name,
         target_users=target_users,
         goal=goal,
@@ -138,6 +283,24 @@ async def research_only(
         constraints=constraints,
     )
 
+
+@app.tool
+async def runtime_stats() -> Dict[str, Any]:
+    """
+    Cache and request-coalescing counters for this worker process.
+    """
+    return {
+        "tavily_cache": tavily_cache_stats(),
+        "llm_cache": llm_cache_stats(),
+        "model_cascade": cascade_stats(),
+        "write_behind": write_behind_stats(),
+        "dedup": dedup_stats(),
+        "embedding_cache": embedding_cache_stats(),
+        "embedding_batcher": embedding_batcher_stats(),
+        "singleflight": singleflight_stats(),
+        "client_pools": clients.pool_stats(),
+    }
+
 # ⬅️ IMPORTANT:
 # No `if __name__ == "__main__":` block here.
 # Cloud only needs the `app` object defined above.
@@ -128,3 +128,148 @@ Respond as valid JSON in EXACTLY this shape:
   ]
 }}
 """
+
+# ---- SECTIONED GENERATION ----
+# Shared context for each section call; section instructions are appended.
+# Section templates are all passed through str.format.
+STRATEGY_SECTION_CONTEXT_TEMPLATE = """
+You are helping define the strategy for a product with the following context:
+
+- Product: {product_name}
+- Target users: {target_users}
+- Company type: {company_type}
+- Goal: {goal}
+- Constraints: {constraints}
+
+You are given Tavily web research (JSON) with pains, competitors and trends:
+
+{tavily_raw_json}
+
+Extra instructions from user (may be empty):
+{extra_instructions}
+"""
+
+MARKET_OVERVIEW_SECTION = """
+Write a concise market overview for this product: market size signals,
+key trends and why now. Use the research; do not invent numbers.
+
+Respond as valid JSON in EXACTLY this shape:
+
+{{"market_overview": ""}}
+"""
+
+COMPETITOR_SECTION = """
+Analyze the competitors found in the research: who they are, what they do
+well, where they fall short for these target users.
+
+Respond as valid JSON in EXACTLY this shape:
+
+{{"competitor_analysis": ""}}
+"""
+
+USER_PAIN_SECTION = """
+Identify the main user pains and frustrations for these target users,
+grounded in the research (reviews, forums, articles).
+
+Respond as valid JSON in EXACTLY this shape:
+
+{{"user_pain_analysis": ""}}
+"""
+
+FEATURES_SECTION = """
+1) Identify market gaps and opportunities.
+2) Generate a list of feature ideas that address them.
+3) Score each feature on:
+   - impact (1-5, 5 = highest impact)
+   - complexity (1-5, 5 = most complex)
+   - effort (1-5, 5 = highest effort)
+   Then assign an overall_priority rank (1 = highest priority, no ties).
+
+Respond as valid JSON in EXACTLY this shape:
+
+{{
+  "market_gaps": [],
+  "feature_ideas": [
+    {{"name": "", "description": "", "solves_gap": "", "solves_pain": ""}}
+  ],
+  "prioritized_features": [
+    {{
+      "name": "",
+      "description": "",
+      "score": {{"impact": 1, "complexity": 1, "effort": 1, "overall_priority": 1}}
+    }}
+  ]
+}}
+"""
+
+ROADMAP_SECTION = """
+Create a 3-month product roadmap for these prioritized features:
+
+{features_json}
+
+- month_1: discovery / foundation
+- month_2: MVP delivery
+- month_3: scale & polish
+
+Respond as valid JSON in EXACTLY this shape:
+
+{{"three_month_roadmap": {{"month_1": [], "month_2": [], "month_3": []}}}}
+"""
+
+PRD_SECTION = """
+Write a PRD (Product Requirement Document) for this feature:
+
+{feature_json}
+
+Respond as valid JSON in EXACTLY this shape:
+
+{{
+  "feature_name": "",
+  "description": "",
+  "target_users": [],
+  "motivation": "",
+  "acceptance_criteria": [],
+  "risks": []
+}}
+"""
+
+# ---- ESCALATION ----
+# Re-ask for sections that failed validation; appended to the section context.
+SECTION_FIX_TEMPLATE = """
+A draft strategy was generated, but these sections are missing or invalid:
+
+{problems}
+
+Sections already accepted (stay consistent with them, do not repeat them):
+
+{accepted_json}
+
+Rewrite ONLY the sections listed above.
+
+Respond as valid JSON in EXACTLY this shape:
+
+{shape_json}
+"""
+
+# ---- REFINEMENT ----
+# Delta update of an existing strategy; appended to the section context.
+REFINE_SECTIONS_TEMPLATE = """
+This strategy already exists and is being refined. The user changed:
+
+{changes}
+
+Sections that stay as they are (keep the update consistent with them):
+
+{accepted_json}
+
+Current version of the sections to update:
+
+{previous_json}
+
+Rewrite ONLY these sections so they reflect the change; keep what still
+applies.
+
+Respond as valid JSON in EXACTLY this shape:
+
+{shape_json}
+"""
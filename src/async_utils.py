@@ -0,0 +1,91 @@
+# src/async_utils.py
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Upper bound on threads used for blocking calls that have no async client.
+BLOCKING_POOL_SIZE = int(os.getenv("BLOCKING_POOL_SIZE", "16"))
+
+_blocking_executor: Optional[ThreadPoolExecutor] = None
+_blocking_lock = threading.Lock()
+
+# Long-lived loop that runs every coroutine started from sync code
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_loop_lock = threading.Lock()
+
+
+def _get_blocking_executor() -> ThreadPoolExecutor:
+    global _blocking_executor
+    with _blocking_lock:
+        if _blocking_executor is None:
+            _blocking_executor = ThreadPoolExecutor(
+                max_workers=BLOCKING_POOL_SIZE,
+                thread_name_prefix="blocking",
+            )
+    return _blocking_executor
+
+
+def _get_sync_loop() -> asyncio.AbstractEventLoop:
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="sync-loop", daemon=True).start()
+    return _sync_loop
+
+
+def _reset_after_fork() -> None:
+    # Worker threads don't survive fork; let the child build its own pool / loop.
+    global _blocking_executor, _blocking_lock, _sync_loop, _sync_loop_lock
+    _blocking_executor = None
+    _blocking_lock = threading.Lock()
+    _sync_loop = None
+    _sync_loop_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking call on the bounded pool without stalling the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_blocking_executor(), functools.partial(fn, *args, **kwargs)
+    )
+
+
+async def _closing_clients(coro):
+    from .clients import aclose_loop_clients
+
+    try:
+        return await coro
+    finally:
+        await aclose_loop_clients()
+
+
+def run_sync(coro):
+    """
+    Run a coroutine from sync code, even if the caller's thread
+    already has an event loop running. Runs on the shared background
+    loop, so per-loop async clients (and their connection pools) are
+    reused across calls.
+    """
+    loop = _get_sync_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is not loop:
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+    # Sync code called from the shared loop itself: blocking on the loop
+    # would deadlock, so use a throwaway loop that closes its clients.
+    with ThreadPoolExecutor(max_workers=1) as runner:
+        return runner.submit(asyncio.run, _closing_clients(coro)).result()
@@ -0,0 +1,352 @@
+# src/batch_runner.py
+"""
+Bulk strategy generation: research -> generate -> save for many products.
+
+- Inputs come from JSONL or CSV (product_name, target_users, goal and
+  optionally company_type, constraints, extra_instructions, tags, id).
+- Each stage has its own concurrency limit, so e.g. Tavily can run wider
+  than the model calls while Mongo saves stay narrow.
+- Every finished stage is checkpointed per item, so a crashed or
+  interrupted run resumes where it stopped. Items already written as
+  "ok" to the output are skipped entirely.
+- Partial results fail the item instead of being checkpointed: research
+  with failed facets (over BATCH_MAX_FAILED_FACET_SHARE) and strategies
+  with sections the model cascade left unresolved. The next run retries
+  them.
+- Results stream to NDJSON (one line per item, flushed as it lands) and
+  a summary reports throughput and p50/p95 per stage.
+
+    python -m src.batch_runner products.jsonl --out results.ndjson
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .context_packer import pack_research
+from .db import save_strategy_to_db_async
+from .llm_client import generate_full_strategy_struct_async, render_strategy_markdown
+from .research_tools import build_research_bundle_async
+from .response_cache import CACHE_DIR
+from .search_filters import normalize_tags
+
+BATCH_RESEARCH_CONCURRENCY = int(os.getenv("BATCH_RESEARCH_CONCURRENCY", "4"))
+BATCH_GENERATE_CONCURRENCY = int(os.getenv("BATCH_GENERATE_CONCURRENCY", "4"))
+BATCH_SAVE_CONCURRENCY = int(os.getenv("BATCH_SAVE_CONCURRENCY", "2"))
+# Items between stages hold research in memory; cap how many are in flight
+BATCH_MAX_IN_FLIGHT = int(os.getenv("BATCH_MAX_IN_FLIGHT", "32"))
+BATCH_CHECKPOINT_DIR = os.getenv("BATCH_CHECKPOINT_DIR", os.path.join(CACHE_DIR, "batch"))
+# Share of research facets that may fail (timeout, rate limit) with the item still going ahead
+BATCH_MAX_FAILED_FACET_SHARE = float(os.getenv("BATCH_MAX_FAILED_FACET_SHARE", "0"))
+# Accept strategies whose cascade report still lists unresolved sections
+BATCH_ALLOW_UNRESOLVED = os.getenv("BATCH_ALLOW_UNRESOLVED", "0").lower() in ("1", "true", "yes")
+
+STAGES = ("research", "generate", "save")
+_INPUT_FIELDS = ("product_name", "target_users", "goal", "company_type", "constraints", "extra_instructions")
+_REQUIRED_FIELDS = ("product_name", "target_users", "goal")
+
+
+# ---- INPUT ----
+def _item_id(item: Dict[str, Any]) -> str:
+    # Stable across runs so checkpoints line up with their input
+    payload = json.dumps({f: item.get(f, "") for f in _INPUT_FIELDS}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def load_items(path: str) -> List[Dict[str, Any]]:
+    """
+    Read products from .jsonl/.ndjson or .csv; adds `id` when missing.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    items = []
+    for n, row in enumerate(rows, start=1):
+        missing = [field for field in _REQUIRED_FIELDS if not (row.get(field) or "").strip()]
+        if missing:
+            raise ValueError(f"{path}: item {n} is missing {', '.join(missing)}")
+        item = {f: (row.get(f) or "").strip() for f in _INPUT_FIELDS}
+        item["company_type"] = item["company_type"] or "mid-size B2B SaaS"
+        item["id"] = str(row.get("id") or _item_id(item))
+        # Not part of the id: tagging an input file must not restart it
+        item["tags"] = normalize_tags(row.get("tags"))
+        items.append(item)
+    return items
+
+
+# ---- STAGE CHECKS ----
+class IncompleteStage(RuntimeError):
+    """
+    A stage returned partial output; the item fails and nothing is
+    checkpointed, so the next run redoes the stage.
+    """
+
+
+def check_research(research: Dict[str, Any]) -> None:
+    facets = {
+        name: timing.get("status")
+        for name, timing in (research.get("facet_timings") or {}).items()
+        if isinstance(timing, dict)
+    }
+    failed = {name: status for name, status in facets.items() if status != "ok"}
+    if facets and len(failed) / len(facets) > BATCH_MAX_FAILED_FACET_SHARE:
+        errors = {name: (research.get("tavily_raw") or {}).get(name, {}).get("error") or status
+                  for name, status in failed.items()}
+        raise IncompleteStage(f"research facets failed: {errors}")
+
+
+def check_strategy(strategy: Dict[str, Any]) -> None:
+    unresolved = (strategy.get("_cascade") or {}).get("unresolved")
+    if unresolved and not BATCH_ALLOW_UNRESOLVED:
+        raise IncompleteStage(f"sections unresolved after the model cascade: {sorted(unresolved)}")
+
+
+# ---- CHECKPOINTS ----
+class Checkpoints:
+    """
+    One JSON file per (item, stage); written atomically via rename.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, item_id: str, stage: str) -> str:
+        return os.path.join(self.directory, f"{item_id}.{stage}.json")
+
+    def load(self, item_id: str, stage: str) -> Optional[Any]:
+        try:
+            with open(self._path(item_id, stage), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, item_id: str, stage: str, value: Any) -> None:
+        path = self._path(item_id, stage)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+
+def _completed_ids(out_path: str) -> set:
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line from a crash
+            if row.get("status") == "ok":
+                done.add(row.get("id"))
+    return done
+
+
+# ---- METRICS ----
+def _stage_summary(durations: List[float]) -> Dict[str, Any]:
+    if not durations:
+        return {"count": 0, "p50": None, "p95": None}
+    values = np.asarray(durations)
+    return {
+        "count": len(durations),
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+    }
+
+
+# ---- RUNNER ----
+async def run_batch(
+    items: List[Dict[str, Any]],
+    out_path: str,
+    checkpoint_dir: Optional[str] = None,
+    research_concurrency: int = BATCH_RESEARCH_CONCURRENCY,
+    generate_concurrency: int = BATCH_GENERATE_CONCURRENCY,
+    save_concurrency: int = BATCH_SAVE_CONCURRENCY,
+    generation_mode: Optional[str] = None,
+    save: bool = True,
+) -> Dict[str, Any]:
+    """
+    Run the pipeline for every item; returns the summary (also suitable
+    for printing). Failed items are written with status "error" and are
+    retried from their last checkpoint on the next run.
+    """
+    checkpoints = Checkpoints(checkpoint_dir or BATCH_CHECKPOINT_DIR)
+    already_done = _completed_ids(out_path)
+    pending = [item for item in items if item["id"] not in already_done]
+
+    limits = {
+        "research": asyncio.Semaphore(research_concurrency),
+        "generate": asyncio.Semaphore(generate_concurrency),
+        "save": asyncio.Semaphore(save_concurrency),
+    }
+    in_flight = asyncio.Semaphore(BATCH_MAX_IN_FLIGHT)
+    durations: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    counts = {"ok": 0, "error": 0, "resumed_stages": 0}
+
+    async def stage(name: str, item: Dict[str, Any], timings: Dict[str, Any], run, check=None):
+        cached = checkpoints.load(item["id"], name)
+        if cached is not None and check is not None:
+            try:
+                check(cached)
+            except IncompleteStage:
+                cached = None  # checkpointed before these checks existed; redo it
+        if cached is not None:
+            counts["resumed_stages"] += 1
+            timings[name] = "resumed"
+            return cached
+        async with limits[name]:
+            start = time.perf_counter()
+            value = await run()
+            elapsed = time.perf_counter() - start
+        durations[name].append(elapsed)
+        timings[name] = round(elapsed, 3)
+        if check is not None:
+            check(value)
+        checkpoints.save(item["id"], name, value)
+        return value
+
+    async def process(item: Dict[str, Any], out) -> None:
+        timings: Dict[str, Any] = {}
+        current = "research"
+        try:
+            research = await stage(
+                "research",
+                item,
+                timings,
+                lambda: build_research_bundle_async(
+                    product_name=item["product_name"],
+                    target_users=item["target_users"],
+                    goal=item["goal"],
+                    company_type=item["company_type"],
+                    constraints=item["constraints"],
+                ),
+                check_research,
+            )
+
+            current = "generate"
+
+            async def generate():
+                packed = pack_research(research["tavily_raw"])
+                return await generate_full_strategy_struct_async(
+                    product_name=item["product_name"],
+                    target_users=item["target_users"],
+                    goal=item["goal"],
+                    company_type=item["company_type"],
+                    constraints=item["constraints"] or "none specified",
+                    tavily_raw_json=packed["context"],
+                    extra_instructions=item["extra_instructions"],
+                    generation_mode=generation_mode,
+                )
+
+            strategy = await stage("generate", item, timings, generate, check_strategy)
+            markdown = render_strategy_markdown(strategy)
+
+            current = "save"
+            mongo_save = {"status": "skipped"}
+            if save:
+                record = dict(
+                    research,
+                    extra_instructions=item["extra_instructions"],
+                    tags=item["tags"],
+                    strategy_json={k: v for k, v in strategy.items() if not k.startswith("_")},
+                    strategy_markdown=markdown,
+                )
+                mongo_save = await stage(
+                    "save", item, timings, lambda: save_strategy_to_db_async(record)
+                )
+
+            row = {
+                "id": item["id"],
+                "status": "ok",
+                "product_name": item["product_name"],
+                "timings": timings,
+                "mongo_save": mongo_save,
+                "model_cascade": strategy.get("_cascade"),
+                "strategy_json": {k: v for k, v in strategy.items() if not k.startswith("_")},
+                "strategy_markdown": markdown,
+            }
+            counts["ok"] += 1
+        except Exception as e:
+            row = {
+                "id": item["id"],
+                "status": "error",
+                "product_name": item["product_name"],
+                "stage": current,
+                "error": f"{type(e).__name__}: {e}",
+                "timings": timings,
+            }
+            counts["error"] += 1
+        # Writes happen on the loop thread, so lines never interleave
+        out.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+        out.flush()
+
+    async def bounded(item, out):
+        async with in_flight:
+            await process(item, out)
+
+    start = time.perf_counter()
+    with open(out_path, "a", encoding="utf-8") as out:
+        await asyncio.gather(*(bounded(item, out) for item in pending))
+    wall = time.perf_counter() - start
+
+    return {
+        "items": len(items),
+        "skipped_already_done": len(items) - len(pending),
+        "ok": counts["ok"],
+        "errors": counts["error"],
+        "resumed_stages": counts["resumed_stages"],
+        "wall_seconds": round(wall, 3),
+        "throughput_per_min": round(counts["ok"] / wall * 60, 2) if wall > 0 else None,
+        "stages": {name: _stage_summary(durations[name]) for name in STAGES},
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate strategies for many products.")
+    parser.add_argument("input", help=".jsonl or .csv with product_name, target_users, goal, ...")
+    parser.add_argument("--out", default="batch_results.ndjson")
+    parser.add_argument("--checkpoint-dir", default=None,
+                        help="default: BATCH_CHECKPOINT_DIR/<input file name>")
+    parser.add_argument("--research-concurrency", type=int, default=BATCH_RESEARCH_CONCURRENCY)
+    parser.add_argument("--generate-concurrency", type=int, default=BATCH_GENERATE_CONCURRENCY)
+    parser.add_argument("--save-concurrency", type=int, default=BATCH_SAVE_CONCURRENCY)
+    parser.add_argument("--generation-mode", default=None)
+    parser.add_argument("--no-save", action="store_true", help="skip the Mongo save stage")
+    args = parser.parse_args(argv)
+
+    items = load_items(args.input)
+    checkpoint_dir = args.checkpoint_dir or os.path.join(
+        BATCH_CHECKPOINT_DIR, os.path.splitext(os.path.basename(args.input))[0]
+    )
+    summary = asyncio.run(
+        run_batch(
+            items,
+            args.out,
+            checkpoint_dir=checkpoint_dir,
+            research_concurrency=args.research_concurrency,
+            generate_concurrency=args.generate_concurrency,
+            save_concurrency=args.save_concurrency,
+            generation_mode=args.generation_mode,
+            save=not args.no_save,
+        )
+    )
+    json.dump(summary, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
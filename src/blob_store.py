@@ -0,0 +1,172 @@
+# src/blob_store.py
+"""
+Split storage for saved strategies.
+
+The `strategies` document keeps only what search and listings need
+(inputs, lineage, vectors and a short `preview` of the markdown). The
+bulky fields (`tavily_raw`, `strategy_json`, `strategy_markdown`) are
+compressed one by one into a blob document with the same `_id`, kept in
+the `strategy_blobs` side collection (or one file per strategy on the
+local backend), and are only read and decompressed when asked for.
+
+zstd is used when the `zstandard` package is installed, zlib otherwise;
+every blob records its codec, so both can be read back either way.
+Documents saved before the split keep their fields inline and are read
+as before.
+"""
+import json
+import os
+import zlib
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import bson
+
+from .local_index import LOCAL_INDEX_DIR
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is always available
+    zstandard = None
+
+# "split" (slim doc + compressed blob) or "inline" (everything in one doc)
+STRATEGY_STORAGE = os.getenv("STRATEGY_STORAGE", "split").lower()
+STRATEGY_BLOB_CODEC = os.getenv("STRATEGY_BLOB_CODEC", "zstd").lower()
+STRATEGY_BLOB_LEVEL = int(os.getenv("STRATEGY_BLOB_LEVEL", "9"))
+# Markdown characters kept on the slim document for search results
+STRATEGY_PREVIEW_CHARS = int(os.getenv("STRATEGY_PREVIEW_CHARS", "600"))
+LOCAL_BLOB_DIR = os.getenv("LOCAL_BLOB_DIR", os.path.join(LOCAL_INDEX_DIR, "strategy_blobs"))
+
+BLOB_FIELDS = ("tavily_raw", "strategy_json", "strategy_markdown")
+BLOB_COLLECTION = "strategy_blobs"
+
+if STRATEGY_STORAGE not in ("split", "inline"):
+    raise ValueError(f"STRATEGY_STORAGE={STRATEGY_STORAGE!r}; expected 'split' or 'inline'")
+
+
+def split_storage() -> bool:
+    return STRATEGY_STORAGE == "split"
+
+
+def blob_fields(fields: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """
+    Normalise a `fields` argument: None -> none, "all" -> every blob field.
+    """
+    if fields is None:
+        return ()
+    if isinstance(fields, str):
+        fields = BLOB_FIELDS if fields == "all" else [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in BLOB_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown strategy fields {unknown}; expected some of {BLOB_FIELDS}")
+    return tuple(f for f in BLOB_FIELDS if f in fields)
+
+
+# ---- CODECS ----
+def _codec() -> str:
+    return "zstd" if STRATEGY_BLOB_CODEC == "zstd" and zstandard is not None else "zlib"
+
+
+def compress(value: Any, codec: Optional[str] = None) -> Tuple[str, bytes]:
+    codec = codec or _codec()
+    raw = json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")
+    if codec == "zstd":
+        return codec, zstandard.ZstdCompressor(level=STRATEGY_BLOB_LEVEL).compress(raw)
+    return "zlib", zlib.compress(raw, min(STRATEGY_BLOB_LEVEL, 9))
+
+
+def decompress(codec: str, data: bytes) -> Any:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("strategy blob is zstd-compressed; pip install zstandard to read it")
+        raw = zstandard.ZstdDecompressor().decompress(bytes(data))
+    else:
+        raw = zlib.decompress(bytes(data))
+    return json.loads(raw.decode("utf-8"))
+
+
+# ---- SPLIT / HYDRATE ----
+def preview(markdown: Optional[str]) -> str:
+    return (markdown or "")[:STRATEGY_PREVIEW_CHARS]
+
+
+def split_doc(doc: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    (slim strategy document, blob document) for a `_build_strategy_doc`
+    result. Neither carries an `_id`; the caller gives both the same one.
+    """
+    slim = {k: v for k, v in doc.items() if k not in BLOB_FIELDS}
+    slim["preview"] = preview(doc.get("strategy_markdown"))
+    slim["blob_fields"] = [f for f in BLOB_FIELDS if doc.get(f) is not None]
+
+    codec = _codec()
+    blob = {"codec": codec, "fields": {}, "raw_bytes": 0, "stored_bytes": 0}
+    for field in slim["blob_fields"]:
+        _, data = compress(doc[field], codec)
+        blob["fields"][field] = data
+        blob["raw_bytes"] += len(json.dumps(doc[field], ensure_ascii=False, default=str).encode("utf-8"))
+        blob["stored_bytes"] += len(data)
+    return slim, blob
+
+
+def is_split(doc: Dict[str, Any]) -> bool:
+    return "blob_fields" in doc
+
+
+def unpack_blob(blob: Optional[Dict[str, Any]], fields: Iterable[str]) -> Dict[str, Any]:
+    """
+    Decompress the requested fields of a blob document (missing -> None).
+    """
+    if not blob:
+        return {field: None for field in fields}
+    stored = blob.get("fields", {})
+    return {
+        field: decompress(blob["codec"], stored[field]) if field in stored else None
+        for field in fields
+    }
+
+
+def blob_projection(fields: Iterable[str]) -> Dict[str, int]:
+    # Fetch only the compressed fields that were asked for
+    projection = {"codec": 1}
+    projection.update({f"fields.{field}": 1 for field in fields})
+    return projection
+
+
+# ---- LOCAL BACKEND ----
+class LocalBlobStore:
+    """
+    One BSON file per strategy; written atomically via rename.
+    """
+
+    def __init__(self, directory: str = LOCAL_BLOB_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, doc_id: str) -> str:
+        return os.path.join(self.directory, f"{doc_id}.bson")
+
+    def put(self, doc_id: str, blob: Dict[str, Any]) -> None:
+        path = self._path(doc_id)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(bson.encode(blob))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(doc_id), "rb") as f:
+                return bson.decode(f.read())
+        except FileNotFoundError:
+            return None
+
+
+_local_store: Optional[LocalBlobStore] = None
+
+
+def get_local_blob_store() -> LocalBlobStore:
+    global _local_store
+    if _local_store is None:
+        _local_store = LocalBlobStore()
+    return _local_store
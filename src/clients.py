@@ -0,0 +1,278 @@
+# src/clients.py
+"""
+Process-wide registry for the OpenAI, Tavily and MongoDB clients.
+
+Every module goes through these getters so a worker keeps one warm
+connection pool per service instead of paying TLS handshakes and Mongo
+topology discovery on every save / search. Clients are created lazily,
+async clients are kept per event loop, and everything is dropped in a
+forked child so pools are never shared across processes.
+
+Sync callers share one long-lived loop (async_utils.run_sync), so their
+async clients are built once. Short-lived loops close theirs with
+`aclose_loop_clients` before they finish.
+"""
+import asyncio
+import inspect
+import os
+import threading
+import weakref
+from typing import Any, Callable, Dict
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+from pymongo import MongoClient, monitoring
+from tavily import AsyncTavilyClient, TavilyClient
+
+from dotenv import load_dotenv
+load_dotenv()
+
+try:  # PyMongo >= 4.9 ships a native asyncio client
+    from pymongo import AsyncMongoClient
+except ImportError:
+    AsyncMongoClient = None
+
+
+# ---- POOL CONFIG ----
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "50"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+MONGODB_CONNECT_TIMEOUT_MS = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "10000"))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(
+    os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "10000")
+)
+MONGODB_SOCKET_TIMEOUT_MS = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "30000"))
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "120"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+
+class _PoolListener(monitoring.ConnectionPoolListener):
+    """
+    Counts Mongo pool events so `pool_stats()` can show reuse vs. new sockets.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"created": 0, "closed": 0, "checked_out": 0, "checked_in": 0}
+
+    def _bump(self, field: str) -> None:
+        with self._lock:
+            self.counts[field] += 1
+
+    def connection_created(self, event): self._bump("created")
+    def connection_closed(self, event): self._bump("closed")
+    def connection_checked_out(self, event): self._bump("checked_out")
+    def connection_checked_in(self, event): self._bump("checked_in")
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_check_out_started(self, event): pass
+    def connection_check_out_failed(self, event): pass
+
+
+_lock = threading.Lock()
+_clients: Dict[str, Any] = {}
+_async_clients: Dict[str, "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]"] = {}
+_created: Dict[str, int] = {}
+_pool_listener = _PoolListener()
+
+
+def _require_env(name: str, message: str) -> str:
+    value = os.getenv(name)
+    if not value:
+        raise RuntimeError(message)
+    return value
+
+
+def _get(kind: str, factory: Callable[[], Any]) -> Any:
+    with _lock:
+        client = _clients.get(kind)
+        if client is None:
+            client = _clients[kind] = factory()
+            _created[kind] = _created.get(kind, 0) + 1
+    return client
+
+
+def _get_for_loop(kind: str, factory: Callable[[], Any]) -> Any:
+    # Async HTTP / Mongo clients bind to the loop they first run on
+    loop = asyncio.get_running_loop()
+    with _lock:
+        per_loop = _async_clients.setdefault(kind, weakref.WeakKeyDictionary())
+        client = per_loop.get(loop)
+        if client is None:
+            client = per_loop[loop] = factory()
+            _created[kind] = _created.get(kind, 0) + 1
+    return client
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+    )
+
+
+def _mongo_kwargs() -> Dict[str, Any]:
+    return {
+        "maxPoolSize": MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": MONGODB_MIN_POOL_SIZE,
+        "connectTimeoutMS": MONGODB_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": MONGODB_SOCKET_TIMEOUT_MS,
+        "event_listeners": [_pool_listener],
+    }
+
+
+# ---- OPENAI ----
+def get_openai() -> OpenAI:
+    def factory() -> OpenAI:
+        return OpenAI(
+            api_key=_require_env("OPENAI_API_KEY", "OPENAI_API_KEY missing"),
+            timeout=OPENAI_TIMEOUT,
+            max_retries=OPENAI_MAX_RETRIES,
+            http_client=DefaultHttpxClient(limits=_http_limits()),
+        )
+
+    return _get("openai", factory)
+
+
+def get_async_openai() -> AsyncOpenAI:
+    def factory() -> AsyncOpenAI:
+        return AsyncOpenAI(
+            api_key=_require_env("OPENAI_API_KEY", "OPENAI_API_KEY missing"),
+            timeout=OPENAI_TIMEOUT,
+            max_retries=OPENAI_MAX_RETRIES,
+            http_client=DefaultAsyncHttpxClient(limits=_http_limits()),
+        )
+
+    return _get_for_loop("async_openai", factory)
+
+
+# ---- TAVILY ----
+def get_tavily() -> TavilyClient:
+    def factory() -> TavilyClient:
+        api_key = _require_env("TAVILY_API_KEY", "TAVILY_API_KEY not set")
+        try:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_maxsize=HTTP_MAX_CONNECTIONS))
+            return TavilyClient(api_key=api_key, session=session)
+        except TypeError:  # older tavily-python without `session=`
+            return TavilyClient(api_key=api_key)
+
+    return _get("tavily", factory)
+
+
+def get_async_tavily() -> AsyncTavilyClient:
+    def factory() -> AsyncTavilyClient:
+        api_key = _require_env("TAVILY_API_KEY", "TAVILY_API_KEY not set")
+        try:
+            http_client = httpx.AsyncClient(
+                base_url="https://api.tavily.com",
+                limits=_http_limits(),
+                timeout=httpx.Timeout(60.0),
+            )
+            client = AsyncTavilyClient(api_key=api_key, client=http_client)
+            # Tavily's close() leaves a caller-supplied httpx client open
+            client._owned_http = http_client
+            return client
+        except TypeError:  # older tavily-python without `client=`
+            return AsyncTavilyClient(api_key=api_key)
+
+    return _get_for_loop("async_tavily", factory)
+
+
+# ---- MONGODB ----
+def get_mongo() -> MongoClient:
+    def factory() -> MongoClient:
+        uri = _require_env("MONGODB_URI", "MONGODB_URI not set in .env")
+        return MongoClient(uri, **_mongo_kwargs())
+
+    return _get("mongo", factory)
+
+
+def get_async_mongo():
+    """
+    Async PyMongo client, or None when the installed driver has no
+    asyncio support (callers then use `get_mongo` on the blocking pool).
+    """
+    if AsyncMongoClient is None:
+        return None
+
+    def factory():
+        uri = _require_env("MONGODB_URI", "MONGODB_URI not set in .env")
+        return AsyncMongoClient(uri, **_mongo_kwargs())
+
+    return _get_for_loop("async_mongo", factory)
+
+
+# ---- LIFECYCLE ----
+def reset_clients() -> None:
+    """
+    Forget every cached client. Runs automatically in forked children.
+    """
+    global _lock, _pool_listener
+    # The parent's lock may have been held mid-fork; start fresh.
+    _lock = threading.Lock()
+    _clients.clear()
+    _async_clients.clear()
+    _created.clear()
+    _pool_listener = _PoolListener()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_clients)
+
+
+async def aclose_loop_clients() -> None:
+    """
+    Close the async clients bound to the running loop (call it before a
+    short-lived loop ends, or their sockets leak).
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        bound = [per_loop.pop(loop) for per_loop in _async_clients.values() if loop in per_loop]
+    for client in bound:
+        for closer in (getattr(client, "close", None), getattr(getattr(client, "_owned_http", None), "aclose", None)):
+            if closer is None:
+                continue
+            result = closer()
+            if inspect.isawaitable(result):
+                await result
+
+
+def pool_stats() -> Dict[str, Any]:
+    with _lock:
+        live = sorted(_clients)
+        live_async = {kind: len(per_loop) for kind, per_loop in _async_clients.items()}
+        created = dict(_created)
+
+    with _pool_listener._lock:
+        mongo_events = dict(_pool_listener.counts)
+
+    return {
+        "pid": os.getpid(),
+        "clients": live,
+        "async_clients_per_loop": live_async,
+        "created": created,
+        "mongo": {
+            **mongo_events,
+            "in_use": mongo_events["checked_out"] - mongo_events["checked_in"],
+            "open": mongo_events["created"] - mongo_events["closed"],
+            "max_pool_size": MONGODB_MAX_POOL_SIZE,
+            "min_pool_size": MONGODB_MIN_POOL_SIZE,
+        },
+        "http": {
+            "max_connections": HTTP_MAX_CONNECTIONS,
+            "max_keepalive": HTTP_MAX_KEEPALIVE,
+            "openai_timeout": OPENAI_TIMEOUT,
+            "openai_max_retries": OPENAI_MAX_RETRIES,
+        },
+    }
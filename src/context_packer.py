@@ -0,0 +1,126 @@
+# src/context_packer.py
+"""
+Pack Tavily research into a compact, token-budgeted prompt context.
+
+Only what the model uses survives (facet answer, result title / url /
+content), serialized without whitespace. If the result is still over
+budget, the lowest-scored Tavily results are dropped first.
+"""
+import json
+import math
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "4000"))
+# Per-result content clip, applied before budgeting
+CONTEXT_MAX_CONTENT_CHARS = int(os.getenv("CONTEXT_MAX_CONTENT_CHARS", "1500"))
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "o200k_base")
+
+_RESULT_FIELDS = ("title", "url", "content")
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder():
+    # tiktoken is optional (and may need to download its BPE file);
+    # fall back to the ~4 chars/token rule of thumb.
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            try:
+                import tiktoken
+
+                _encoder = tiktoken.get_encoding(CONTEXT_TOKENIZER)
+            except Exception:
+                _encoder = False
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    encoder = _get_encoder()
+    if encoder:
+        return len(encoder.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+def _compact(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _clip(text: Optional[str], limit: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[: limit - 1].rstrip() + "…"
+
+
+def _slim_facet(facet: Dict[str, Any], max_chars: int) -> Tuple[Dict[str, Any], List[float]]:
+    slim: Dict[str, Any] = {}
+    if facet.get("answer"):
+        slim["answer"] = _clip(facet["answer"], max_chars)
+    results, scores = [], []
+    for result in facet.get("results") or []:
+        item = {f: result[f] for f in _RESULT_FIELDS if result.get(f)}
+        if "content" in item:
+            item["content"] = _clip(item["content"], max_chars)
+        results.append(item)
+        scores.append(float(result.get("score") or 0.0))
+    slim["results"] = results
+    return slim, scores
+
+
+def pack_research(
+    tavily_raw: Dict[str, Any],
+    token_budget: Optional[int] = None,
+    max_content_chars: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Returns {"context": compact JSON string, "stats": {...}} where stats
+    has tokens_before (the old indent=2 dump), tokens_after, budget,
+    results_kept and results_dropped.
+    """
+    budget = token_budget or CONTEXT_TOKEN_BUDGET
+    max_chars = max_content_chars or CONTEXT_MAX_CONTENT_CHARS
+    tokens_before = count_tokens(json.dumps(tavily_raw, indent=2))
+
+    packed: Dict[str, Any] = {}
+    ranked = []  # (score, facet, position)
+    for name, facet in (tavily_raw or {}).items():
+        slim, scores = _slim_facet(facet or {}, max_chars)
+        packed[name] = slim
+        ranked.extend((score, name, i) for i, score in enumerate(scores))
+    ranked.sort()
+
+    context = _compact(packed)
+    tokens = count_tokens(context)
+    dropped = set()
+    # Per-result cost is additive in compact JSON (+1 for the comma), so
+    # estimate the drop set first, then confirm with an exact count.
+    while tokens > budget and len(dropped) < len(ranked):
+        for score, name, i in ranked:
+            if tokens <= budget:
+                break
+            if (name, i) in dropped:
+                continue
+            dropped.add((name, i))
+            tokens -= count_tokens(_compact(packed[name]["results"][i])) + 1
+        pruned = {
+            name: dict(
+                facet,
+                results=[r for i, r in enumerate(facet["results"]) if (name, i) not in dropped],
+            )
+            for name, facet in packed.items()
+        }
+        context = _compact(pruned)
+        tokens = count_tokens(context)
+
+    return {
+        "context": context,
+        "stats": {
+            "tokens_before": tokens_before,
+            "tokens_after": tokens,
+            "budget": budget,
+            "results_kept": len(ranked) - len(dropped),
+            "results_dropped": len(dropped),
+        },
+    }
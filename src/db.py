@@ -1,40 +1,125 @@
 # src/db.py
+import asyncio
+import itertools
+import json
 import os
-from pymongo import MongoClient
-from openai import OpenAI
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
 import numpy as np
 
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from . import clients
+from .async_utils import run_blocking
+from .blob_store import (
+    BLOB_COLLECTION,
+    BLOB_FIELDS,
+    STRATEGY_PREVIEW_CHARS,
+    blob_fields,
+    blob_projection,
+    get_local_blob_store,
+    is_split,
+    preview,
+    split_doc,
+    split_storage,
+    unpack_blob,
+)
+from .dedup import (
+    DEDUP_CANDIDATES,
+    STRATEGY_DEDUP_SCOPE,
+    STRATEGY_DEDUP_THRESHOLD,
+    best_match,
+    check_mode,
+    dedup_enabled,
+    dedup_report,
+    leader_clusters,
+    link_duplicate,
+    record_check,
+    scope_filters,
+    scope_key,
+)
+from .embeddings import embed_texts, embed_texts_async
+from .lexical_index import get_lexical_index, reciprocal_rank_fusion
+from .local_index import get_local_index, use_local_backend
+from .mmr import MMR_CANDIDATE_FACTOR, MMR_VECTOR_DIMS, mmr, mmr_enabled, mmr_prefix
+from .quantization import (
+    STORAGE_FORMATS,
+    from_bson_vector,
+    from_float32_blob,
+    normalize,
+    rescore,
+    to_bson_vector,
+    to_float32_blob,
+)
+from .search_filters import (
+    matcher,
+    normalize_filters,
+    normalize_tags,
+    num_candidates,
+    parse_datetime,
+    to_mongo_filter,
+    vector_search_stage,
+)
+from .strategy_schema import STRATEGY_INPUT_FIELDS
+
 def get_mongo_client():
-    uri = os.getenv("MONGODB_URI")
-    if not uri:
-        raise RuntimeError("MONGODB_URI not set in .env")
-    return MongoClient(uri)
+    return clients.get_mongo()
 
 def get_openai():
-    key = os.getenv("OPENAI_API_KEY")
-    if not key:
-        raise RuntimeError("OPENAI_API_KEY missing")
-    return OpenAI(api_key=key)
+    return clients.get_openai()
+
+
+def get_async_mongo_client():
+    return clients.get_async_mongo()
 
 # ---- VECTOR ENCODER ----
-def embed_text(text: str) -> list:
-    client = get_openai()
-    resp = client.embeddings.create(
-        model="text-embedding-3-large",
-        input=text,
+EMBED_MODEL = "text-embedding-3-large"
+EMBED_FULL_DIMENSIONS = 3072
+# Shortened (Matryoshka) size requested from the API; the vector index
+# definition's numDimensions must match.
+EMBED_DIMENSIONS = int(os.getenv("STRATEGY_EMBED_DIMENSIONS", str(EMBED_FULL_DIMENSIONS)))
+# array (legacy list of doubles) | float32 | int8 | binary
+VECTOR_STORAGE = os.getenv("STRATEGY_VECTOR_STORAGE", "array").lower()
+# Quantized search over-fetches this many candidates per result, then
+# rescores them against the float32 copy in `vector_full`. That copy is
+# full-size (4 bytes per dimension) in every document; 1 disables both.
+RESCORE_FACTOR = int(os.getenv("STRATEGY_RESCORE_FACTOR", "4"))
+
+if VECTOR_STORAGE not in STORAGE_FORMATS:
+    raise ValueError(
+        f"STRATEGY_VECTOR_STORAGE={VECTOR_STORAGE!r}; expected one of {STORAGE_FORMATS}"
     )
-    return resp.data[0].embedding
 
-# ---- SAVE STRATEGY ----
-def save_strategy_to_db(strategy: dict):
-    client = get_mongo_client()
-    db = client["ai_product_strategist"]
-    col = db["strategies"]
 
-    text = strategy.get("strategy_markdown", "")
-    vector = embed_text(text)
+def _embed_dimensions():
+    # None keeps the cache key of the default full-size embeddings
+    return EMBED_DIMENSIONS if EMBED_DIMENSIONS != EMBED_FULL_DIMENSIONS else None
+
+
+def _rescoring() -> bool:
+    return VECTOR_STORAGE in ("int8", "binary") and RESCORE_FACTOR > 1
+
 
-    doc = {
+def embed_text(text: str) -> list:
+    # Cached + coalesced; BSON wants a plain list
+    return embed_texts([text], model=EMBED_MODEL, dimensions=_embed_dimensions())[0].tolist()
+
+
+async def embed_text_async(text: str) -> list:
+    vectors = await embed_texts_async(
+        [text], model=EMBED_MODEL, dimensions=_embed_dimensions()
+    )
+    return vectors[0].tolist()
+
+
+# ---- SAVE STRATEGY ----
+def _build_strategy_doc(strategy: dict, text: str, vector: list) -> dict:
+    return {
         "product_name": strategy.get("product_name"),
         "target_users": strategy.get("target_users"),
         "goal": strategy.get("goal"),
@@ -45,70 +130,1464 @@ def save_strategy_to_db(strategy: dict):
         "tavily_raw": strategy.get("tavily_raw"),
         # NEW: store the structured strategy JSON if provided
         "strategy_json": strategy.get("strategy_json"),
+        # Refinements are saved as new versions linked to their parent
+        "extra_instructions": strategy.get("extra_instructions", ""),
+        "parent_id": strategy.get("parent_id"),
+        "version": strategy.get("version", 1),
+        # Search filter fields (see search_filters.py)
+        "tags": normalize_tags(strategy.get("tags")),
+        "created_at": parse_datetime(strategy.get("created_at")) or datetime.now(timezone.utc),
     }
 
-    col.insert_one(doc)
-    return {"status": "ok", "inserted": True}
 
+def _encode_vectors(doc: dict) -> dict:
+    """
+    Swap the raw float list for the configured storage layout. Quantized
+    layouts also keep a float32 blob (not indexed) for rescoring.
+    """
+    vector = doc["vector"]
+    doc = dict(doc, vector=to_bson_vector(vector, VECTOR_STORAGE))
+    if _rescoring():
+        doc["vector_full"] = to_float32_blob(vector)
+    return doc
 
-# ---- VECTOR SEARCH ----
-# def search_similar_strategies(query: str, top_k: int = 3):
-#     client = get_mongo_client()
-#     db = client["ai_product_strategist"]
-#     col = db["strategies"]
-
-#     query_vec = embed_text(query)
-
-#     results = col.aggregate([
-#         {
-#             "$vectorSearch": {
-#                 "queryVector": query_vec,
-#                 "path": "vector",
-#                 "numCandidates": 50,
-#                 "limit": top_k,
-#                 "index": "vector_index"
-#             }
-#         },
-#         {
-#             "$project": {
-#                 "product_name": 1,
-#                 "score": {"$meta": "vectorSearchScore"},
-#                 "strategy_markdown": 1
-#             }
-#         }
-#     ])
-
-#     for r in results:
-#         if "_id" in r:
-#             r["_id"] = str(r["_id"])
-
-#     return results
-def search_similar_strategies(query: str, top_k: int = 3):
-    client = get_mongo_client()
-    db = client["ai_product_strategist"]
+
+def _local_strategies():
+    return get_local_index("strategies", EMBED_DIMENSIONS)
+
+
+def _save_local(doc: dict, doc_id: str = None) -> dict:
+    # Offline backend: vector into the memmap, everything else as payload
+    doc_id = doc_id or str(ObjectId())
+    if split_storage():
+        doc, blob = split_doc(doc)
+        get_local_blob_store().put(doc_id, blob)
+    payload = {k: v for k, v in doc.items() if k != "vector"}
+    _local_strategies().add([doc_id], np.asarray([doc["vector"]]), [payload])
+    return {"status": "ok", "inserted": True, "backend": "local", "id": doc_id}
+
+
+def _stored_docs(doc: dict, doc_id: ObjectId) -> tuple:
+    """
+    (strategy document, blob document or None) as written to Mongo. The
+    blob goes in first so a strategy never points at a missing blob.
+    """
+    # Queued docs went through JSON; filters need a real BSON date.
+    # saved_at is stamped just before the insert: the BM25 top-up follows
+    # it, since ObjectIds are assigned earlier and can land out of order.
+    doc = dict(doc, created_at=parse_datetime(doc.get("created_at")), saved_at=datetime.now(timezone.utc))
+    if not split_storage():
+        return dict(_encode_vectors(doc), _id=doc_id), None
+    slim, blob = split_doc(doc)
+    return dict(_encode_vectors(slim), _id=doc_id), dict(blob, _id=doc_id)
+
+
+def save_strategy_to_db(strategy: dict):
+    """
+    Embed and insert one strategy. A near-duplicate of a stored strategy
+    is linked to it first (see dedup.py); the status then carries
+    `duplicate_of` or `supersedes` and the similarity.
+    """
+    text = strategy.get("strategy_markdown", "")
+    vector = embed_text(text)
+
+    doc = _build_strategy_doc(strategy, text, vector)
+    doc_id = ObjectId()
+    doc, match, superseded = _deduplicated(doc, str(doc_id))
+
+    if use_local_backend():
+        status = _save_local(doc, str(doc_id))
+    else:
+        client = get_mongo_client()
+        db = client["ai_product_strategist"]
+        col = db["strategies"]
+
+        doc, blob = _stored_docs(doc, doc_id)
+        if blob is not None:
+            db[BLOB_COLLECTION].insert_one(blob)
+        inserted = col.insert_one(doc)
+        status = {"status": "ok", "inserted": True, "id": str(inserted.inserted_id)}
+    if superseded:
+        _mark_duplicates({match["id"]: superseded})
+    return dict(status, **dedup_report(match))
+
+
+async def save_strategy_to_db_async(strategy: dict):
+    """
+    Non-blocking save: AsyncOpenAI for the embedding, the async PyMongo
+    client for the insert (or the bounded blocking pool on old drivers).
+    """
+    text = strategy.get("strategy_markdown", "")
+    vector = await embed_text_async(text)
+    doc = _build_strategy_doc(strategy, text, vector)
+    doc_id = ObjectId()
+    doc, match, superseded = await _deduplicated_async(doc, str(doc_id))
+
+    if use_local_backend():
+        status = await run_blocking(_save_local, doc, str(doc_id))
+        if superseded:
+            await run_blocking(_mark_duplicates, {match["id"]: superseded})
+        return dict(status, **dedup_report(match))
+
+    doc, blob = _stored_docs(doc, doc_id)
+    async_client = get_async_mongo_client()
+    if async_client is None:
+        db = get_mongo_client()["ai_product_strategist"]
+        if blob is not None:
+            await run_blocking(db[BLOB_COLLECTION].insert_one, blob)
+        inserted = await run_blocking(db["strategies"].insert_one, doc)
+        if superseded:
+            await run_blocking(_mark_duplicates, {match["id"]: superseded})
+    else:
+        db = async_client["ai_product_strategist"]
+        if blob is not None:
+            await db[BLOB_COLLECTION].insert_one(blob)
+        inserted = await db["strategies"].insert_one(doc)
+        if superseded:
+            await db["strategies"].update_one({"_id": ObjectId(match["id"])}, {"$set": superseded})
+            _forget_duplicate_ids()
+    status = {"status": "ok", "inserted": True, "id": str(inserted.inserted_id)}
+    return dict(status, **dedup_report(match))
+
+
+def prepare_strategy_doc(strategy: dict) -> dict:
+    """
+    The stored document minus its vector, which is added at insert time.
+    """
+    doc = _build_strategy_doc(strategy, strategy.get("strategy_markdown", ""), None)
+    doc.pop("vector")
+    return doc
+
+
+def insert_strategy_batch(docs: list) -> None:
+    """
+    Embed and insert prepared strategy docs (`_build_strategy_doc` output
+    with a client-side "_id" string and no vector) in one batch. Idempotent:
+    ids that are already stored are skipped, so replays are safe.
+    Near-duplicates are linked as in `save_strategy_to_db`, including
+    duplicates within the batch.
+    """
+    if not docs:
+        return
+    vectors = embed_texts(
+        [doc.get("strategy_markdown") or "" for doc in docs],
+        model=EMBED_MODEL,
+        dimensions=_embed_dimensions(),
+    )
+
+    if use_local_backend():
+        local = _local_strategies()
+        fresh = [(doc, vec) for doc, vec in zip(docs, vectors) if doc["_id"] not in local.docs]
+        if not fresh:
+            return
+        linked, superseded = _deduplicated_batch(
+            [{k: v for k, v in doc.items() if k != "_id"} for doc, _ in fresh],
+            [doc["_id"] for doc, _ in fresh],
+            np.stack([vec for _, vec in fresh]),
+        )
+        for doc_id, doc in linked:
+            _save_local(doc, doc_id)
+        _mark_duplicates(superseded)
+        return
+
+    db = get_mongo_client()["ai_product_strategist"]
+    linked, superseded = _deduplicated_batch(
+        [{k: v for k, v in doc.items() if k != "_id"} for doc in docs],
+        [doc["_id"] for doc in docs],
+        vectors,
+    )
+    stored = [_stored_docs(doc, ObjectId(doc_id)) for doc_id, doc in linked]
+    blobs = [blob for _, blob in stored if blob is not None]
+    if blobs:
+        _insert_many_idempotent(db[BLOB_COLLECTION], blobs)
+    _insert_many_idempotent(db["strategies"], [doc for doc, _ in stored])
+    _mark_duplicates(superseded)
+
+
+def _insert_many_idempotent(col, docs: list) -> None:
+    try:
+        col.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        # Duplicate _id means an earlier attempt landed; anything else is real
+        if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+            raise
+        if e.details.get("writeConcernErrors"):
+            raise
+
+
+# Vectors are only needed by search
+_NO_VECTORS = {"vector": 0, "vector_full": 0}
+
+
+def _strategy_projection(wanted: tuple) -> dict:
+    # Inline (pre-split) docs still carry the bulky fields; drop unrequested ones
+    return dict(_NO_VECTORS, **{f: 0 for f in BLOB_FIELDS if f not in wanted})
+
+
+def _loaded(doc: dict, doc_id: str, wanted: tuple, blob) -> dict:
+    doc = {k: v for k, v in doc.items() if k not in BLOB_FIELDS or k in wanted}
+    if is_split(doc):
+        doc.update(unpack_blob(blob, wanted))
+    doc.pop("_id", None)
+    doc["id"] = doc_id
+    return doc
+
+
+def get_strategy(doc_id: str, fields=None):
+    """
+    Load one saved strategy (without vectors) by id, or None. Bulky fields
+    (`BLOB_FIELDS`) are only loaded when listed in `fields` ("all" for
+    every one of them).
+    """
+    wanted = blob_fields(fields)
+    if use_local_backend():
+        doc = _local_strategies().docs.get(doc_id)
+        if doc is None:
+            return None
+        blob = get_local_blob_store().get(doc_id) if wanted and is_split(doc) else None
+        return _loaded(doc, doc_id, wanted, blob)
+
+    db = get_mongo_client()["ai_product_strategist"]
+    doc = db["strategies"].find_one({"_id": ObjectId(doc_id)}, _strategy_projection(wanted))
+    if doc is None:
+        return None
+    blob = None
+    if wanted and is_split(doc):
+        blob = db[BLOB_COLLECTION].find_one({"_id": doc["_id"]}, blob_projection(wanted))
+    return _loaded(doc, doc_id, wanted, blob)
+
+
+async def get_strategy_async(doc_id: str, fields=None):
+    if use_local_backend():
+        return await run_blocking(get_strategy, doc_id, fields)
+
+    async_client = get_async_mongo_client()
+    if async_client is None:
+        return await run_blocking(get_strategy, doc_id, fields)
+    wanted = blob_fields(fields)
+    db = async_client["ai_product_strategist"]
+    doc = await db["strategies"].find_one({"_id": ObjectId(doc_id)}, _strategy_projection(wanted))
+    if doc is None:
+        return None
+    blob = None
+    if wanted and is_split(doc):
+        blob = await db[BLOB_COLLECTION].find_one({"_id": doc["_id"]}, blob_projection(wanted))
+    return _loaded(doc, doc_id, wanted, blob)
+
+
+# ---- BATCH FETCH ----
+_SUMMARY_FIELDS = STRATEGY_INPUT_FIELDS + ("extra_instructions", "parent_id", "version", "preview")
+# Named field sets for batch fetches; paths into strategy_json are dotted
+STRATEGY_VIEWS = {
+    "summary": _SUMMARY_FIELDS,
+    "roadmap": _SUMMARY_FIELDS + ("strategy_json.prioritized_features", "strategy_json.three_month_roadmap"),
+    "full": _SUMMARY_FIELDS + BLOB_FIELDS,
+}
+# Most ids accepted by one batch fetch
+STRATEGY_FETCH_MAX_IDS = int(os.getenv("STRATEGY_FETCH_MAX_IDS", "200"))
+# Strategy docs hydrated (and their blobs fetched) per round trip
+_FETCH_BATCH = 100
+_MISSING = object()
+
+
+def resolve_fields(view: str = "summary", fields=None) -> tuple:
+    """
+    Field paths to return: `fields` (list or comma string) when given,
+    otherwise the named view.
+    """
+    if fields:
+        paths = fields.split(",") if isinstance(fields, str) else list(fields)
+        paths = [p.strip() for p in paths if p.strip()]
+    elif view in STRATEGY_VIEWS:
+        paths = list(STRATEGY_VIEWS[view])
+    else:
+        raise ValueError(f"Unknown view {view!r}; expected one of {tuple(STRATEGY_VIEWS)}")
+    hidden = [p for p in paths if p.split(".")[0] in ("_id", "blob_fields", *_NO_VECTORS)]
+    if hidden:
+        raise ValueError(f"Fields {hidden} cannot be fetched")
+    return tuple(dict.fromkeys(paths))
+
+
+def _get_path(doc, keys: list):
+    for key in keys:
+        if not isinstance(doc, dict) or key not in doc:
+            return _MISSING
+        doc = doc[key]
+    return doc
+
+
+def project_fields(doc: dict, paths) -> dict:
+    """
+    Copy only `paths` (e.g. "goal", "strategy_json.prds") out of a loaded
+    strategy; absent paths are left out.
+    """
+    out = {}
+    for path in paths:
+        keys = path.split(".")
+        value = _get_path(doc, keys)
+        if value is _MISSING:
+            continue
+        target = out
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        target[keys[-1]] = value
+    return out
+
+
+def _blob_tops(paths) -> tuple:
+    # Bulky top-level fields the paths reach into
+    return blob_fields({p.split(".")[0] for p in paths if p.split(".")[0] in BLOB_FIELDS})
+
+
+def _batch_projection(paths) -> dict:
+    projection = {"blob_fields": 1}
+    for path in paths:
+        # Mongo rejects a path together with its parent
+        if any(path.startswith(other + ".") for other in paths):
+            continue
+        projection[path] = _PREVIEW_FIELD if path == "preview" else 1
+    return projection
+
+
+def _projected(doc: dict, doc_id: str, paths, tops: tuple, blob) -> dict:
+    doc = dict(doc)
+    if is_split(doc):
+        doc.update(unpack_blob(blob, tops))
+    if "preview" not in doc:
+        doc["preview"] = preview(doc.get("strategy_markdown"))
+    return dict(project_fields(doc, paths), id=doc_id)
+
+
+class _InOrder:
+    """
+    Re-sequences docs arriving in any order into the requested id order,
+    releasing each one as soon as everything before it is known.
+    """
+
+    def __init__(self, ids: list):
+        self.ids = ids
+        self.pos = 0
+        self.found = {}
+
+    def _ready(self, done: bool):
+        while self.pos < len(self.ids):
+            doc_id = self.ids[self.pos]
+            if doc_id in self.found:
+                yield dict(self.found[doc_id])
+            elif not ObjectId.is_valid(doc_id):
+                yield {"id": doc_id, "error": "invalid id"}
+            elif done:
+                yield {"id": doc_id, "error": "not found"}
+            else:
+                return
+            self.pos += 1
+
+    def push(self, docs: list):
+        self.found.update((doc["id"], doc) for doc in docs)
+        return self._ready(False)
+
+    def finish(self):
+        return self._ready(True)
+
+
+def _check_ids(ids: list) -> None:
+    if len(ids) > STRATEGY_FETCH_MAX_IDS:
+        raise ValueError(f"{len(ids)} ids requested; at most {STRATEGY_FETCH_MAX_IDS} per call")
+
+
+def _batch_query(ids: list) -> dict:
+    unique = dict.fromkeys(i for i in ids if ObjectId.is_valid(i))
+    return {"_id": {"$in": [ObjectId(i) for i in unique]}}
+
+
+def _hydrate_batch(db, docs: list, paths, tops: tuple) -> list:
+    split_ids = [doc["_id"] for doc in docs if tops and is_split(doc)]
+    blobs = {}
+    if split_ids:
+        found = db[BLOB_COLLECTION].find({"_id": {"$in": split_ids}}, blob_projection(tops))
+        blobs = {blob["_id"]: blob for blob in found}
+    return [_projected(doc, str(doc["_id"]), paths, tops, blobs.get(doc["_id"])) for doc in docs]
+
+
+def iter_strategies(ids: list, view: str = "summary", fields=None):
+    """
+    Yield one entry per id, in the order given: the strategy projected to
+    the view / fields plus its "id", or {"id", "error"}. Mongo is read with
+    one `$in` query and server-side projection (plus one `$in` on the blobs
+    per batch when bulky fields are asked for); entries are yielded as soon
+    as every earlier id has been resolved.
+    """
+    _check_ids(ids)
+    paths = resolve_fields(view, fields)
+    tops = _blob_tops(paths)
+    if use_local_backend():
+        docs = _local_strategies().docs
+        for doc_id in ids:
+            doc = docs.get(doc_id)
+            if doc is None:
+                yield {"id": doc_id, "error": "not found"}
+                continue
+            blob = get_local_blob_store().get(doc_id) if tops and is_split(doc) else None
+            yield _projected(doc, doc_id, paths, tops, blob)
+        return
+
+    db = get_mongo_client()["ai_product_strategist"]
+    ordered = _InOrder(ids)
+    query = _batch_query(ids)
+    if query["_id"]["$in"]:
+        cursor = iter(db["strategies"].find(query, _batch_projection(paths)).batch_size(_FETCH_BATCH))
+        while True:
+            batch = [doc for _, doc in zip(range(_FETCH_BATCH), cursor)]
+            if not batch:
+                break
+            yield from ordered.push(_hydrate_batch(db, batch, paths, tops))
+    yield from ordered.finish()
+
+
+async def _hydrate_batch_async(db, docs: list, paths, tops: tuple) -> list:
+    split_ids = [doc["_id"] for doc in docs if tops and is_split(doc)]
+    blobs = {}
+    if split_ids:
+        cursor = db[BLOB_COLLECTION].find({"_id": {"$in": split_ids}}, blob_projection(tops))
+        blobs = {blob["_id"]: blob async for blob in cursor}
+    return [_projected(doc, str(doc["_id"]), paths, tops, blobs.get(doc["_id"])) for doc in docs]
+
+
+async def iter_strategies_async(ids: list, view: str = "summary", fields=None):
+    """
+    Async `iter_strategies`.
+    """
+    async_client = None if use_local_backend() else get_async_mongo_client()
+    if async_client is None:
+        for entry in await run_blocking(lambda: list(iter_strategies(ids, view, fields))):
+            yield entry
+        return
+
+    _check_ids(ids)
+    paths = resolve_fields(view, fields)
+    tops = _blob_tops(paths)
+    db = async_client["ai_product_strategist"]
+    ordered = _InOrder(ids)
+    query = _batch_query(ids)
+    if query["_id"]["$in"]:
+        batch = []
+        async for doc in db["strategies"].find(query, _batch_projection(paths)).batch_size(_FETCH_BATCH):
+            batch.append(doc)
+            if len(batch) == _FETCH_BATCH:
+                for entry in ordered.push(await _hydrate_batch_async(db, batch, paths, tops)):
+                    yield entry
+                batch = []
+        if batch:
+            for entry in ordered.push(await _hydrate_batch_async(db, batch, paths, tops)):
+                yield entry
+    for entry in ordered.finish():
+        yield entry
+
+
+# ---- STORAGE LAYOUT ----
+def migrate_to_split_storage(batch_size: int = 100) -> dict:
+    """
+    Move the bulky fields of strategies saved inline into blobs. Safe to
+    re-run or interrupt: only docs without `blob_fields` are touched, and
+    each blob is written before its fields are unset.
+    """
+    if use_local_backend():
+        return {"status": "skipped", "reason": "local payloads are append-only; re-index instead"}
+
+    db = get_mongo_client()["ai_product_strategist"]
     col = db["strategies"]
+    inline = {"blob_fields": {"$exists": False}}
+    moved = raw_bytes = stored_bytes = 0
+    while True:
+        docs = list(col.find(inline, {f: 1 for f in BLOB_FIELDS}).limit(batch_size))
+        if not docs:
+            break
+        for doc in docs:
+            slim, blob = split_doc(doc)
+            db[BLOB_COLLECTION].replace_one({"_id": doc["_id"]}, blob, upsert=True)
+            col.update_one(
+                {"_id": doc["_id"]},
+                {
+                    "$set": {"preview": slim["preview"], "blob_fields": slim["blob_fields"]},
+                    "$unset": {f: "" for f in BLOB_FIELDS},
+                },
+            )
+            moved += 1
+            raw_bytes += blob["raw_bytes"]
+            stored_bytes += blob["stored_bytes"]
+    return {"status": "ok", "moved": moved, "raw_bytes": raw_bytes, "stored_bytes": stored_bytes}
+
+
+def _collection_size(col) -> dict:
+    stats = next(col.aggregate([{"$collStats": {"storageStats": {}}}]), {}).get("storageStats", {})
+    return {
+        key: stats.get(key)
+        for key in ("count", "avgObjSize", "size", "storageSize", "totalIndexSize")
+    }
+
+
+def storage_stats() -> dict:
+    """
+    Sizes of the strategy documents and their blobs, for comparing the
+    inline and split layouts on real data.
+    """
+    if use_local_backend():
+        docs = _local_strategies().docs
+        store = get_local_blob_store()
+        blob_files = [e for e in os.scandir(store.directory) if e.name.endswith(".bson")]
+        return {
+            "backend": "local",
+            "strategies": {
+                "count": len(docs),
+                # What the process keeps in memory for payloads
+                "payload_bytes": sum(len(json.dumps(d, default=str)) for d in docs.values()),
+            },
+            BLOB_COLLECTION: {
+                "count": len(blob_files),
+                "size": sum(e.stat().st_size for e in blob_files),
+            },
+        }
+
+    db = get_mongo_client()["ai_product_strategist"]
+    return {
+        "backend": "atlas",
+        "strategies": dict(
+            _collection_size(db["strategies"]),
+            split=db["strategies"].count_documents({"blob_fields": {"$exists": True}}),
+        ),
+        BLOB_COLLECTION: _collection_size(db[BLOB_COLLECTION]),
+    }
+
+
+# ---- NEAR-DUPLICATES ----
+# Updates sent per bulk_write when marking duplicates
+_MARK_BATCH = 500
+
+
+def _hide_duplicates(filters: dict) -> bool:
+    return dedup_enabled() and not (filters or {}).get("include_duplicates")
+
+
+# A vector index created by hand from the README (path `vector` only) has
+# no filter fields, and Atlas rejects a $vectorSearch filter on them. Until
+# index_bootstrap has run, duplicates are dropped after the search instead;
+# the index is probed again every _INDEX_RECHECK seconds.
+_INDEX_RECHECK = 600
+_duplicate_filter = {"missing_since": None}
+# Unfiltered candidates fetched by the save-time check on such an index
+_DEDUP_UNFILTERED = 50
+
 
-    query_vec = embed_text(query)
+def _duplicate_filter_missing() -> bool:
+    since = _duplicate_filter["missing_since"]
+    return since is not None and time.monotonic() - since < _INDEX_RECHECK
 
-    results = col.aggregate([
+
+def _note_duplicate_filter(supported: bool) -> None:
+    _duplicate_filter["missing_since"] = None if supported else time.monotonic()
+
+
+def _stored_vector(doc: dict) -> np.ndarray:
+    # Full-precision copy when there is one (quantized layouts)
+    full = doc.get("vector_full")
+    return from_float32_blob(full) if full is not None else from_bson_vector(doc["vector"])
+
+
+def _dedup_pipeline(vector: list, filters: dict, unfiltered: bool = False) -> list:
+    # `unfiltered`: for an index without filter fields, scoped in Python (_in_scope)
+    limit = _DEDUP_UNFILTERED if unfiltered else DEDUP_CANDIDATES
+    return [
+        vector_search_stage(
+            to_bson_vector(vector, VECTOR_STORAGE),
+            path="vector",
+            limit=limit,
+            index=VECTOR_INDEX_NAME,
+            mongo_filter=None if unfiltered else to_mongo_filter(filters, hide_duplicates=True),
+            candidates=num_candidates(limit),
+        ),
         {
-            "$vectorSearch": {
-                "queryVector": query_vec,
-                "path": "vector",
-                "numCandidates": 50,
-                "limit": top_k,
-                "index": "vector_index"
+            "$project": {
+                "_id": 0,
+                "id": {"$toString": "$_id"},
+                "version": 1,
+                "vector": 1,
+                "vector_full": 1,
+                "product_name": 1,
+                "duplicate": 1,
             }
         },
+    ]
+
+
+def _in_scope(results: list, filters: dict) -> list:
+    keep = matcher(filters, hide_duplicates=True)
+    return [doc for doc in results if keep(doc)][:DEDUP_CANDIDATES]
+
+
+def _similarities(vector: list, results: list) -> list:
+    # Exact cosine; the index score is approximate for quantized layouts
+    query = normalize(np.asarray(vector, dtype=np.float32))
+    for doc in results:
+        doc["similarity"] = float(normalize(_stored_vector(doc)) @ query)
+        doc.pop("vector", None)
+        doc.pop("vector_full", None)
+    return results
+
+
+def _stored_candidates(vector: list, doc: dict) -> list:
+    """
+    Nearest visible strategies in the doc's dedup scope, as
+    {"id", "similarity", "version"}.
+    """
+    filters = normalize_filters(scope_filters(doc))
+    if use_local_backend():
+        index = _local_strategies()
+        hits = index.search(vector, DEDUP_CANDIDATES, filter_fn=matcher(filters, hide_duplicates=True))
+        # Local rows are normalised: the score already is the cosine
+        return [
+            {"id": doc_id, "similarity": score, "version": index.docs.get(doc_id, {}).get("version")}
+            for doc_id, score in hits
+        ]
+    col = get_mongo_client()["ai_product_strategist"]["strategies"]
+    if not _duplicate_filter_missing():
+        try:
+            return _similarities(vector, list(col.aggregate(_dedup_pipeline(vector, filters))))
+        except OperationFailure:
+            pass
+    results = list(col.aggregate(_dedup_pipeline(vector, filters, unfiltered=True)))
+    _note_duplicate_filter(False)
+    return _similarities(vector, _in_scope(results, filters))
+
+
+async def _stored_candidates_async(vector: list, doc: dict) -> list:
+    async_client = None if use_local_backend() else get_async_mongo_client()
+    if async_client is None:
+        return await run_blocking(_stored_candidates, vector, doc)
+    col = async_client["ai_product_strategist"]["strategies"]
+    filters = normalize_filters(scope_filters(doc))
+    if not _duplicate_filter_missing():
+        try:
+            cursor = await col.aggregate(_dedup_pipeline(vector, filters))
+            return _similarities(vector, await cursor.to_list())
+        except OperationFailure:
+            pass
+    cursor = await col.aggregate(_dedup_pipeline(vector, filters, unfiltered=True))
+    results = await cursor.to_list()
+    _note_duplicate_filter(False)
+    return _similarities(vector, _in_scope(results, filters))
+
+
+# parent_id hops followed when resolving a version lineage
+_LINEAGE_DEPTH = 50
+
+
+def _parent_ids(ids: list) -> dict:
+    """
+    {id: parent_id} of stored strategies (None for roots and unknown ids).
+    """
+    parents = dict.fromkeys(ids)
+    if use_local_backend():
+        docs = _local_strategies().docs
+        parents.update((i, docs[i].get("parent_id")) for i in ids if i in docs)
+        return parents
+    col = get_mongo_client()["ai_product_strategist"]["strategies"]
+    oids = [ObjectId(i) for i in ids if ObjectId.is_valid(i)]
+    parents.update((str(d["_id"]), d.get("parent_id")) for d in col.find({"_id": {"$in": oids}}, {"parent_id": 1}))
+    return parents
+
+
+def _lineage_roots(ids: list, parents: dict) -> dict:
+    """
+    {id: root of its parent_id chain}, one lookup per level. `parents`
+    holds the links of docs that are not stored yet.
+    """
+    parents = dict(parents)
+    heads = {i: i for i in ids}
+    for _ in range(_LINEAGE_DEPTH):
+        unknown = [h for h in set(heads.values()) if h not in parents]
+        if unknown:
+            parents.update(_parent_ids(unknown))
+        moved = {start: str(parents[head]) for start, head in heads.items() if parents.get(head)}
+        if not moved:
+            break
+        heads.update(moved)
+    return heads
+
+
+def _other_lineages(doc: dict, doc_id: str, candidates: list, parents: dict = None) -> list:
+    """
+    Candidates outside the doc's own version lineage: a refinement is
+    expected to be close to its parent and siblings, so it is never a
+    near-duplicate of them. Only candidates above the threshold are
+    resolved, so regular saves rarely pay for the lookups.
+    """
+    close = [c for c in candidates if c["id"] != doc_id and c["similarity"] >= STRATEGY_DEDUP_THRESHOLD]
+    if not close:
+        return []
+    known = dict(parents or {}, **{doc_id: doc.get("parent_id")})
+    roots = _lineage_roots([doc_id, *(c["id"] for c in close)], known)
+    return [c for c in close if roots[c["id"]] != roots[doc_id]]
+
+
+def _checked(doc_id: str, candidates: list, error=None, extra=()):
+    match = best_match([*candidates, *extra], doc_id)
+    record_check(match, error)
+    return match
+
+
+def _find_duplicate(vector: list, doc: dict, doc_id: str, extra=(), parents: dict = None):
+    """
+    Closest stored (or `extra`) strategy at or above the dedup threshold
+    and outside the doc's version lineage (`parents`: links of unsaved
+    batch mates), or None. A failing lookup is counted in dedup_stats
+    and the save goes ahead unchecked.
+    """
+    try:
+        candidates = _other_lineages(doc, doc_id, [*_stored_candidates(vector, doc), *extra], parents)
+        return _checked(doc_id, candidates)
+    except OperationFailure as e:
+        return _checked(doc_id, [], e)
+
+
+async def _find_duplicate_async(vector: list, doc: dict, doc_id: str):
+    try:
+        candidates = await _stored_candidates_async(vector, doc)
+        return _checked(doc_id, await run_blocking(_other_lineages, doc, doc_id, candidates))
+    except OperationFailure as e:
+        return _checked(doc_id, [], e)
+
+
+def _deduplicated(doc: dict, doc_id: str) -> tuple:
+    """
+    (doc to insert, match or None, fields to $set on the match or None).
+    """
+    if not dedup_enabled():
+        return doc, None, None
+    match = _find_duplicate(doc["vector"], doc, doc_id)
+    linked, superseded = link_duplicate(doc, match, doc_id)
+    return linked, match, superseded
+
+
+async def _deduplicated_async(doc: dict, doc_id: str) -> tuple:
+    if not dedup_enabled():
+        return doc, None, None
+    match = await _find_duplicate_async(doc["vector"], doc, doc_id)
+    linked, superseded = link_duplicate(doc, match, doc_id)
+    return linked, match, superseded
+
+
+def _deduplicated_batch(docs: list, ids: list, vectors) -> tuple:
+    """
+    ([(id, doc with vector)], {stored id: fields to $set}) for a batch.
+    Earlier docs of the batch are not indexed yet, so they are compared
+    in memory too.
+    """
+    unit = normalize(vectors)
+    linked, superseded = [], {}
+    for row, (doc_id, doc) in enumerate(zip(ids, docs)):
+        doc = dict(doc, vector=np.asarray(vectors[row]).tolist())
+        if not dedup_enabled():
+            linked.append((doc_id, doc))
+            continue
+        earlier = [
+            {"id": prev_id, "similarity": float(unit[row] @ unit[j]), "version": prev.get("version"), "row": j}
+            for j, (prev_id, prev) in enumerate(linked)
+            if not prev.get("duplicate") and scope_key(prev) == scope_key(doc)
+        ]
+        parents = {prev_id: prev.get("parent_id") for prev_id, prev in linked}
+        match = _find_duplicate(doc["vector"], doc, doc_id, earlier, parents)
+        doc, fields = link_duplicate(doc, match, doc_id)
+        if fields and "row" in match:
+            # Batch mate not stored yet: insert it already marked
+            mate_id, mate = linked[match["row"]]
+            linked[match["row"]] = (mate_id, dict(mate, **fields))
+        elif fields:
+            superseded[match["id"]] = fields
+        linked.append((doc_id, doc))
+    return linked, superseded
+
+
+def _mark_duplicates(marks: dict) -> None:
+    """
+    $set dedup fields on stored strategies ({id: fields}).
+    """
+    if not marks:
+        return
+    if use_local_backend():
+        local = _local_strategies()
+        for doc_id, fields in marks.items():
+            local.update(doc_id, fields)
+    else:
+        col = get_mongo_client()["ai_product_strategist"]["strategies"]
+        ops = [UpdateOne({"_id": ObjectId(doc_id)}, {"$set": fields}) for doc_id, fields in marks.items()]
+        for start in range(0, len(ops), _MARK_BATCH):
+            col.bulk_write(ops[start : start + _MARK_BATCH], ordered=False)
+    _forget_duplicate_ids()
+
+
+_duplicate_ids_cache = {"at": None, "ids": frozenset()}
+_duplicate_ids_lock = threading.Lock()
+
+
+def _forget_duplicate_ids() -> None:
+    with _duplicate_ids_lock:
+        _duplicate_ids_cache["at"] = None
+
+
+def _duplicate_ids() -> frozenset:
+    """
+    Ids hidden from search as near-duplicates (for the BM25 ranker, whose
+    index is append-only). Re-read from Atlas at most every
+    FILTER_COUNT_TTL seconds, or after this process marks new ones.
+    """
+    if use_local_backend():
+        return frozenset(i for i, doc in _local_strategies().docs.items() if doc.get("duplicate"))
+    with _duplicate_ids_lock:
+        at, ids = _duplicate_ids_cache["at"], _duplicate_ids_cache["ids"]
+    if at is not None and time.monotonic() - at < FILTER_COUNT_TTL:
+        return ids
+    col = get_mongo_client()["ai_product_strategist"]["strategies"]
+    ids = frozenset(str(doc["_id"]) for doc in col.find({"duplicate": True}, {"_id": 1}))
+    with _duplicate_ids_lock:
+        _duplicate_ids_cache.update(at=time.monotonic(), ids=ids)
+    return ids
+
+
+def _scope_groups():
+    """
+    (ids oldest first, vectors) of the visible strategies, one group per
+    dedup scope, so only one scope's vectors are in memory at a time.
+    """
+    if use_local_backend():
+        local = _local_strategies()
+        groups = {}
+        for doc_id in local.ids:
+            doc = local.docs.get(doc_id, {})
+            if not doc.get("duplicate"):
+                groups.setdefault(scope_key(doc), []).append(doc_id)
+        for ids in groups.values():
+            yield ids, local.get_vectors(ids)
+        return
+
+    col = get_mongo_client()["ai_product_strategist"]["strategies"]
+    cursor = col.find(
+        {"duplicate": {"$ne": True}}, {"product_name": 1, "vector": 1, "vector_full": 1}
+    ).sort("product_name" if STRATEGY_DEDUP_SCOPE == "product" else "_id", 1)
+    for _, docs in itertools.groupby(cursor, key=scope_key):
+        docs = sorted(docs, key=lambda d: d["_id"])
+        yield [str(d["_id"]) for d in docs], np.stack([_stored_vector(d) for d in docs])
+
+
+def compact_duplicates(mode: str = None, threshold: float = None, dry_run: bool = False) -> dict:
+    """
+    Offline dedup of stored strategies. Within each dedup scope, runs at
+    or above `threshold` cosine are greedily clustered; each cluster keeps
+    one canonical doc (the oldest for mode "mark", the newest for
+    "version") and the rest are marked `duplicate_of` it, except versions
+    of the canonical doc's own lineage. Existing parent / version links
+    are left alone. Safe to re-run; `dry_run`
+    only reports.
+    """
+    mode = check_mode(mode)
+    threshold = STRATEGY_DEDUP_THRESHOLD if threshold is None else threshold
+    scanned, clusters, marks = 0, [], {}
+    for ids, vectors in _scope_groups():
+        scanned += len(ids)
+        if mode == "version":
+            ids, vectors = ids[::-1], vectors[::-1]
+        unit = normalize(vectors)
+        clustered = leader_clusters(unit, threshold)
+        roots = _lineage_roots([ids[i] for cluster in clustered for i in cluster], {}) if clustered else {}
+        for leader, *members in clustered:
+            # Versions of one lineage are refinements, not duplicates
+            members = [m for m in members if roots[ids[m]] != roots[ids[leader]]]
+            if not members:
+                continue
+            clusters.append({"keep": ids[leader], "duplicates": [ids[m] for m in members]})
+            for m in members:
+                marks[ids[m]] = {
+                    "duplicate": True,
+                    "duplicate_of": ids[leader],
+                    "similarity": round(float(unit[m] @ unit[leader]), 4),
+                }
+    if not dry_run:
+        _mark_duplicates(marks)
+    return {
+        "status": "ok",
+        "mode": mode,
+        "threshold": threshold,
+        "dry_run": dry_run,
+        "scanned": scanned,
+        "clusters": len(clusters),
+        "marked": len(marks),
+        "sample": clusters[:10],
+    }
+
+
+# ---- VECTOR SEARCH ----
+# Search results carry a short preview, not the full markdown; docs saved
+# before split storage are cut down to the same length server-side.
+_PREVIEW_FIELD = {
+    "$ifNull": [
+        "$preview",
+        {"$substrCP": [{"$ifNull": ["$strategy_markdown", ""]}, 0, STRATEGY_PREVIEW_CHARS]},
+    ]
+}
+
+
+VECTOR_INDEX_NAME = "vector_index"
+# How long filter match counts (for numCandidates sizing) are reused
+FILTER_COUNT_TTL = float(os.getenv("FILTER_COUNT_TTL", "60"))
+
+
+def _vector_limit(top_k: int) -> int:
+    return top_k * RESCORE_FACTOR if _rescoring() else top_k
+
+
+def _exact_scores() -> bool:
+    # Scores computed here rather than taken from the index: quantized hits
+    # are rescored, and binary vectors live in a euclidean index
+    return _rescoring() or VECTOR_STORAGE == "binary"
+
+
+def _search_plan(top_k: int, counts) -> dict:
+    """
+    numCandidates from the filter's selectivity; `exact` for small match sets.
+    """
+    matched, total = counts if counts else (None, None)
+    candidates = num_candidates(_vector_limit(top_k), matched, total)
+    plan = {"exact": candidates is None, "numCandidates": candidates}
+    if counts:
+        plan.update(matched=matched, total=total)
+    return plan
+
+
+def _vector_search_pipeline(
+    query_vec: list, top_k: int, mongo_filter: dict = None, plan: dict = None, with_vectors: bool = False
+) -> list:
+    # The query must be encoded the same way as the indexed vectors
+    plan = plan or _search_plan(top_k, None)
+    project = {
+        "_id": 0,  # important so we don't return ObjectId
+        "id": {"$toString": "$_id"},
+        "product_name": 1,
+        "score": { "$meta": "vectorSearchScore" },
+        "preview": _PREVIEW_FIELD,
+    }
+    if _exact_scores():
+        # Scored in Python: the float32 copy, or the stored vector of docs
+        # saved without one (before quantization was enabled). Also what
+        # MMR compares when with_vectors is set.
+        project["vector_full"] = 1
+        project["vector"] = {"$cond": [{"$eq": [{"$type": "$vector_full"}, "missing"]}, "$vector", "$$REMOVE"]}
+    elif with_vectors:
+        # MMR re-ranking compares the candidates with each other
+        project["vector"] = _mmr_vector_field(aggregate=True)
+    return [
+        vector_search_stage(
+            to_bson_vector(query_vec, VECTOR_STORAGE),
+            path="vector",
+            limit=_vector_limit(top_k),
+            index=VECTOR_INDEX_NAME,
+            mongo_filter=mongo_filter,
+            candidates=plan["numCandidates"],
+            exact=plan["exact"],
+        ),
         {
-            "$project": {
-                "_id": 0,  # important so we don't return ObjectId
-                "product_name": 1,
-                "score": { "$meta": "vectorSearchScore" },
-                "strategy_markdown": 1,
+            "$project": project
+        }
+    ]
+
+
+def _rescore_results(query_vec: list, results: list, top_k: int) -> list:
+    """
+    Re-rank over-fetched hits by exact cosine on `vector_full`, or on the
+    decoded stored vector for docs that have none, so every hit is on the
+    same (1 + cos) / 2 scale.
+    """
+    if not _exact_scores():
+        return results
+    scored = [d for d in results if d.get("vector_full") is not None or d.get("vector") is not None]
+    vectors = [_stored_vector(d) for d in scored]
+    for pos, cosine in rescore(query_vec, vectors, len(vectors)):
+        scored[pos]["score"] = _cosine_score(cosine)
+    results.sort(key=lambda d: d.get("score", 0.0), reverse=True)
+    return results[:top_k]
+
+
+# A vector hit's `score` is Atlas's cosine convention, (1 + cos) / 2 in
+# [0, 1], on both backends and with every storage layout.
+def _cosine_score(cosine: float) -> float:
+    return (1.0 + cosine) / 2.0
+
+
+def _search_local(query_vec: list, top_k: int, filters: dict = None) -> list:
+    index = _local_strategies()
+    results = []
+    filter_fn = matcher(filters or {}, _hide_duplicates(filters))
+    for doc_id, cosine in index.search(query_vec, top_k, filter_fn=filter_fn):
+        doc = index.docs.get(doc_id, {})
+        results.append(
+            {
+                "id": doc_id,
+                "product_name": doc.get("product_name"),
+                "score": _cosine_score(cosine),
+                "preview": doc.get("preview") or preview(doc.get("strategy_markdown")),
             }
+        )
+    return results
+
+
+_filter_counts = {}
+_filter_counts_lock = threading.Lock()
+
+
+def _cached_counts(mongo_filter: dict):
+    key = json.dumps(mongo_filter, sort_keys=True, default=str)
+    with _filter_counts_lock:
+        entry = _filter_counts.get(key)
+    if entry and time.monotonic() - entry[0] < FILTER_COUNT_TTL:
+        return key, entry[1]
+    return key, None
+
+
+def _store_counts(key: str, counts: tuple) -> tuple:
+    with _filter_counts_lock:
+        if len(_filter_counts) > 1024:
+            _filter_counts.clear()
+        _filter_counts[key] = (time.monotonic(), counts)
+    return counts
+
+
+def _count_matches(col, mongo_filter: dict):
+    """
+    (matched, total) for a filter, served by the B-tree indexes; reused
+    for FILTER_COUNT_TTL seconds.
+    """
+    if not mongo_filter:
+        return None
+    key, counts = _cached_counts(mongo_filter)
+    if counts is None:
+        counts = _store_counts(key, (col.count_documents(mongo_filter), col.estimated_document_count()))
+    return counts
+
+
+async def _count_matches_async(col, mongo_filter: dict):
+    if not mongo_filter:
+        return None
+    key, counts = _cached_counts(mongo_filter)
+    if counts is None:
+        counts = _store_counts(
+            key, (await col.count_documents(mongo_filter), await col.estimated_document_count())
+        )
+    return counts
+
+
+def _mmr_vector_field(aggregate: bool):
+    # Arrays of doubles can be cut to the MMR prefix server-side
+    if VECTOR_STORAGE != "array" or not MMR_VECTOR_DIMS:
+        return 1
+    return {"$slice": ["$vector", MMR_VECTOR_DIMS]} if aggregate else {"$slice": MMR_VECTOR_DIMS}
+
+
+def _with_vectors(results: list, keep: bool) -> list:
+    # Drop the raw vector fields; `keep` decodes them as "_vec" for MMR first
+    for doc in results:
+        if keep and (doc.get("vector") is not None or doc.get("vector_full") is not None):
+            doc["_vec"] = _stored_vector(doc)
+        doc.pop("vector", None)
+        doc.pop("vector_full", None)
+    return results
+
+
+def _unfiltered_k(top_k: int, hidden: frozenset) -> int:
+    # Over-fetch to make up for duplicates removed after the search (best effort)
+    return top_k + min(len(hidden), 4 * top_k)
+
+
+def _visible(results: list, hidden: frozenset, top_k: int) -> list:
+    return [doc for doc in results if doc["id"] not in hidden][: _vector_limit(top_k)]
+
+
+def _search_vector(
+    query_vec: list, top_k: int, filters: dict = None, plan_out: dict = None, with_vectors: bool = False
+) -> list:
+    """
+    Vector hits; `with_vectors` also returns each hit's stored vector as
+    "_vec" (Atlas only, local vectors are read from the index by MMR).
+    """
+    if use_local_backend():
+        return _search_local(query_vec, top_k, filters)
+
+    client = get_mongo_client()
+    db = client["ai_product_strategist"]
+    col = db["strategies"]
+
+    mongo_filter = to_mongo_filter(filters or {})
+    plan = _search_plan(top_k, _count_matches(col, mongo_filter))
+    if plan_out is not None:
+        plan_out.update(plan)
+    if plan.get("matched") == 0:
+        return []
+    # Counts size the search; the pipeline also leaves out near-duplicates
+    pipeline = lambda k, hide: _vector_search_pipeline(
+        query_vec, k, to_mongo_filter(filters or {}, hide), plan, with_vectors
+    )
+    if not _hide_duplicates(filters):
+        results = list(col.aggregate(pipeline(top_k, False)))
+    else:
+        results = None
+        if not _duplicate_filter_missing():
+            try:
+                results = list(col.aggregate(pipeline(top_k, True)))
+            except OperationFailure:
+                pass
+        if results is None:
+            hidden = _duplicate_ids()
+            results = list(col.aggregate(pipeline(_unfiltered_k(top_k, hidden), False)))
+            _note_duplicate_filter(False)
+            results = _visible(results, hidden, top_k)
+    return _with_vectors(_rescore_results(query_vec, results, top_k), with_vectors)
+
+
+async def _search_vector_async(
+    query_vec: list, top_k: int, filters: dict = None, plan_out: dict = None, with_vectors: bool = False
+) -> list:
+    if use_local_backend():
+        return await run_blocking(_search_local, query_vec, top_k, filters)
+
+    async_client = get_async_mongo_client()
+    if async_client is None:
+        return await run_blocking(_search_vector, query_vec, top_k, filters, plan_out, with_vectors)
+
+    col = async_client["ai_product_strategist"]["strategies"]
+    mongo_filter = to_mongo_filter(filters or {})
+    plan = _search_plan(top_k, await _count_matches_async(col, mongo_filter))
+    if plan_out is not None:
+        plan_out.update(plan)
+    if plan.get("matched") == 0:
+        return []
+
+    async def run(k: int, hide: bool) -> list:
+        mongo_filter = to_mongo_filter(filters or {}, hide)
+        cursor = await col.aggregate(_vector_search_pipeline(query_vec, k, mongo_filter, plan, with_vectors))
+        return await cursor.to_list()
+
+    if not _hide_duplicates(filters):
+        results = await run(top_k, False)
+    else:
+        results = None
+        if not _duplicate_filter_missing():
+            try:
+                results = await run(top_k, True)
+            except OperationFailure:
+                pass
+        if results is None:
+            hidden = await run_blocking(_duplicate_ids)
+            results = await run(_unfiltered_k(top_k, hidden), False)
+            _note_duplicate_filter(False)
+            results = _visible(results, hidden, top_k)
+    return _with_vectors(_rescore_results(query_vec, results, top_k), with_vectors)
+
+
+# ---- LEXICAL + HYBRID SEARCH ----
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+# Depth of each ranking handed to reciprocal rank fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+
+_LEXICAL_FIELDS = {"product_name": 1, "goal": 1, "strategy_markdown": 1, "blob_fields": 1, "saved_at": 1}
+# Documents pulled per round trip while topping up the BM25 index
+_LEXICAL_BATCH = 500
+# Window of saved_at re-checked on every top-up: inserts stamped before the
+# last top-up but committed after it, and clock skew between writers
+LEXICAL_TOPUP_OVERLAP = float(os.getenv("LEXICAL_TOPUP_OVERLAP", "300"))
+
+
+def _with_blob_markdown(db, docs: list) -> list:
+    # Split docs keep their markdown in the blob; fetch only that field
+    split_ids = [d["_id"] for d in docs if "strategy_markdown" in d.get("blob_fields", ())]
+    if split_ids:
+        blobs = db[BLOB_COLLECTION].find(
+            {"_id": {"$in": split_ids}}, blob_projection(("strategy_markdown",))
+        )
+        markdown = {b["_id"]: unpack_blob(b, ("strategy_markdown",)) for b in blobs}
+        for doc in docs:
+            doc.update(markdown.get(doc["_id"], {}))
+    return docs
+
+
+def _lexical_strategies():
+    """
+    BM25 index over saved strategies, topped up with anything saved since
+    the last call. Mongo docs are found by `saved_at` (insert time), not
+    `_id`: ids are assigned at enqueue time and may land out of order.
+    """
+    index = get_lexical_index("strategies")
+    if use_local_backend():
+        local = _local_strategies()
+        for doc_id in local.ids[len(index):]:
+            doc = local.docs.get(doc_id, {})
+            if is_split(doc):
+                doc = dict(doc, **unpack_blob(get_local_blob_store().get(doc_id), ("strategy_markdown",)))
+            index.add(doc_id, doc)
+        return index
+
+    db = get_mongo_client()["ai_product_strategist"]
+    col = db["strategies"]
+    watermark = index.watermark
+    if watermark is None:
+        # First load reads everything, including docs saved before saved_at
+        watermark = datetime.now(timezone.utc)
+        cursor = col.find({}, _LEXICAL_FIELDS)
+    else:
+        since = watermark - timedelta(seconds=LEXICAL_TOPUP_OVERLAP)
+        recent = col.find({"saved_at": {"$gte": since}}, {"_id": 1})
+        missing = [doc["_id"] for doc in recent if str(doc["_id"]) not in index]
+        if not missing:
+            return index
+        cursor = col.find({"_id": {"$in": missing}}, _LEXICAL_FIELDS)
+    while True:
+        batch = [doc for _, doc in zip(range(_LEXICAL_BATCH), cursor)]
+        if not batch:
+            break
+        for doc in _with_blob_markdown(db, batch):
+            index.add(str(doc["_id"]), doc)
+            saved_at = parse_datetime(doc.get("saved_at"))
+            if saved_at is not None and saved_at > watermark:
+                watermark = saved_at
+    index.watermark = watermark
+    return index
+
+
+def _fetch_strategies(ids: list) -> dict:
+    if use_local_backend():
+        docs = _local_strategies().docs
+        found = {}
+        for i in ids:
+            doc = docs.get(i, {})
+            found[i] = {
+                "product_name": doc.get("product_name"),
+                "preview": doc.get("preview") or preview(doc.get("strategy_markdown")),
+            }
+        return found
+    col = get_mongo_client()["ai_product_strategist"]["strategies"]
+    cursor = col.find(
+        {"_id": {"$in": [ObjectId(i) for i in ids]}},
+        {"product_name": 1, "preview": _PREVIEW_FIELD},
+    )
+    return {str(doc["_id"]): doc for doc in cursor}
+
+
+def _filtered_ids(filters: dict):
+    # Candidate set for BM25 under a filter (index-backed find on Atlas)
+    if not to_mongo_filter(filters or {}):
+        return None
+    if use_local_backend():
+        matches = matcher(filters)
+        return {doc_id for doc_id, doc in _local_strategies().docs.items() if matches(doc)}
+    col = get_mongo_client()["ai_product_strategist"]["strategies"]
+    return {str(doc["_id"]) for doc in col.find(to_mongo_filter(filters), {"_id": 1})}
+
+
+def _search_lexical(query: str, top_k: int, filters: dict = None) -> list:
+    allowed = _filtered_ids(filters)
+    if allowed is not None and not allowed:
+        return []
+    excluded = _duplicate_ids() if _hide_duplicates(filters) else None
+    hits = _lexical_strategies().search(query, top_k, allowed, excluded)
+    docs = _fetch_strategies([doc_id for doc_id, _ in hits])
+    return [
+        {
+            "id": doc_id,
+            "product_name": docs.get(doc_id, {}).get("product_name"),
+            "score": score,
+            "preview": docs.get(doc_id, {}).get("preview"),
         }
-    ])
+        for doc_id, score in hits
+    ]
+
+
+def _fuse(vector_hits: list, lexical_hits: list, top_k: int) -> list:
+    by_id = {}
+    for hit in lexical_hits:
+        by_id[hit["id"]] = dict(hit, vector_score=None, lexical_score=hit["score"])
+    for hit in vector_hits:
+        fused = by_id.setdefault(hit["id"], dict(hit, lexical_score=None))
+        fused["vector_score"] = hit["score"]
+        if hit.get("_vec") is not None:
+            fused["_vec"] = hit["_vec"]
+
+    fused = reciprocal_rank_fusion(
+        [[h["id"] for h in vector_hits], [h["id"] for h in lexical_hits]], HYBRID_RRF_K
+    )
+    return [dict(by_id[doc_id], score=score) for doc_id, score in fused[:top_k]]
+
+
+def _candidate_vectors(ids: list) -> dict:
+    # Stored vectors of hits that came without one (BM25 hits, local backend)
+    if not ids:
+        return {}
+    if use_local_backend():
+        local = _local_strategies()
+        known = [i for i in ids if i in local.docs]
+        return dict(zip(known, local.get_vectors(known)))
+    col = get_mongo_client()["ai_product_strategist"]["strategies"]
+    cursor = col.find(
+        {"_id": {"$in": [ObjectId(i) for i in ids]}},
+        {"vector": _mmr_vector_field(aggregate=False), "vector_full": 1},
+    )
+    return {str(doc["_id"]): _stored_vector(doc) for doc in cursor}
+
+
+def _diversify(results: list, top_k: int, mmr_lambda: float) -> list:
+    """
+    MMR re-rank (mmr.py) of over-fetched hits down to top_k. Hits with no
+    "_vec" get their vectors from the store in one lookup.
+    """
+    if not results:
+        return results
+    vectors = [r.pop("_vec", None) for r in results]
+    stored = _candidate_vectors([r["id"] for r, v in zip(results, vectors) if v is None])
+    vectors = [v if v is not None else stored.get(r["id"]) for r, v in zip(results, vectors)]
+    vectors = [None if v is None else mmr_prefix(v) for v in vectors]
+    dim = next((len(v) for v in vectors if v is not None), EMBED_DIMENSIONS)
+    matrix = np.stack([v if v is not None else np.zeros(dim, np.float32) for v in vectors])
+    return [results[i] for i in mmr([r["score"] for r in results], matrix, top_k, mmr_lambda)]
+
+
+def _check_mode(mode: str) -> None:
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode {mode!r}; expected one of {SEARCH_MODES}")
+
+
+@contextmanager
+def _timed(timings: dict, stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round(time.perf_counter() - start, 4)
+
+
+async def _timed_async(timings: dict, stage: str, coro):
+    with _timed(timings, stage):
+        return await coro
+
+
+def search_strategies(
+    query: str, top_k: int = 3, mode: str = "vector", filters: dict = None, mmr_lambda: float = 1.0
+) -> dict:
+    """
+    Memory search in one of three modes:
+      - vector:  Atlas / local vector search
+      - lexical: BM25 over product_name, goal and strategy_markdown
+      - hybrid:  both, fused with reciprocal rank fusion
+    `filters` ({company_type, product_name, tags, created_after,
+    created_before, include_duplicates}; see search_filters.py)
+    pre-filters both rankers; near-duplicates are left out by default.
+    `mmr_lambda` < 1 over-fetches `top_k * MMR_CANDIDATE_FACTOR` hits and
+    re-ranks them for diversity (mmr.py); 1 keeps the plain ranking.
+    Returns {"results", "mode", "timings", "plan", "mmr"} with per-stage
+    seconds and the vector search sizing. Results carry a `preview` of
+    the markdown; load the rest with `get_strategy`.
+    """
+    _check_mode(mode)
+    filters = normalize_filters(filters)
+    diverse = mmr_enabled(mmr_lambda)
+    timings, plan, reranked = {}, {}, None
+    pool = top_k * MMR_CANDIDATE_FACTOR if diverse else top_k
+    depth = max(pool, HYBRID_CANDIDATES) if mode == "hybrid" else pool
+    vector_hits, lexical_hits = [], []
+
+    with _timed(timings, "total"):
+        if mode != "lexical":
+            with _timed(timings, "embed"):
+                query_vec = embed_text(query)
+            with _timed(timings, "vector"):
+                vector_hits = _search_vector(query_vec, depth, filters, plan, with_vectors=diverse)
+        if mode != "vector":
+            with _timed(timings, "lexical"):
+                lexical_hits = _search_lexical(query, depth, filters)
+        if mode == "hybrid":
+            with _timed(timings, "fusion"):
+                results = _fuse(vector_hits, lexical_hits, pool)
+        else:
+            results = vector_hits or lexical_hits
+        if diverse:
+            reranked = {"lambda": mmr_lambda, "candidates": len(results)}
+            with _timed(timings, "mmr"):
+                results = _diversify(results, top_k, mmr_lambda)
+
+    return {
+        "results": results,
+        "mode": mode,
+        "filters": filters,
+        "timings": timings,
+        "plan": plan,
+        "mmr": reranked,
+    }
+
+
+async def search_strategies_async(
+    query: str, top_k: int = 3, mode: str = "vector", filters: dict = None, mmr_lambda: float = 1.0
+) -> dict:
+    """
+    Async `search_strategies`; in hybrid mode the vector and lexical stages
+    run concurrently.
+    """
+    _check_mode(mode)
+    filters = normalize_filters(filters)
+    diverse = mmr_enabled(mmr_lambda)
+    timings, plan, reranked = {}, {}, None
+    pool = top_k * MMR_CANDIDATE_FACTOR if diverse else top_k
+    depth = max(pool, HYBRID_CANDIDATES) if mode == "hybrid" else pool
+
+    async def vector_stage():
+        if mode == "lexical":
+            return []
+        query_vec = await _timed_async(timings, "embed", embed_text_async(query))
+        return await _timed_async(
+            timings, "vector", _search_vector_async(query_vec, depth, filters, plan, diverse)
+        )
+
+    async def lexical_stage():
+        if mode == "vector":
+            return []
+        return await _timed_async(
+            timings, "lexical", run_blocking(_search_lexical, query, depth, filters)
+        )
+
+    with _timed(timings, "total"):
+        vector_hits, lexical_hits = await asyncio.gather(vector_stage(), lexical_stage())
+        if mode == "hybrid":
+            with _timed(timings, "fusion"):
+                results = _fuse(vector_hits, lexical_hits, pool)
+        else:
+            results = vector_hits or lexical_hits
+        if diverse:
+            reranked = {"lambda": mmr_lambda, "candidates": len(results)}
+            results = await _timed_async(
+                timings, "mmr", run_blocking(_diversify, results, top_k, mmr_lambda)
+            )
+
+    return {
+        "results": results,
+        "mode": mode,
+        "filters": filters,
+        "timings": timings,
+        "plan": plan,
+        "mmr": reranked,
+    }
+
+
+def search_similar_strategies(
+    query: str, top_k: int = 3, mode: str = "vector", filters: dict = None, mmr_lambda: float = 1.0
+):
+    return search_strategies(query, top_k, mode, filters, mmr_lambda)["results"]
 
-    return list(results)
 
+async def search_similar_strategies_async(
+    query: str, top_k: int = 3, mode: str = "vector", filters: dict = None, mmr_lambda: float = 1.0
+):
+    return (await search_strategies_async(query, top_k, mode, filters, mmr_lambda))["results"]
@@ -1,15 +1,12 @@
 import os
 from typing import Any, Dict
 from dotenv import load_dotenv
-from pymongo import MongoClient
 
-load_dotenv()
+from . import clients
 
-_mongo_client: MongoClient | None = None
+load_dotenv()
 
 def get_mongo_collection():
-    global _mongo_client
-
     uri = os.getenv("MONGODB_URI")
     db_name = os.getenv("MONGODB_DB")
     coll_name = os.getenv("MONGODB_COLLECTION")
@@ -17,10 +14,7 @@ def get_mongo_collection():
     if not uri or not db_name or not coll_name:
         raise RuntimeError("MongoDB env vars not set correctly")
 
-    if _mongo_client is None:
-        _mongo_client = MongoClient(uri)
-
-    db = _mongo_client[db_name]
+    db = clients.get_mongo()[db_name]
     return db[coll_name]
 
 
@@ -0,0 +1,154 @@
+# src/dedup.py
+"""
+Near-duplicate handling for saved strategies.
+
+Regenerating the same product produces strategies whose embeddings are
+almost identical. Before a save, db.py looks up the closest visible
+strategy in the same scope (same product by default); at or above
+STRATEGY_DEDUP_THRESHOLD cosine the new run is linked to it:
+
+  - mark:    the new doc is stored with `duplicate: true` and
+             `duplicate_of` the existing one, which stays canonical
+  - version: the new doc becomes the next version of the existing one
+             (`parent_id`, `version`) and the existing doc is marked
+             `duplicate_of` the new one, so the newest run is canonical
+  - off:     no check, and search shows every document
+
+Duplicates stay loadable by id; search leaves them out unless asked.
+`compact_duplicates` in db.py applies the same rule offline with
+`leader_clusters`.
+"""
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .quantization import normalize
+
+DEDUP_MODES = ("off", "mark", "version")
+STRATEGY_DEDUP_MODE = os.getenv("STRATEGY_DEDUP_MODE", "mark").lower()
+# Cosine similarity of the strategy embeddings
+STRATEGY_DEDUP_THRESHOLD = float(os.getenv("STRATEGY_DEDUP_THRESHOLD", "0.97"))
+# "product": only compare runs with the same product_name; "all": whole collection
+STRATEGY_DEDUP_SCOPE = os.getenv("STRATEGY_DEDUP_SCOPE", "product").lower()
+# Nearest neighbours fetched per check (the doc itself may be among them on a replay)
+DEDUP_CANDIDATES = 3
+
+if STRATEGY_DEDUP_MODE not in DEDUP_MODES:
+    raise ValueError(f"STRATEGY_DEDUP_MODE={STRATEGY_DEDUP_MODE!r}; expected one of {DEDUP_MODES}")
+
+
+_stats = {"checked": 0, "duplicates": 0, "check_errors": 0, "last_error": None}
+_stats_lock = threading.Lock()
+
+
+def record_check(match: Optional[Dict[str, Any]] = None, error: Optional[Exception] = None) -> None:
+    with _stats_lock:
+        _stats["checked"] += 1
+        if match is not None:
+            _stats["duplicates"] += 1
+        if error is not None:
+            _stats["check_errors"] += 1
+            _stats["last_error"] = f"{type(error).__name__}: {error}"
+
+
+def dedup_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        return dict(
+            _stats,
+            mode=STRATEGY_DEDUP_MODE,
+            threshold=STRATEGY_DEDUP_THRESHOLD,
+            scope=STRATEGY_DEDUP_SCOPE,
+        )
+
+
+def dedup_enabled() -> bool:
+    return STRATEGY_DEDUP_MODE != "off"
+
+
+def check_mode(mode: Optional[str]) -> str:
+    mode = (mode or STRATEGY_DEDUP_MODE).lower()
+    if mode not in ("mark", "version"):
+        raise ValueError(f"Unknown dedup mode {mode!r}; expected 'mark' or 'version'")
+    return mode
+
+
+def scope_filters(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Search filter (search_filters.py) limiting the check to the doc's scope.
+    """
+    if STRATEGY_DEDUP_SCOPE == "product" and doc.get("product_name"):
+        return {"product_name": doc["product_name"]}
+    return {}
+
+
+def scope_key(doc: Dict[str, Any]) -> Optional[str]:
+    return doc.get("product_name") if STRATEGY_DEDUP_SCOPE == "product" else None
+
+
+def best_match(
+    candidates: Sequence[Dict[str, Any]],
+    self_id: Optional[str] = None,
+    threshold: Optional[float] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Most similar candidate ({"id", "similarity", ...}) at or above the
+    threshold, ignoring the doc's own id; None if there is none.
+    """
+    threshold = STRATEGY_DEDUP_THRESHOLD if threshold is None else threshold
+    hits = [c for c in candidates if c["id"] != self_id and c["similarity"] >= threshold]
+    return max(hits, key=lambda c: c["similarity"], default=None)
+
+
+def link_duplicate(
+    doc: Dict[str, Any], match: Optional[Dict[str, Any]], doc_id: str, mode: Optional[str] = None
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    (doc to store, fields to $set on the matched doc or None) for a new
+    strategy `doc_id` whose nearest neighbour is `match`.
+    """
+    if match is None:
+        return doc, None
+    similarity = round(float(match["similarity"]), 4)
+    if check_mode(mode) == "mark":
+        return dict(doc, duplicate=True, duplicate_of=match["id"], similarity=similarity), None
+    doc = dict(
+        doc,
+        parent_id=doc.get("parent_id") or match["id"],
+        version=max(doc.get("version") or 1, (match.get("version") or 1) + 1),
+    )
+    return doc, {"duplicate": True, "duplicate_of": doc_id, "similarity": similarity}
+
+
+def dedup_report(match: Optional[Dict[str, Any]], mode: Optional[str] = None) -> Dict[str, Any]:
+    # Extra keys for the save status
+    if match is None:
+        return {}
+    key = "duplicate_of" if check_mode(mode) == "mark" else "supersedes"
+    return {key: match["id"], "similarity": round(float(match["similarity"]), 4)}
+
+
+def leader_clusters(vectors: np.ndarray, threshold: Optional[float] = None) -> List[List[int]]:
+    """
+    Greedy leader clustering: rows in priority order, each unclaimed row
+    leads a cluster of every later unclaimed row within `threshold`
+    cosine. Returns [leader, duplicates...] for clusters with duplicates.
+    One matrix-vector product per leader, so memory stays O(n).
+    """
+    threshold = STRATEGY_DEDUP_THRESHOLD if threshold is None else threshold
+    matrix = normalize(vectors)
+    open_rows = np.ones(len(matrix), dtype=bool)
+    clusters = []
+    for leader in range(len(matrix)):
+        if not open_rows[leader]:
+            continue
+        open_rows[leader] = False
+        rows = np.flatnonzero(open_rows)
+        if rows.size == 0:
+            break
+        members = rows[matrix[rows] @ matrix[leader] >= threshold]
+        if members.size:
+            open_rows[members] = False
+            clusters.append([leader, *members.tolist()])
+    return clusters
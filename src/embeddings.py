@@ -0,0 +1,388 @@
+# src/embeddings.py
+"""
+Shared embedding helpers with a two-tier, content-addressed cache.
+
+Vectors are keyed by (model, dimensions, sha256(text)) and kept as
+float32: an in-process LRU in front of the on-disk response cache.
+Cache misses from concurrent callers are micro-batched into shared
+`embeddings.create` calls. Callers that need plain lists (BSON) convert
+at the boundary.
+"""
+import asyncio
+import hashlib
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import openai
+
+from . import clients
+from .async_utils import run_blocking
+from .response_cache import get_cache
+from .singleflight import get_group
+
+EMBED_CACHE_MEMORY_ITEMS = int(os.getenv("EMBED_CACHE_MEMORY_ITEMS", "4096"))
+EMBED_CACHE_DISABLED = os.getenv("EMBED_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+
+# Micro-batching: wait up to the window for more requests, then send one call
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "10"))
+EMBED_BATCH_MAX_INPUTS = int(os.getenv("EMBED_BATCH_MAX_INPUTS", "256"))
+EMBED_BATCH_MAX_TOKENS = int(os.getenv("EMBED_BATCH_MAX_TOKENS", "200000"))
+EMBED_BATCH_MAX_IN_FLIGHT = int(os.getenv("EMBED_BATCH_MAX_IN_FLIGHT", "4"))
+EMBED_BATCHING_DISABLED = os.getenv("EMBED_BATCHING_DISABLED", "").lower() in (
+    "1", "true", "yes"
+)
+
+
+def _namespace(model: str, dimensions: Optional[int]) -> str:
+    return f"embed:{model}:{dimensions or 'native'}"
+
+
+def _text_key(model: str, dimensions: Optional[int], text: str) -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model}:{dimensions or 'native'}:{digest}"
+
+
+class EmbeddingCache:
+    """
+    Memory LRU (float32 arrays) backed by the shared SQLite cache.
+    """
+
+    def __init__(self, max_items: int = EMBED_CACHE_MEMORY_ITEMS):
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def get(self, namespace: str, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vec = self._memory.get(key)
+            if vec is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return vec
+
+        blob = get_cache().get(namespace, key)
+        if blob is None:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        vec = np.frombuffer(blob, dtype=np.float32)
+        with self._lock:
+            self._stats["disk_hits"] += 1
+            self._remember(key, vec)
+        return vec
+
+    def put(self, namespace: str, key: str, vec: np.ndarray) -> None:
+        vec = np.ascontiguousarray(vec, dtype=np.float32)
+        get_cache().set(namespace, key, vec.tobytes())
+        with self._lock:
+            self._remember(key, vec)
+
+    def _remember(self, key: str, vec: np.ndarray) -> None:
+        self._memory[key] = vec
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+            s["memory_items"] = len(self._memory)
+        lookups = s["memory_hits"] + s["disk_hits"] + s["misses"]
+        hits = s["memory_hits"] + s["disk_hits"]
+        s["hit_ratio"] = round(hits / lookups, 3) if lookups else None
+        s["memory_hit_ratio"] = round(s["memory_hits"] / lookups, 3) if lookups else None
+        return s
+
+
+_embedding_cache = EmbeddingCache()
+
+
+def embedding_cache_stats() -> Dict[str, Any]:
+    return _embedding_cache.stats()
+
+
+def _approx_tokens(text: str) -> int:
+    # ~4 chars per token is close enough for batch sizing
+    return len(text) // 4 + 1
+
+
+EmbedFn = Callable[[str, List[str], Optional[int]], List[List[float]]]
+
+
+def _openai_embed(
+    model: str, texts: List[str], dimensions: Optional[int]
+) -> List[List[float]]:
+    resp = clients.get_openai().embeddings.create(
+        **_request_kwargs(model, texts, dimensions)
+    )
+    return [d.embedding for d in resp.data]
+
+
+def _shared_failure(e: BaseException) -> bool:
+    # Outage / throttling fails every request in the call alike; anything
+    # else (e.g. one input over the token limit) may be one caller's fault
+    return not isinstance(e, Exception) or isinstance(
+        e, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+    )
+
+
+class EmbeddingBatcher:
+    """
+    Collects embed requests from any thread or event loop and sends them
+    as few `embeddings.create` calls as possible.
+
+    A collector thread waits up to `window_ms` after the first request
+    (or until `max_inputs` / `max_tokens` is reached), groups pending
+    texts by (model, dimensions), and hands each batch to a small sender
+    pool so a slow request doesn't hold up the next batch. If a shared
+    call fails for a reason other than an outage, each request in it is
+    retried on its own, so a bad input only fails its own caller.
+    """
+
+    def __init__(
+        self,
+        embed_fn: EmbedFn = _openai_embed,
+        *,
+        window_ms: float = EMBED_BATCH_WINDOW_MS,
+        max_inputs: int = EMBED_BATCH_MAX_INPUTS,
+        max_tokens: int = EMBED_BATCH_MAX_TOKENS,
+        max_in_flight: int = EMBED_BATCH_MAX_IN_FLIGHT,
+    ):
+        self.embed_fn = embed_fn
+        self.window = window_ms / 1000.0
+        self.max_inputs = max_inputs
+        self.max_tokens = max_tokens
+        self._queue: "queue.Queue[Tuple[str, Optional[int], List[str], Future]]" = (
+            queue.Queue()
+        )
+        self._senders = ThreadPoolExecutor(
+            max_workers=max_in_flight, thread_name_prefix="embed-send"
+        )
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "texts": 0, "api_calls": 0, "errors": 0, "isolated_retries": 0}
+        self._thread = threading.Thread(
+            target=self._collect, name="embed-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, model: str, texts: List[str], dimensions: Optional[int] = None) -> Future:
+        fut: Future = Future()
+        with self._stats_lock:
+            self._stats["requests"] += 1
+            self._stats["texts"] += len(texts)
+        self._queue.put((model, dimensions, list(texts), fut))
+        return fut
+
+    def _collect(self) -> None:
+        while True:
+            first = self._queue.get()
+            pending = [first]
+            n_inputs = len(first[2])
+            n_tokens = sum(_approx_tokens(t) for t in first[2])
+            deadline = time.monotonic() + self.window
+
+            while n_inputs < self.max_inputs and n_tokens < self.max_tokens:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                n_inputs += len(item[2])
+                n_tokens += sum(_approx_tokens(t) for t in item[2])
+
+            groups: Dict[Tuple[str, Optional[int]], list] = {}
+            for model, dimensions, texts, fut in pending:
+                groups.setdefault((model, dimensions), []).append((texts, fut))
+            for (model, dimensions), items in groups.items():
+                for chunk in self._split(items):
+                    self._senders.submit(self._send, model, dimensions, chunk)
+
+    def _split(self, items: list) -> List[list]:
+        # Respect the per-call input / token caps; one request never splits
+        chunks, current, n_inputs, n_tokens = [], [], 0, 0
+        for texts, fut in items:
+            size = len(texts)
+            tokens = sum(_approx_tokens(t) for t in texts)
+            too_many = n_inputs + size > self.max_inputs
+            too_long = n_tokens + tokens > self.max_tokens
+            if current and (too_many or too_long):
+                chunks.append(current)
+                current, n_inputs, n_tokens = [], 0, 0
+            current.append((texts, fut))
+            n_inputs += size
+            n_tokens += tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _call(self, model: str, texts: List[str], dimensions: Optional[int]) -> List[List[float]]:
+        try:
+            return self.embed_fn(model, texts, dimensions)
+        except BaseException:
+            with self._stats_lock:
+                self._stats["errors"] += 1
+            raise
+        finally:
+            with self._stats_lock:
+                self._stats["api_calls"] += 1
+
+    def _send(self, model: str, dimensions: Optional[int], items: list) -> None:
+        flat = [t for texts, _ in items for t in texts]
+        try:
+            vectors = self._call(model, flat, dimensions)
+        except BaseException as e:
+            if len(items) == 1 or _shared_failure(e):
+                for _, fut in items:
+                    fut.set_exception(e)
+                return
+            with self._stats_lock:
+                self._stats["isolated_retries"] += 1
+            for texts, fut in items:
+                try:
+                    fut.set_result(self._call(model, texts, dimensions))
+                except BaseException as err:
+                    fut.set_exception(err)
+            return
+
+        offset = 0
+        for texts, fut in items:
+            fut.set_result(vectors[offset : offset + len(texts)])
+            offset += len(texts)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            s = dict(self._stats)
+        s["queued"] = self._queue.qsize()
+        s["texts_per_call"] = round(s["texts"] / s["api_calls"], 2) if s["api_calls"] else None
+        return s
+
+
+_batcher: Optional[EmbeddingBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher() -> EmbeddingBatcher:
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = EmbeddingBatcher()
+    return _batcher
+
+
+def _reset_after_fork() -> None:
+    # The collector / sender threads don't exist in a forked child
+    global _batcher, _batcher_lock
+    _batcher = None
+    _batcher_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def embedding_batcher_stats() -> Dict[str, Any]:
+    return get_batcher().stats() if _batcher is not None else {}
+
+
+def _request_kwargs(model: str, texts: List[str], dimensions: Optional[int]) -> Dict[str, Any]:
+    kwargs: Dict[str, Any] = {"model": model, "input": texts}
+    if dimensions:
+        kwargs["dimensions"] = dimensions
+    return kwargs
+
+
+def _lookup(texts: Sequence[str], model: str, dimensions: Optional[int], use_cache: bool):
+    namespace = _namespace(model, dimensions)
+    keys = [_text_key(model, dimensions, t) for t in texts]
+    found: Dict[str, np.ndarray] = {}
+    if use_cache and not EMBED_CACHE_DISABLED:
+        for key in dict.fromkeys(keys):
+            vec = _embedding_cache.get(namespace, key)
+            if vec is not None:
+                found[key] = vec
+    # Unique texts still to embed, in first-seen order
+    missing: Dict[str, str] = {}
+    for key, text in zip(keys, texts):
+        if key not in found and key not in missing:
+            missing[key] = text
+    return namespace, keys, found, missing
+
+
+def _store(
+    namespace: str,
+    missing: Dict[str, str],
+    vectors: List[List[float]],
+    found: Dict[str, np.ndarray],
+) -> None:
+    for key, vec in zip(missing, vectors):
+        arr = np.asarray(vec, dtype=np.float32)
+        found[key] = arr
+        if not EMBED_CACHE_DISABLED:
+            _embedding_cache.put(namespace, key, arr)
+
+
+def embed_texts(
+    texts: Sequence[str],
+    *,
+    model: str,
+    dimensions: Optional[int] = None,
+    use_cache: bool = True,
+) -> np.ndarray:
+    """
+    Embed `texts` and return a float32 matrix (one row per input).
+    Only texts missing from the cache are sent to the API, in one request.
+    """
+    namespace, keys, found, missing = _lookup(texts, model, dimensions, use_cache)
+
+    if missing:
+        def fetch() -> List[List[float]]:
+            if EMBED_BATCHING_DISABLED:
+                return _openai_embed(model, list(missing.values()), dimensions)
+            return get_batcher().submit(model, list(missing.values()), dimensions).result()
+
+        # Concurrent identical requests share one API call
+        flight_key = hashlib.sha256("|".join(missing).encode("utf-8")).hexdigest()
+        vectors = get_group(f"embed:{model}").do(flight_key, fetch)
+        _store(namespace, missing, vectors, found)
+
+    return np.stack([found[k] for k in keys]) if keys else np.zeros((0, 0), np.float32)
+
+
+async def embed_texts_async(
+    texts: Sequence[str],
+    *,
+    model: str,
+    dimensions: Optional[int] = None,
+    use_cache: bool = True,
+) -> np.ndarray:
+    namespace, keys, found, missing = await run_blocking(
+        _lookup, texts, model, dimensions, use_cache
+    )
+
+    if missing:
+        async def fetch() -> List[List[float]]:
+            if EMBED_BATCHING_DISABLED:
+                resp = await clients.get_async_openai().embeddings.create(
+                    **_request_kwargs(model, list(missing.values()), dimensions)
+                )
+                return [d.embedding for d in resp.data]
+            # Shares batches with sync callers and other event loops
+            fut = get_batcher().submit(model, list(missing.values()), dimensions)
+            return await asyncio.wrap_future(fut)
+
+        flight_key = hashlib.sha256("|".join(missing).encode("utf-8")).hexdigest()
+        vectors = await get_group(f"embed:{model}").do_async(flight_key, fetch)
+        await run_blocking(_store, namespace, missing, vectors, found)
+
+    return np.stack([found[k] for k in keys]) if keys else np.zeros((0, 0), np.float32)
@@ -0,0 +1,149 @@
+# src/index_bootstrap.py
+"""
+Create the Mongo indexes memory search relies on. Idempotent: existing
+indexes are left alone, and an Atlas vector index whose definition has
+drifted (new filter field, different dimensions) is updated in place.
+
+- `strategies`: the Atlas Vector Search index on `vector`, with
+  company_type / product_name / tags / created_at / duplicate as filter
+  fields, plus B-tree indexes on those fields for filter counts, lexical
+  candidates and the near-duplicate lookups.
+- research collection (vector_store.py): the vector index on `embedding`
+  with metadata.product / metadata.topic as filter fields.
+
+    python -m src.index_bootstrap
+    python -m src.index_bootstrap --dry-run
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.operations import SearchIndexModel
+
+from . import clients
+from . import vector_store
+from .db import EMBED_DIMENSIONS, VECTOR_INDEX_NAME, VECTOR_STORAGE
+from .local_index import use_local_backend
+from .search_filters import FILTER_FIELDS
+
+
+def strategy_vector_index() -> Dict[str, Any]:
+    return {
+        "fields": [
+            {
+                "type": "vector",
+                "path": "vector",
+                "numDimensions": EMBED_DIMENSIONS,
+                # Hamming-style binary vectors need euclidean
+                "similarity": "euclidean" if VECTOR_STORAGE == "binary" else "cosine",
+            },
+            *({"type": "filter", "path": field} for field in FILTER_FIELDS),
+        ]
+    }
+
+
+def strategy_btree_indexes() -> List[IndexModel]:
+    return [
+        # Equality filter + newest-first range, the common memory query
+        IndexModel([("company_type", ASCENDING), ("created_at", DESCENDING)], name="company_type_created_at"),
+        IndexModel([("product_name", ASCENDING), ("created_at", DESCENDING)], name="product_name_created_at"),
+        IndexModel([("tags", ASCENDING)], name="tags"),
+        IndexModel([("created_at", DESCENDING)], name="created_at"),
+        # Insert-time stamp the BM25 top-up follows
+        IndexModel([("saved_at", ASCENDING)], name="saved_at"),
+        # Only near-duplicates carry the field (dedup.py)
+        IndexModel([("duplicate", ASCENDING)], name="duplicate", sparse=True),
+    ]
+
+
+def research_vector_index() -> Dict[str, Any]:
+    return {
+        "fields": [
+            {
+                "type": "vector",
+                "path": "embedding",
+                "numDimensions": vector_store.EMBED_DIMENSIONS,
+                "similarity": "cosine",
+            },
+            {"type": "filter", "path": "metadata.product"},
+            {"type": "filter", "path": "metadata.topic"},
+        ]
+    }
+
+
+def _managed_shape(definition: Dict[str, Any]) -> Tuple[Dict[str, Any], frozenset]:
+    """
+    The parts of a vector index definition this module sets: dimensions and
+    similarity per vector path, and the set of filter paths. Atlas echoes
+    definitions back normalized (defaults filled in, fields reordered), so
+    drift is judged on these alone.
+    """
+    vectors, filters = {}, set()
+    for field in (definition or {}).get("fields", []):
+        if field.get("type") == "vector":
+            vectors[field.get("path")] = (
+                int(field.get("numDimensions", 0)),
+                str(field.get("similarity", "")).lower(),
+            )
+        elif field.get("type") == "filter":
+            filters.add(field.get("path"))
+    return vectors, frozenset(filters)
+
+
+def _ensure_vector_index(col, name: str, definition: Dict[str, Any]) -> str:
+    existing = next(iter(col.list_search_indexes(name)), None)
+    if existing is None:
+        col.create_search_index(SearchIndexModel(definition=definition, name=name, type="vectorSearch"))
+        return "created"
+    if _managed_shape(existing.get("latestDefinition")) != _managed_shape(definition):
+        col.update_search_index(name, definition)
+        return "updated"
+    return "unchanged"
+
+
+def bootstrap(dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Create / update every index; returns what was done per index.
+    """
+    research_name = os.getenv("MONGODB_COLLECTION", "research")
+    if dry_run:
+        return {
+            "strategies": {
+                VECTOR_INDEX_NAME: strategy_vector_index(),
+                "btree": [model.document for model in strategy_btree_indexes()],
+            },
+            research_name: {"vector_index": research_vector_index()},
+        }
+
+    strategies = clients.get_mongo()["ai_product_strategist"]["strategies"]
+    research = vector_store._get_collection()
+    report = {
+        "strategies": {
+            VECTOR_INDEX_NAME: _ensure_vector_index(strategies, VECTOR_INDEX_NAME, strategy_vector_index()),
+            # create_indexes is a no-op for indexes that already exist
+            "btree": strategies.create_indexes(strategy_btree_indexes()),
+        },
+        research_name: {
+            "vector_index": _ensure_vector_index(research, "vector_index", research_vector_index()),
+        },
+    }
+    return report
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Create the Atlas search and B-tree indexes.")
+    parser.add_argument("--dry-run", action="store_true", help="print the definitions only")
+    args = parser.parse_args(argv)
+
+    if use_local_backend() and not args.dry_run:
+        print("VECTOR_BACKEND=local: filters are evaluated in memory; no indexes to create.")
+        return
+    json.dump(bootstrap(dry_run=args.dry_run), sys.stdout, indent=2, default=str)
+    print()
+
+
+if __name__ == "__main__":
+    main()
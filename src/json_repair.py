@@ -0,0 +1,149 @@
+# src/json_repair.py
+"""
+Tolerant parsing for almost-JSON model output.
+
+Fixes the defects models actually produce, in one pass:
+  - markdown fences / prose around the object
+  - trailing commas before } or ]
+  - unescaped quotes and raw newlines inside strings
+  - truncation (unterminated strings, unclosed arrays / objects)
+Truncated output is closed at the last point where it still parses, so
+complete sections survive and only the cut-off tail is lost.
+"""
+import json
+import re
+from typing import Any, List, Tuple
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL | re.IGNORECASE)
+_CLOSERS = {"{": "}", "[": "]"}
+# Most truncation points to try before giving up
+MAX_CLOSE_ATTEMPTS = 50
+
+
+def _strip_fences(text: str) -> str:
+    match = _FENCE_RE.search(text)
+    if match and "{" in match.group(1):
+        return match.group(1)
+    return text
+
+
+def _next_significant(text: str, pos: int) -> str:
+    while pos < len(text) and text[pos] in " \t\r\n":
+        pos += 1
+    return text[pos] if pos < len(text) else ""
+
+
+def _close(out: List[str], stack: List[str]) -> str:
+    body = "".join(out).rstrip()
+    while body.endswith(","):
+        body = body[:-1].rstrip()
+    return body + "".join(_CLOSERS[c] for c in reversed(stack))
+
+
+def _scan(text: str) -> Tuple[List[str], List[str], bool, List[Tuple[int, List[str]]]]:
+    """
+    Rewrite `text` from its first "{" into valid-as-far-as-possible JSON.
+    Returns (output chars, open containers, still in a string, safe points);
+    a safe point is (output length, open containers) right after a
+    complete value.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    safe: List[Tuple[int, List[str]]] = []
+    # Per open object: is the next string a key?
+    expect_key: List[bool] = []
+    in_string = escape = is_key = False
+
+    pos = text.find("{")
+    if pos == -1:
+        return [], [], False, []
+
+    while pos < len(text):
+        ch = text[pos]
+        if in_string:
+            if escape:
+                escape = False
+                out.append(ch)
+            elif ch == "\\":
+                escape = True
+                out.append(ch)
+            elif ch == '"':
+                follow = _next_significant(text, pos + 1)
+                if follow in (":" if is_key else ",}]") or follow == "":
+                    in_string = False
+                    out.append(ch)
+                    if not is_key:
+                        safe.append((len(out), list(stack)))
+                else:
+                    out.append('\\"')  # quote inside the text
+            elif ch == "\n":
+                out.append("\\n")
+            elif ch == "\r":
+                out.append("\\r")
+            elif ch == "\t":
+                out.append("\\t")
+            else:
+                out.append(ch)
+        elif ch == '"':
+            in_string = True
+            is_key = bool(stack) and stack[-1] == "{" and expect_key[-1]
+            out.append(ch)
+        elif ch in "{[":
+            stack.append(ch)
+            if ch == "{":
+                expect_key.append(True)
+            out.append(ch)
+        elif ch in "}]":
+            if not stack:
+                break
+            # Trailing comma before the closer
+            while out and out[-1] in " \t\r\n,":
+                out.pop()
+            opener = stack.pop()
+            if opener == "{":
+                expect_key.pop()
+            out.append(_CLOSERS[opener])  # also fixes a mismatched closer
+            safe.append((len(out), list(stack)))
+            if not stack:
+                break
+        elif ch == ",":
+            safe.append((len(out), list(stack)))
+            if stack and stack[-1] == "{":
+                expect_key[-1] = True
+            out.append(ch)
+        elif ch == ":":
+            if stack and stack[-1] == "{":
+                expect_key[-1] = False
+            out.append(ch)
+        else:
+            out.append(ch)
+        pos += 1
+
+    return out, stack, in_string, safe
+
+
+def loads_tolerant(text: str) -> Any:
+    """
+    json.loads, falling back to repair. Raises ValueError if nothing
+    usable is left.
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    out, stack, in_string, safe = _scan(_strip_fences(text))
+    if not out:
+        raise ValueError("no JSON object found")
+    if in_string:
+        if out[-1] == "\\" and (len(out) < 2 or out[-2] != "\\"):
+            out.pop()  # cut inside an escape sequence
+        out.append('"')
+
+    candidates = [(len(out), stack)] + [point for point in reversed(safe)]
+    for length, open_stack in candidates[:MAX_CLOSE_ATTEMPTS]:
+        try:
+            return json.loads(_close(out[:length], open_stack))
+        except json.JSONDecodeError:
+            continue
+    raise ValueError("could not repair JSON")
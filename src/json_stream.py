@@ -0,0 +1,80 @@
+# src/json_stream.py
+"""
+Incremental parser for a streamed JSON object.
+
+Text is fed in arbitrary chunks (e.g. LLM output deltas); each top-level
+`"key": value` member is returned as soon as its closing `,` or `}` has
+arrived. Each character is scanned once, so feeding a whole document
+costs O(n) regardless of chunking. Leading noise such as a ```json fence
+is skipped.
+"""
+import json
+from typing import Any, List, Tuple
+
+
+class IncrementalJSONObjectParser:
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = -1
+        self.started = False
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Add a chunk; return the top-level members completed by it.
+        """
+        if self.done or not chunk:
+            return []
+        self._text += chunk
+        completed: List[Tuple[str, Any]] = []
+        text = self._text
+
+        while self._pos < len(text):
+            ch = text[self._pos]
+            if not self.started:
+                if ch == "{":
+                    self.started = True
+                    self._depth = 1
+                    self._member_start = self._pos + 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.extend(self._take_member(self._pos))
+                    self.done = True
+                    self._pos += 1
+                    break
+            elif ch == "," and self._depth == 1:
+                completed.extend(self._take_member(self._pos))
+                self._member_start = self._pos + 1
+            self._pos += 1
+
+        return completed
+
+    def _take_member(self, end: int) -> List[Tuple[str, Any]]:
+        member = self._text[self._member_start : end].strip()
+        if not member:
+            return []
+        try:
+            return list(json.loads("{" + member + "}").items())
+        except json.JSONDecodeError:
+            # Malformed member: leave it to the caller's full-document fallback
+            return []
+
+    @property
+    def text(self) -> str:
+        return self._text
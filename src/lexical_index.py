@@ -0,0 +1,129 @@
+# src/lexical_index.py
+"""
+In-process BM25 inverted index for exact-term matches (product and
+competitor names) that embeddings tend to blur.
+
+Fields are weighted BM25F-style by scaling term frequencies, so a hit in
+`product_name` counts more than one buried in `strategy_markdown`. The
+index is append-only and rebuilt from the store on process start.
+"""
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+DEFAULT_FIELD_WEIGHTS = {"product_name": 3.0, "goal": 2.0, "strategy_markdown": 1.0}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it of on or that the this to with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+class LexicalIndex:
+    def __init__(
+        self,
+        field_weights: Optional[Dict[str, float]] = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.field_weights = field_weights or DEFAULT_FIELD_WEIGHTS
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        # term -> {row: weighted term frequency}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._lengths: List[float] = []
+        self._total_length = 0.0
+        self.ids: List[str] = []
+        self._row: Dict[str, int] = {}
+        # Where the caller's last top-up from the store got to (opaque here)
+        self.watermark: Any = None
+
+    def add(self, doc_id: str, doc: Dict[str, Any]) -> None:
+        tf: Counter = Counter()
+        for field, weight in self.field_weights.items():
+            value = doc.get(field)
+            for token in tokenize(value if isinstance(value, str) else ""):
+                tf[token] += weight
+
+        with self._lock:
+            if doc_id in self._row:
+                return
+            row = len(self.ids)
+            self.ids.append(doc_id)
+            self._row[doc_id] = row
+            for term, freq in tf.items():
+                self._postings.setdefault(term, {})[row] = freq
+            length = sum(tf.values())
+            self._lengths.append(length)
+            self._total_length += length
+
+    def search(
+        self,
+        query: str,
+        k: int,
+        allowed: Optional[Set[str]] = None,
+        excluded: Optional[Set[str]] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Top-k (id, score); `allowed` restricts scoring to those ids and
+        `excluded` ids are skipped.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            n_docs = len(self.ids)
+            if not n_docs or not terms:
+                return []
+            avg_len = self._total_length / n_docs or 1.0
+            scores: Dict[int, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+                for row, freq in postings.items():
+                    if allowed is not None and self.ids[row] not in allowed:
+                        continue
+                    if excluded and self.ids[row] in excluded:
+                        continue
+                    norm = self.k1 * (1.0 - self.b + self.b * self._lengths[row] / avg_len)
+                    scores[row] = scores.get(row, 0.0) + idf * freq * (self.k1 + 1.0) / (freq + norm)
+            best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [(self.ids[row], score) for row, score in best]
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._row
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fuse ranked id lists: score(d) = sum over lists of 1 / (k + rank).
+    """
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+_indexes: Dict[str, LexicalIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_lexical_index(name: str) -> LexicalIndex:
+    with _indexes_lock:
+        index = _indexes.get(name)
+        if index is None:
+            index = _indexes[name] = LexicalIndex()
+    return index
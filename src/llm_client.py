@@ -1,44 +1,543 @@
 # src/llm_client.py
-from typing import Optional
-from openai import OpenAI
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+from openai import AsyncOpenAI, OpenAI
+import asyncio
 import json
+import os
+import queue
+import threading
+import time
+
+from . import clients
+from .async_utils import run_blocking, run_sync
+from .json_repair import loads_tolerant
+from .json_stream import IncrementalJSONObjectParser
+from .model_cascade import get_cascade_stats, model_tiers
+from .response_cache import get_cache, make_key
+from .singleflight import get_group
+from .strategy_schema import (
+    SECTION_MISSING,
+    SECTION_SHAPES,
+    STRATEGY_INPUT_FIELDS,
+    STRATEGY_SECTIONS,
+    affected_sections,
+    changed_inputs,
+    repair_strategy,
+    validate_section,
+    validate_strategy,
+)
 
 from .agent_prompt import (
+    COMPETITOR_SECTION,
+    FEATURES_SECTION,
+    MARKET_OVERVIEW_SECTION,
+    PRD_SECTION,
+    REFINE_SECTIONS_TEMPLATE,
+    ROADMAP_SECTION,
+    SECTION_FIX_TEMPLATE,
     STRATEGY_PIPELINE_SYSTEM_PROMPT,
     STRATEGY_PIPELINE_USER_TEMPLATE,
+    STRATEGY_SECTION_CONTEXT_TEMPLATE,
+    USER_PAIN_SECTION,
 )
 
-
-_client: Optional[OpenAI] = None
+# "monolithic": one call for the whole strategy.
+# "sectioned": smaller per-section calls run concurrently, then merged.
+GENERATION_MODES = ("monolithic", "sectioned")
+GENERATION_MODE = os.getenv("STRATEGY_GENERATION_MODE", "monolithic").lower()
+# Sectioned mode writes one PRD per top-priority feature
+STRATEGY_PRD_COUNT = int(os.getenv("STRATEGY_PRD_COUNT", "3"))
 
 
 def get_client() -> OpenAI:
-    global _client
-    if _client is None:
-        _client = OpenAI()
-    return _client
+    return clients.get_openai()
+
+
+def get_async_client() -> AsyncOpenAI:
+    return clients.get_async_openai()
+
+
+# ---- RESPONSE CACHE ----
+# Model outputs keyed by model + prompts + params, in the shared disk cache
+# (TTL per entry, LRU eviction above CACHE_MAX_BYTES).
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_DISABLED = os.getenv("LLM_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+_LLM_NAMESPACE = "llm"
+
+
+def _llm_key(model: str, system_prompt: str, user_prompt: str, **params: Any) -> str:
+    return make_key(
+        _LLM_NAMESPACE,
+        {"model": model, "system": system_prompt, "user": user_prompt, **params},
+    )
+
+
+def _cached_llm(key: str, fetch: Callable[[], Any], use_cache: bool) -> Tuple[Any, bool]:
+    """
+    Return (result, served_from_cache). `fetch` should parse/validate its
+    output so only usable results get stored; `use_cache=False` skips the
+    lookup and refreshes the entry. Identical concurrent misses share one call.
+    """
+    if LLM_CACHE_DISABLED:
+        return get_group(_LLM_NAMESPACE).do(key, fetch), False
 
+    cache = get_cache()
+    if use_cache:
+        cached = cache.get_json(_LLM_NAMESPACE, key)
+        if cached is not None:
+            return cached, True
 
-def run_llm(system_prompt: str, user_prompt: str, model: str = "gpt-4.1-mini") -> str:
+    def fetch_and_store() -> Any:
+        result = fetch()
+        cache.set_json(_LLM_NAMESPACE, key, result, ttl=LLM_CACHE_TTL)
+        return result
+
+    return get_group(_LLM_NAMESPACE).do(key, fetch_and_store), False
+
+
+async def _cached_llm_async(
+    key: str, fetch: Callable[[], Awaitable[Any]], use_cache: bool
+) -> Tuple[Any, bool]:
+    """
+    Async twin of `_cached_llm`; SQLite access runs on the blocking pool.
+    """
+    if LLM_CACHE_DISABLED:
+        return await get_group(_LLM_NAMESPACE).do_async(key, fetch), False
+
+    cache = get_cache()
+    if use_cache:
+        cached = await run_blocking(cache.get_json, _LLM_NAMESPACE, key)
+        if cached is not None:
+            return cached, True
+
+    async def fetch_and_store() -> Any:
+        result = await fetch()
+        await run_blocking(cache.set_json, _LLM_NAMESPACE, key, result, ttl=LLM_CACHE_TTL)
+        return result
+
+    return await get_group(_LLM_NAMESPACE).do_async(key, fetch_and_store), False
+
+
+def _with_cache_info(strategy: dict, hits: int, calls: int) -> dict:
+    # `_cache` tells callers (and the UI) whether the model was skipped
+    return dict(strategy, _cache={"hit": calls > 0 and hits == calls, "hits": hits, "calls": calls})
+
+
+def llm_cache_stats() -> Dict[str, Any]:
+    return get_cache().stats(_LLM_NAMESPACE).get(_LLM_NAMESPACE, {})
+
+
+def run_llm(
+    system_prompt: str,
+    user_prompt: str,
+    model: str = "gpt-4.1-mini",
+    use_cache: bool = True,
+) -> str:
     """
     Small helper to call the OpenAI Responses API and return plain text.
     """
-    client = get_client()
-    resp = client.responses.create(
-        model=model,
-        input=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
+    def fetch() -> str:
+        client = get_client()
+        resp = client.responses.create(
+            model=model,
+            input=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+        )
+
+        # Try to be robust about how we pull text out
+        try:
+            return resp.output[0].content[0].text
+        except Exception:
+            # Some SDKs expose output_text directly
+            return getattr(resp, "output_text", str(resp))
+
+    text, _ = _cached_llm(
+        _llm_key(model, system_prompt, user_prompt, format="text"), fetch, use_cache
+    )
+    return text
+    
+def _build_strategy_prompt(
+    *,
+    product_name: str,
+    target_users: str,
+    goal: str,
+    company_type: str,
+    constraints: str,
+    tavily_raw_json: str,
+    extra_instructions: str = "",
+) -> str:
+    return STRATEGY_PIPELINE_USER_TEMPLATE.format(
+        product_name=product_name,
+        target_users=target_users,
+        goal=goal,
+        company_type=company_type,
+        constraints=constraints or "none specified",
+        tavily_raw_json=tavily_raw_json,
+        extra_instructions=extra_instructions or "None",
     )
 
-    # Try to be robust about how we pull text out
+
+def _response_text(resp) -> str:
+    # Try to safely get the JSON string from the response
     try:
-        return resp.output[0].content[0].text
+        return resp.output_text  # many SDKs expose this
     except Exception:
-        # Some SDKs expose output_text directly
-        return getattr(resp, "output_text", str(resp))
-    
+        try:
+            return resp.output[0].content[0].text
+        except Exception:
+            raise RuntimeError("Could not extract text from OpenAI response")
+
+
+def _parse_strategy_json(json_str: str) -> dict:
+    # Strict parse first; then repair fences, trailing commas, stray quotes
+    # and truncation (complete members of a cut-off document are kept)
+    try:
+        result = loads_tolerant(json_str)
+    except ValueError:
+        result = None
+    if isinstance(result, dict):
+        return result
+
+    # If we reach here, the model didn't obey the JSON-only instruction
+    raise ValueError(
+        f"LLM returned invalid JSON for strategy pipeline. Raw text was:\n{json_str}"
+    )
+
+
+def _strategy_input(user_prompt: str):
+    return [
+        {"role": "system", "content": STRATEGY_PIPELINE_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def _fetch_json(client: OpenAI, model: str, user_prompt: str) -> dict:
+    # One timed model call + parse; counted against the model's tier
+    start = time.perf_counter()
+    usage = None
+    try:
+        resp = client.responses.create(model=model, input=_strategy_input(user_prompt))
+        usage = getattr(resp, "usage", None)
+        result = _parse_strategy_json(_response_text(resp))
+    except Exception:
+        get_cascade_stats().record_call(model, time.perf_counter() - start, usage, error=True)
+        raise
+    get_cascade_stats().record_call(model, time.perf_counter() - start, usage)
+    return result
+
+
+async def _fetch_json_async(client: AsyncOpenAI, model: str, user_prompt: str) -> dict:
+    start = time.perf_counter()
+    usage = None
+    try:
+        resp = await client.responses.create(model=model, input=_strategy_input(user_prompt))
+        usage = getattr(resp, "usage", None)
+        result = _parse_strategy_json(_response_text(resp))
+    except Exception:
+        get_cascade_stats().record_call(model, time.perf_counter() - start, usage, error=True)
+        raise
+    get_cascade_stats().record_call(model, time.perf_counter() - start, usage)
+    return result
+
+
+def _section_context(
+    *,
+    product_name: str,
+    target_users: str,
+    goal: str,
+    company_type: str,
+    constraints: str,
+    tavily_raw_json: str,
+    extra_instructions: str = "",
+    **_: Any,
+) -> str:
+    return STRATEGY_SECTION_CONTEXT_TEMPLATE.format(
+        product_name=product_name,
+        target_users=target_users,
+        goal=goal,
+        company_type=company_type,
+        constraints=constraints or "none specified",
+        tavily_raw_json=tavily_raw_json,
+        extra_instructions=extra_instructions or "None",
+    )
+
+
+# ---- MODEL CASCADE ----
+# Sections other sections are built from; shown to the model when it
+# rewrites a failed section so the result stays consistent.
+_FIX_CONTEXT_SECTIONS = ("market_gaps", "feature_ideas", "prioritized_features", "three_month_roadmap")
+
+
+def _compact_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+async def _ask_sections(user_prompt: str, model: str, use_cache: bool, counts: Dict[str, int]) -> dict:
+    # Cached JSON call for a subset of sections; {} if the reply doesn't parse
+    client = get_async_client()
+    key = _llm_key(model, STRATEGY_PIPELINE_SYSTEM_PROMPT, user_prompt, format="json")
+    try:
+        part, hit = await _cached_llm_async(
+            key, lambda: _fetch_json_async(client, model, user_prompt), use_cache
+        )
+    except ValueError:
+        part, hit = {}, False
+    counts["calls"] += 1
+    counts["hits"] += int(hit)
+    return part if isinstance(part, dict) else {}
+
+
+async def _regenerate_sections(
+    problems: Dict[str, str],
+    strategy: dict,
+    model: str,
+    generation_args: dict,
+    use_cache: bool,
+    counts: Dict[str, int],
+) -> dict:
+    """
+    One call on `model` for just the failed sections. Returns {} if the
+    reply doesn't parse (the sections stay failed for the next tier).
+    """
+    user_prompt = _section_context(**generation_args) + SECTION_FIX_TEMPLATE.format(
+        problems="\n".join(f"- {key}: {problem}" for key, problem in problems.items()),
+        accepted_json=_compact_json(
+            {k: strategy[k] for k in _FIX_CONTEXT_SECTIONS if k in strategy and k not in problems}
+        ),
+        shape_json=json.dumps({k: SECTION_SHAPES[k] for k in problems}, indent=2),
+    )
+    return await _ask_sections(user_prompt, model, use_cache, counts)
+
+
+async def _apply_cascade(
+    strategy: dict,
+    tiers: list,
+    generation_args: dict,
+    use_cache: bool,
+    counts: Dict[str, int],
+    on_section: Optional[Callable[[str, Any], None]] = None,
+    repaired: Optional[list] = None,
+    generated: Optional[list] = None,
+) -> dict:
+    """
+    Validate the first tier's strategy and repair what can be fixed locally.
+    Sections that are simply missing (truncated output) are asked for once
+    more on the same tier; whatever is still invalid goes to each following
+    tier in turn. Every re-ask covers only the failed sections and shows
+    the accepted ones. Never raises on bad output: leftovers are reported
+    in `_cascade`. `generated` limits the first tier's success counters
+    to the sections it actually wrote (refinements reuse the rest).
+    """
+    report: Dict[str, Any] = {
+        "tiers": [tiers[0]],
+        "repaired_locally": [],
+        "followed_up": [],
+        "escalated": {},
+    }
+    stats = get_cascade_stats()
+
+    strategy, fixed = repair_strategy(strategy)
+    report["repaired_locally"] = list(repaired or ()) + fixed
+    problems = validate_strategy(strategy)
+    scope = generated if generated is not None else STRATEGY_SECTIONS
+    stats.record_sections(tiers[0], len(scope), sum(1 for key in scope if key not in problems))
+    if on_section:
+        for key in fixed:
+            on_section(key, strategy[key])
+
+    async def ask(model: str, failed: Dict[str, str]) -> list:
+        part, _ = repair_strategy(
+            await _regenerate_sections(failed, strategy, model, generation_args, use_cache, counts)
+        )
+        fixed = [key for key in failed if validate_section(key, part.get(key)) is None]
+        stats.record_sections(model, len(failed), len(fixed))
+        for key in fixed:
+            strategy[key] = part[key]
+            if on_section:
+                on_section(key, part[key])
+        return fixed
+
+    missing = {key: problem for key, problem in problems.items() if problem == SECTION_MISSING}
+    # Nothing usable at all means the tier failed, not that it ran out of room
+    if missing and len(missing) < len(STRATEGY_SECTIONS):
+        report["followed_up"] = list(missing)
+        fixed = await ask(tiers[0], missing)
+        problems = {key: problem for key, problem in problems.items() if key not in fixed}
+
+    for model in tiers[1:]:
+        if not problems:
+            break
+        report["tiers"].append(model)
+        report["escalated"][model] = list(problems)
+        fixed = await ask(model, problems)
+        problems = {key: problem for key, problem in problems.items() if key not in fixed}
+
+    report["unresolved"] = problems
+    order = STRATEGY_INPUT_FIELDS + STRATEGY_SECTIONS
+    merged = {key: strategy[key] for key in order if key in strategy}
+    merged.update({key: value for key, value in strategy.items() if key not in merged})
+    merged["_cascade"] = report
+    return merged
+
+
+def _inputs_only(generation_args: dict) -> dict:
+    # Starting point when the first tier's JSON is unusable
+    return {key: generation_args[key] for key in STRATEGY_INPUT_FIELDS}
+
+
+# ---- SECTIONED GENERATION ----
+def _generation_mode(generation_mode: Optional[str]) -> str:
+    mode = (generation_mode or GENERATION_MODE).lower()
+    if mode not in GENERATION_MODES:
+        raise ValueError(f"Unknown generation mode {mode!r}; expected one of {GENERATION_MODES}")
+    return mode
+
+
+def _unwrap_prd(part: dict) -> dict:
+    # Models sometimes wrap the object: {"prd": {...}}
+    if "feature_name" not in part and len(part) == 1:
+        (value,) = part.values()
+        if isinstance(value, dict):
+            return value
+    return part
+
+
+async def _generate_sectioned(
+    *,
+    product_name: str,
+    target_users: str,
+    goal: str,
+    company_type: str,
+    constraints: str,
+    tavily_raw_json: str,
+    extra_instructions: str = "",
+    model: Optional[str] = None,
+    use_cache: bool = True,
+    on_section: Optional[Callable[[str, Any], None]] = None,
+) -> dict:
+    """
+    Build the strategy from small concurrent calls:
+      - overview, competitor and pain analysis (independent of features)
+      - gaps + features + scores, and as soon as those exist:
+        roadmap and one PRD per top feature, fanned out in parallel
+    Output length per call is what drives latency, so the critical path is
+    the feature call plus the slowest PRD instead of the whole document.
+    Each call is cached on its own, so a retry only redoes failed sections.
+    Calls run on the first model tier; invalid sections are escalated.
+    """
+    tiers = model_tiers(model)
+    first_tier = tiers[0]
+    client = get_async_client()
+    generation_args = dict(
+        product_name=product_name,
+        target_users=target_users,
+        goal=goal,
+        company_type=company_type,
+        constraints=constraints,
+        tavily_raw_json=tavily_raw_json,
+        extra_instructions=extra_instructions,
+    )
+    context = _section_context(**generation_args)
+    strategy: Dict[str, Any] = _inputs_only(generation_args)
+
+    counts = {"hits": 0, "calls": 0}
+    repaired: list = []
+
+    async def call(template: str, **fields) -> dict:
+        user_prompt = context + template.format(**fields)
+        key = _llm_key(first_tier, STRATEGY_PIPELINE_SYSTEM_PROMPT, user_prompt, format="json")
+        try:
+            part, hit = await _cached_llm_async(
+                key, lambda: _fetch_json_async(client, first_tier, user_prompt), use_cache
+            )
+        except ValueError:
+            # Unparseable section: left missing for the cascade to escalate
+            part, hit = {}, False
+        counts["calls"] += 1
+        counts["hits"] += int(hit)
+        return part
+
+    def merge(part: dict, keys) -> None:
+        # Repair before dependents (roadmap, PRDs) are built from it
+        part, fixed = repair_strategy(part)
+        repaired.extend(fixed)
+        for key in keys:
+            if key in part:
+                strategy[key] = part[key]
+                if on_section:
+                    on_section(key, part[key])
+
+    async def text_section(template: str, key: str) -> None:
+        merge(await call(template), [key])
+
+    async def features_and_dependents() -> None:
+        features = await call(FEATURES_SECTION)
+        merge(features, ["market_gaps", "feature_ideas", "prioritized_features"])
+
+        prioritized = strategy.get("prioritized_features")
+        if validate_section("prioritized_features", prioritized):
+            # Roadmap and PRDs would be built on bad input; escalate them too
+            return
+        prioritized = sorted(prioritized, key=lambda f: f["score"]["overall_priority"])
+        top = prioritized[:STRATEGY_PRD_COUNT]
+        roadmap, *prds = await asyncio.gather(
+            call(ROADMAP_SECTION, features_json=_compact_json(prioritized)),
+            *(call(PRD_SECTION, feature_json=_compact_json(f)) for f in top),
+        )
+        merge(roadmap, ["three_month_roadmap"])
+        merge({"prds": [_unwrap_prd(p) for p in prds if p]}, ["prds"])
+
+    await asyncio.gather(
+        text_section(MARKET_OVERVIEW_SECTION, "market_overview"),
+        text_section(COMPETITOR_SECTION, "competitor_analysis"),
+        text_section(USER_PAIN_SECTION, "user_pain_analysis"),
+        features_and_dependents(),
+    )
+
+    merged = await _apply_cascade(
+        strategy, tiers, generation_args, use_cache, counts, on_section, repaired=repaired
+    )
+    return _with_cache_info(merged, counts["hits"], counts["calls"])
+
+
+def _stream_sectioned(generation_args: dict) -> Iterator[Dict[str, Any]]:
+    # Sections finish on the event loop thread; hand them over via a queue
+    events: "queue.Queue" = queue.Queue()
+    start = time.perf_counter()
+
+    def worker():
+        try:
+            strategy = run_sync(
+                _generate_sectioned(
+                    **generation_args,
+                    on_section=lambda key, value: events.put(("section", key, value)),
+                )
+            )
+            events.put(("done", strategy, None))
+        except BaseException as exc:
+            events.put(("error", exc, None))
+
+    threading.Thread(target=worker, name="sectioned-strategy", daemon=True).start()
+
+    metrics = {"time_to_first_token": None, "time_to_first_section": None}
+    for key in STRATEGY_INPUT_FIELDS:
+        yield {"type": "section", "key": key, "value": generation_args[key], "elapsed": 0.0}
+    while True:
+        kind, payload, value = events.get()
+        elapsed = round(time.perf_counter() - start, 3)
+        if kind == "error":
+            raise payload
+        if kind == "done":
+            metrics["total_seconds"] = elapsed
+            yield {"type": "done", "strategy": payload, "metrics": metrics}
+            return
+        if metrics["time_to_first_section"] is None:
+            metrics["time_to_first_token"] = metrics["time_to_first_section"] = elapsed
+        yield {"type": "section", "key": payload, "value": value, "elapsed": elapsed}
+
+
 def generate_full_strategy_struct(
     *,
     product_name: str,
@@ -48,7 +547,9 @@ def generate_full_strategy_struct(
     constraints: str,
     tavily_raw_json: str,
     extra_instructions: str = "",
-    model: str = "gpt-5-nano",
+    model: Optional[str] = None,
+    generation_mode: Optional[str] = None,
+    use_cache: bool = True,
 ) -> dict:
     """
     Calls the OpenAI Responses API and returns a full structured strategy JSON:
@@ -60,61 +561,335 @@ def generate_full_strategy_struct(
     - prioritized_features (with scores)
     - three_month_roadmap
     - prds
+    generation_mode: "monolithic" (one call) or "sectioned" (concurrent
+    per-section calls); defaults to STRATEGY_GENERATION_MODE.
+    Results are cached by model + prompts; `use_cache=False` forces a new
+    call. The returned `_cache` field reports whether the model was skipped.
+    model: first tier of the cascade (default: STRATEGY_MODEL_TIERS[0]).
+    Invalid sections are repaired locally or re-asked on the next tier;
+    `_cascade` reports repaired, escalated and unresolved sections.
     """
-    client = get_client()
-
-    user_prompt = STRATEGY_PIPELINE_USER_TEMPLATE.format(
+    generation_args = dict(
         product_name=product_name,
         target_users=target_users,
         goal=goal,
         company_type=company_type,
-        constraints=constraints or "none specified",
+        constraints=constraints,
         tavily_raw_json=tavily_raw_json,
-        extra_instructions=extra_instructions or "None",
+        extra_instructions=extra_instructions,
     )
+    if _generation_mode(generation_mode) == "sectioned":
+        return run_sync(_generate_sectioned(**generation_args, model=model, use_cache=use_cache))
+
+    client = get_client()
+    tiers = model_tiers(model)
+    user_prompt = _build_strategy_prompt(**generation_args)
 
     # ❗ NO response_format here – your SDK doesn’t support it
-    resp = client.responses.create(
-        model=model,
-        input=[
-            {"role": "system", "content": STRATEGY_PIPELINE_SYSTEM_PROMPT},
-            {"role": "user", "content": user_prompt},
-        ],
+    key = _llm_key(tiers[0], STRATEGY_PIPELINE_SYSTEM_PROMPT, user_prompt, format="json")
+    try:
+        strategy, hit = _cached_llm(
+            key, lambda: _fetch_json(client, tiers[0], user_prompt), use_cache
+        )
+    except ValueError:
+        # Unparseable document: every section goes to the next tier
+        strategy, hit = _inputs_only(generation_args), False
+    counts = {"hits": int(hit), "calls": 1}
+    strategy = run_sync(_apply_cascade(strategy, tiers, generation_args, use_cache, counts))
+    return _with_cache_info(strategy, counts["hits"], counts["calls"])
+
+
+async def generate_full_strategy_struct_async(
+    *,
+    product_name: str,
+    target_users: str,
+    goal: str,
+    company_type: str,
+    constraints: str,
+    tavily_raw_json: str,
+    extra_instructions: str = "",
+    model: Optional[str] = None,
+    generation_mode: Optional[str] = None,
+    use_cache: bool = True,
+) -> dict:
+    """
+    Same as `generate_full_strategy_struct`, but on AsyncOpenAI so the
+    event loop keeps serving other tool calls while the model runs.
+    """
+    generation_args = dict(
+        product_name=product_name,
+        target_users=target_users,
+        goal=goal,
+        company_type=company_type,
+        constraints=constraints,
+        tavily_raw_json=tavily_raw_json,
+        extra_instructions=extra_instructions,
     )
+    if _generation_mode(generation_mode) == "sectioned":
+        return await _generate_sectioned(**generation_args, model=model, use_cache=use_cache)
 
-    # Try to safely get the JSON string from the response
-    try:
-        json_str = resp.output_text  # many SDKs expose this
-    except Exception:
-        try:
-            json_str = resp.output[0].content[0].text
-        except Exception:
-            raise RuntimeError("Could not extract text from OpenAI response")
+    client = get_async_client()
+    tiers = model_tiers(model)
+    user_prompt = _build_strategy_prompt(**generation_args)
 
-    # First attempt: parse directly
+    key = _llm_key(tiers[0], STRATEGY_PIPELINE_SYSTEM_PROMPT, user_prompt, format="json")
     try:
-        return json.loads(json_str)
-    except json.JSONDecodeError:
-        # Fallback: try to strip any leading/trailing noise
-        start = json_str.find("{")
-        end = json_str.rfind("}")
-        if start != -1 and end != -1 and end > start:
-            candidate = json_str[start : end + 1]
-            try:
-                return json.loads(candidate)
-            except json.JSONDecodeError:
-                pass
-
-        # If we reach here, the model didn't obey the JSON-only instruction
-        raise ValueError(
-            f"LLM returned invalid JSON for strategy pipeline. Raw text was:\n{json_str}"
+        strategy, hit = await _cached_llm_async(
+            key, lambda: _fetch_json_async(client, tiers[0], user_prompt), use_cache
+        )
+    except ValueError:
+        strategy, hit = _inputs_only(generation_args), False
+    counts = {"hits": int(hit), "calls": 1}
+    strategy = await _apply_cascade(strategy, tiers, generation_args, use_cache, counts)
+    return _with_cache_info(strategy, counts["hits"], counts["calls"])
+
+
+# ---- REFINEMENT ----
+async def _refine(
+    previous: dict,
+    generation_args: dict,
+    previous_extra_instructions: str,
+    model: Optional[str],
+    use_cache: bool,
+) -> dict:
+    tiers = model_tiers(model)
+    counts = {"hits": 0, "calls": 0}
+    current = dict(generation_args)
+    before = dict(previous, extra_instructions=previous_extra_instructions)
+    changed = changed_inputs(before, current)
+    sections = affected_sections(changed, generation_args.get("extra_instructions", ""))
+
+    strategy = {k: previous[k] for k in STRATEGY_SECTIONS if k in previous}
+    strategy.update({k: generation_args[k] for k in STRATEGY_INPUT_FIELDS})
+    if sections:
+        user_prompt = _section_context(**generation_args) + REFINE_SECTIONS_TEMPLATE.format(
+            changes="\n".join(
+                f"- {field}: {before.get(field) or 'none'!r} -> {current.get(field) or 'none'!r}"
+                for field in changed
+            ),
+            accepted_json=_compact_json(
+                {k: strategy[k] for k in _FIX_CONTEXT_SECTIONS if k in strategy and k not in sections}
+            ),
+            previous_json=_compact_json({k: previous.get(k) for k in sections}),
+            shape_json=json.dumps({k: SECTION_SHAPES[k] for k in sections}, indent=2),
+        )
+        part = await _ask_sections(user_prompt, tiers[0], use_cache, counts)
+        for key in sections:
+            # A section the reply left out is stale now; the cascade re-asks
+            strategy.pop(key, None)
+            if key in part:
+                strategy[key] = part[key]
+
+    merged = await _apply_cascade(
+        strategy, tiers, generation_args, use_cache, counts, generated=sections
+    )
+    merged["_refinement"] = {
+        "changed_fields": changed,
+        "regenerated": sections,
+        "reused": [k for k in STRATEGY_SECTIONS if k not in sections],
+    }
+    return _with_cache_info(merged, counts["hits"], counts["calls"])
+
+
+def refine_strategy_struct(
+    *,
+    previous: dict,
+    product_name: str,
+    target_users: str,
+    goal: str,
+    company_type: str,
+    constraints: str,
+    tavily_raw_json: str,
+    extra_instructions: str = "",
+    previous_extra_instructions: str = "",
+    model: Optional[str] = None,
+    use_cache: bool = True,
+) -> dict:
+    """
+    Delta update of `previous` (a strategy JSON) for new inputs: only the
+    sections affected by the changed fields (and sections derived from
+    them) are rewritten, in one call that sees the old versions; the rest
+    are reused. `_refinement` lists changed fields, regenerated and
+    reused sections. Pass the research context of the parent run.
+    """
+    return run_sync(
+        refine_strategy_struct_async(
+            previous=previous,
+            product_name=product_name,
+            target_users=target_users,
+            goal=goal,
+            company_type=company_type,
+            constraints=constraints,
+            tavily_raw_json=tavily_raw_json,
+            extra_instructions=extra_instructions,
+            previous_extra_instructions=previous_extra_instructions,
+            model=model,
+            use_cache=use_cache,
         )
+    )
 
 
-def render_strategy_markdown(strategy: dict) -> str:
+async def refine_strategy_struct_async(
+    *,
+    previous: dict,
+    product_name: str,
+    target_users: str,
+    goal: str,
+    company_type: str,
+    constraints: str,
+    tavily_raw_json: str,
+    extra_instructions: str = "",
+    previous_extra_instructions: str = "",
+    model: Optional[str] = None,
+    use_cache: bool = True,
+) -> dict:
+    """
+    Async twin of `refine_strategy_struct`.
+    """
+    generation_args = dict(
+        product_name=product_name,
+        target_users=target_users,
+        goal=goal,
+        company_type=company_type,
+        constraints=constraints,
+        tavily_raw_json=tavily_raw_json,
+        extra_instructions=extra_instructions,
+    )
+    return await _refine(previous, generation_args, previous_extra_instructions, model, use_cache)
+
+
+_PENDING = "_Generating…_"
+
+
+def stream_full_strategy_struct(
+    *,
+    product_name: str,
+    target_users: str,
+    goal: str,
+    company_type: str,
+    constraints: str,
+    tavily_raw_json: str,
+    extra_instructions: str = "",
+    model: Optional[str] = None,
+    generation_mode: Optional[str] = None,
+    use_cache: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming variant of `generate_full_strategy_struct`. Yields events:
+      {"type": "section", "key", "value", "elapsed"} per top-level key as
+      soon as its JSON is complete, then one
+      {"type": "done", "strategy", "metrics"} with time_to_first_token,
+      time_to_first_section and total_seconds.
+    In sectioned mode each section is emitted when its call returns; a
+    cached strategy is replayed at once. Sections repaired or escalated by
+    the model cascade are emitted again with their final value.
+    """
+    generation_args = dict(
+        product_name=product_name,
+        target_users=target_users,
+        goal=goal,
+        company_type=company_type,
+        constraints=constraints,
+        tavily_raw_json=tavily_raw_json,
+        extra_instructions=extra_instructions,
+    )
+    if _generation_mode(generation_mode) == "sectioned":
+        yield from _stream_sectioned(dict(generation_args, model=model, use_cache=use_cache))
+        return
+
+    client = get_client()
+    tiers = model_tiers(model)
+    user_prompt = _build_strategy_prompt(**generation_args)
+
+    start = time.perf_counter()
+    metrics = {"time_to_first_token": None, "time_to_first_section": None}
+    parser = IncrementalJSONObjectParser()
+    strategy: Dict[str, Any] = {}
+
+    def section(key, value):
+        elapsed = round(time.perf_counter() - start, 3)
+        if key in STRATEGY_SECTIONS and metrics["time_to_first_section"] is None:
+            metrics["time_to_first_section"] = elapsed
+        strategy[key] = value
+        return {"type": "section", "key": key, "value": value, "elapsed": elapsed}
+
+    def finish(counts: Dict[str, int]) -> Iterator[Dict[str, Any]]:
+        # Repairs / escalated sections replace what was already shown
+        changed: list = []
+        result = run_sync(
+            _apply_cascade(
+                dict(strategy), tiers, generation_args, use_cache, counts,
+                on_section=lambda k, value: changed.append((k, value)),
+            )
+        )
+        for k, value in changed:
+            yield section(k, value)
+        metrics["total_seconds"] = round(time.perf_counter() - start, 3)
+        yield {
+            "type": "done",
+            "strategy": _with_cache_info(result, counts["hits"], counts["calls"]),
+            "metrics": metrics,
+        }
+
+    # Shares entries with the non-streaming call (same model + prompts)
+    key = _llm_key(tiers[0], STRATEGY_PIPELINE_SYSTEM_PROMPT, user_prompt, format="json")
+    cache = None if LLM_CACHE_DISABLED else get_cache()
+    cached = cache.get_json(_LLM_NAMESPACE, key) if cache and use_cache else None
+    if cached is not None:
+        metrics["time_to_first_token"] = round(time.perf_counter() - start, 3)
+        for k, value in cached.items():
+            yield section(k, value)
+        yield from finish({"hits": 1, "calls": 1})
+        return
+
+    usage = None
+    stream = client.responses.create(
+        model=tiers[0], input=_strategy_input(user_prompt), stream=True
+    )
+    for event in stream:
+        etype = getattr(event, "type", "")
+        if etype == "response.output_text.delta":
+            if metrics["time_to_first_token"] is None:
+                metrics["time_to_first_token"] = round(time.perf_counter() - start, 3)
+            for k, value in parser.feed(event.delta):
+                yield section(k, value)
+        elif etype == "response.completed":
+            usage = getattr(getattr(event, "response", None), "usage", None)
+        elif etype in ("response.failed", "error"):
+            error = getattr(getattr(event, "response", None), "error", None)
+            get_cascade_stats().record_call(tiers[0], time.perf_counter() - start, error=True)
+            raise RuntimeError(
+                f"Strategy stream failed: {error or getattr(event, 'message', etype)}"
+            )
+
+    parsed = parser.done
+    if not parser.done or any(k not in strategy for k in STRATEGY_SECTIONS):
+        # The model broke the JSON mid-way; fall back to whole-document parsing
+        try:
+            for k, value in _parse_strategy_json(parser.text).items():
+                if k not in strategy:
+                    yield section(k, value)
+            parsed = True
+        except ValueError:
+            # Keep the sections that did arrive; the cascade redoes the rest
+            for k in STRATEGY_INPUT_FIELDS:
+                if k not in strategy:
+                    yield section(k, generation_args[k])
+    get_cascade_stats().record_call(
+        tiers[0], time.perf_counter() - start, usage, error=not parsed
+    )
+
+    if cache and parsed:
+        cache.set_json(_LLM_NAMESPACE, key, strategy, ttl=LLM_CACHE_TTL)
+    yield from finish({"hits": 0, "calls": 1})
+
+
+def render_strategy_markdown(strategy: dict, pending: Optional[set] = None) -> str:
     """
     Turn the strategy JSON into a human-readable markdown doc.
+    Sections listed in `pending` (still streaming) get a placeholder.
     """
+    pending = set(pending or ())
     product_name = strategy.get("product_name", "")
     target_users = strategy.get("target_users", "")
     goal = strategy.get("goal", "")
@@ -139,19 +914,30 @@ def render_strategy_markdown(strategy: dict) -> str:
     lines.append(f"**Constraints:** {constraints or 'None'}\n")
 
     lines.append("## 1. Market Overview\n")
-    lines.append(market_overview or "_No overview generated._")
+    if "market_overview" in pending:
+        lines.append(_PENDING)
+    else:
+        lines.append(market_overview or "_No overview generated._")
     lines.append("")
 
     lines.append("## 2. Competitor Analysis\n")
-    lines.append(competitor_analysis or "_No competitor analysis._")
+    if "competitor_analysis" in pending:
+        lines.append(_PENDING)
+    else:
+        lines.append(competitor_analysis or "_No competitor analysis._")
     lines.append("")
 
     lines.append("## 3. User Pain Analysis\n")
-    lines.append(user_pain_analysis or "_No user pain analysis._")
+    if "user_pain_analysis" in pending:
+        lines.append(_PENDING)
+    else:
+        lines.append(user_pain_analysis or "_No user pain analysis._")
     lines.append("")
 
     lines.append("## 4. Market Gaps\n")
-    if market_gaps:
+    if "market_gaps" in pending:
+        lines.append(_PENDING)
+    elif market_gaps:
         for gap in market_gaps:
             lines.append(f"- {gap}")
     else:
@@ -159,7 +945,9 @@ def render_strategy_markdown(strategy: dict) -> str:
     lines.append("")
 
     lines.append("## 5. Feature Ideas\n")
-    if feature_ideas:
+    if "feature_ideas" in pending:
+        lines.append(_PENDING)
+    elif feature_ideas:
         for f in feature_ideas:
             lines.append(f"### {f.get('name', 'Unnamed feature')}")
             lines.append(f"{f.get('description', '')}")
@@ -171,7 +959,9 @@ def render_strategy_markdown(strategy: dict) -> str:
     lines.append("")
 
     lines.append("## 6. Prioritized Features (with scores)\n")
-    if prioritized_features:
+    if "prioritized_features" in pending:
+        lines.append(_PENDING)
+    elif prioritized_features:
         sorted_features = sorted(
             prioritized_features,
             key=lambda x: x.get("score", {}).get("overall_priority", 999),
@@ -192,21 +982,27 @@ def render_strategy_markdown(strategy: dict) -> str:
     lines.append("")
 
     lines.append("## 7. 3-Month Roadmap\n")
-    lines.append("### Month 1")
-    for item in roadmap.get("month_1", []):
-        lines.append(f"- {item}")
-    lines.append("")
-    lines.append("### Month 2")
-    for item in roadmap.get("month_2", []):
-        lines.append(f"- {item}")
-    lines.append("")
-    lines.append("### Month 3")
-    for item in roadmap.get("month_3", []):
-        lines.append(f"- {item}")
-    lines.append("")
+    if "three_month_roadmap" in pending:
+        lines.append(_PENDING)
+        lines.append("")
+    else:
+        lines.append("### Month 1")
+        for item in roadmap.get("month_1", []):
+            lines.append(f"- {item}")
+        lines.append("")
+        lines.append("### Month 2")
+        for item in roadmap.get("month_2", []):
+            lines.append(f"- {item}")
+        lines.append("")
+        lines.append("### Month 3")
+        for item in roadmap.get("month_3", []):
+            lines.append(f"- {item}")
+        lines.append("")
 
     lines.append("## 8. PRDs (Product Requirement Documents)\n")
-    if prds:
+    if "prds" in pending:
+        lines.append(_PENDING)
+    elif prds:
         for prd in prds:
             lines.append(f"### {prd.get('feature_name', 'Unnamed feature')}")
             lines.append(f"**Description:** {prd.get('description', '')}")
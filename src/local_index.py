@@ -0,0 +1,373 @@
+# src/local_index.py
+"""
+Offline vector index used when VECTOR_BACKEND=local.
+
+Vectors live in a memory-mapped float32 matrix (L2-normalised, so a dot
+product is cosine similarity) with an id map and a JSONL side file for
+the document payloads. Small corpora are searched exactly with one
+batched matrix product; above LOCAL_INDEX_EXACT_MAX vectors an IVF
+(k-means coarse quantizer) narrows the scan to the closest `nprobe`
+clusters. The quantizer is retrained in a background thread, so the
+save that crosses the threshold doesn't wait for k-means.
+
+Several processes (UI, MCP server, batch runner) may share a directory:
+writes hold an exclusive lock on `index.lock`, reads a shared one, and
+each process catches up with rows appended by the others before using
+the index. docs.jsonl is the commit record: a row exists once its line
+is there, and its vector is written before it.
+"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .response_cache import CACHE_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, one process per LOCAL_INDEX_DIR
+    fcntl = None
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "atlas").lower()
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", os.path.join(CACHE_DIR, "vector_index"))
+LOCAL_INDEX_EXACT_MAX = int(os.getenv("LOCAL_INDEX_EXACT_MAX", "20000"))
+LOCAL_INDEX_NPROBE = int(os.getenv("LOCAL_INDEX_NPROBE", "8"))
+
+
+def use_local_backend() -> bool:
+    return VECTOR_BACKEND == "local"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+
+def _kmeans(data: np.ndarray, n_clusters: int, iters: int = 10, seed: int = 0) -> np.ndarray:
+    # Spherical k-means on a sample; good enough for a coarse quantizer
+    rng = np.random.default_rng(seed)
+    n_sample = min(data.shape[0], n_clusters * 64)
+    sample = data[rng.choice(data.shape[0], n_sample, replace=False)]
+    centroids = sample[rng.choice(sample.shape[0], n_clusters, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(n_clusters):
+            members = sample[assign == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+        centroids = _normalize(centroids)
+    return centroids
+
+
+class _FileLock:
+    """
+    Cross-process advisory lock on a side file. flock locks belong to the
+    open file, which all threads share, so callers serialise threads with
+    their own lock first.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "a")
+
+    @contextmanager
+    def hold(self, exclusive: bool):
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+
+class LocalVectorIndex:
+    def __init__(self, path: str, dim: int):
+        self.path = path
+        self.dim = dim
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+
+        self._meta_path = os.path.join(path, "meta.json")
+        self._matrix_path = os.path.join(path, "vectors.f32")
+        self._docs_path = os.path.join(path, "docs.jsonl")
+        self._ivf_path = os.path.join(path, "ivf.npz")
+        self._file_lock = _FileLock(os.path.join(path, "index.lock"))
+
+        self.count = 0
+        self.capacity = 0
+        self._matrix: Optional[np.memmap] = None
+        self.ids: List[str] = []
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self._row: Dict[str, int] = {}
+        # Bytes of docs.jsonl applied so far
+        self._docs_offset = 0
+
+        self._centroids: Optional[np.ndarray] = None
+        self._assign: Optional[np.ndarray] = None
+        self._trained_at = 0
+        self._ivf_mtime: Optional[int] = None
+        self._training = False
+
+        with self._lock, self._file_lock.hold(exclusive=False):
+            self._refresh()
+
+    # ---- storage ----
+    def _open_matrix(self, capacity: int) -> np.memmap:
+        mode = "r+" if os.path.exists(self._matrix_path) else "w+"
+        return np.memmap(
+            self._matrix_path, dtype=np.float32, mode=mode, shape=(capacity, self.dim)
+        )
+
+    def _grow(self, needed: int) -> None:
+        if needed <= self.capacity:
+            return
+        new_capacity = max(needed, self.capacity * 2, 1024)
+        if self._matrix is not None:
+            self._matrix.flush()
+            del self._matrix
+        with open(self._matrix_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self.capacity = new_capacity
+        self._matrix = self._open_matrix(new_capacity)
+
+    def _write_meta(self) -> None:
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"dim": self.dim, "count": self.count, "capacity": self.capacity}, f)
+        os.replace(tmp, self._meta_path)
+
+    def _ivf_stamp(self) -> Optional[int]:
+        try:
+            return os.stat(self._ivf_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _refresh(self) -> None:
+        """
+        Catch up with rows, payload updates and quantizer retrains written
+        by other processes. Caller holds both locks.
+        """
+        size = os.path.getsize(self._docs_path) if os.path.exists(self._docs_path) else 0
+        if size == self._docs_offset and self._ivf_stamp() == self._ivf_mtime:
+            return
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+            if meta["dim"] != self.dim:
+                raise ValueError(
+                    f"Local index at {self.path} has dim {meta['dim']}, expected {self.dim}"
+                )
+            if meta["capacity"] != self.capacity:
+                self.capacity = meta["capacity"]
+                self._matrix = self._open_matrix(self.capacity) if self.capacity else None
+
+        if size > self._docs_offset:
+            with open(self._docs_path, "rb") as f:
+                f.seek(self._docs_offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn tail of a crashed write; the next writer cuts it
+                    self._docs_offset += len(line)
+                    self._apply(json.loads(line))
+        self.count = min(len(self.ids), self.capacity)
+
+        stamp = self._ivf_stamp()
+        if stamp is not None and stamp != self._ivf_mtime:
+            data = np.load(self._ivf_path)
+            self._centroids = data["centroids"]
+            self._assign = data["assign"]
+            self._trained_at = int(data["trained_at"])
+            self._ivf_mtime = stamp
+        self._assign_tail()
+
+    def _apply(self, row: Dict[str, Any]) -> None:
+        if "set" in row:
+            # Payload update (see `update`), not a new row
+            self.docs.setdefault(row["id"], {}).update(row["set"])
+            return
+        self._row[row["id"]] = len(self.ids)
+        self.ids.append(row["id"])
+        self.docs[row["id"]] = row.get("doc", {})
+
+    def _assign_tail(self) -> None:
+        # Route rows added after the last training to their nearest centroid
+        if self._centroids is None:
+            return
+        tail = self._assign.shape[0]
+        if tail < self.count:
+            extra = np.asarray(self._matrix[tail : self.count]) @ self._centroids.T
+            self._assign = np.concatenate([self._assign, np.argmax(extra, axis=1)])
+
+    def _append_docs(self, rows: List[Dict[str, Any]]) -> None:
+        # Caller holds both locks (exclusive) and has refreshed
+        if os.path.exists(self._docs_path) and os.path.getsize(self._docs_path) > self._docs_offset:
+            os.truncate(self._docs_path, self._docs_offset)
+        data = b"".join(json.dumps(row, default=str).encode() + b"\n" for row in rows)
+        with open(self._docs_path, "ab") as f:
+            f.write(data)
+        self._docs_offset += len(data)
+        for row in rows:
+            self._apply(row)
+
+    def refresh(self) -> None:
+        with self._lock, self._file_lock.hold(exclusive=False):
+            self._refresh()
+
+    # ---- writes ----
+    def add(
+        self,
+        ids: Sequence[str],
+        vectors: np.ndarray,
+        docs: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> None:
+        vectors = _normalize(np.atleast_2d(vectors))
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dim vectors, got {vectors.shape[1]}")
+        docs = docs or [{} for _ in ids]
+
+        with self._lock, self._file_lock.hold(exclusive=True):
+            self._refresh()
+            start = self.count
+            self._grow(start + len(ids))
+            # Vectors first: a row only counts once its docs line is written
+            self._matrix[start : start + len(ids)] = vectors
+            self._matrix.flush()
+            self._append_docs([{"id": doc_id, "doc": doc} for doc_id, doc in zip(ids, docs)])
+            self.count = start + len(ids)
+            self._write_meta()
+            self._assign_tail()
+
+            # (Re)train the coarse quantizer each time the corpus doubles
+            grown = self.count >= 2 * max(self._trained_at, 1)
+            if self.count > LOCAL_INDEX_EXACT_MAX and grown and not self._training:
+                self._training = True
+                threading.Thread(target=self._train, name="local-index-train", daemon=True).start()
+
+    def update(self, doc_id: str, fields: Dict[str, Any]) -> None:
+        """
+        Set payload fields of a stored row; appended to the docs file so
+        it stays append-only.
+        """
+        with self._lock, self._file_lock.hold(exclusive=True):
+            self._refresh()
+            if doc_id not in self._row:
+                raise KeyError(doc_id)
+            self._append_docs([{"id": doc_id, "set": fields}])
+
+    def _train(self) -> None:
+        """
+        k-means over the rows present when training starts, outside the
+        lock (written rows never change); searches keep using the previous
+        quantizer or the exact scan meanwhile.
+        """
+        try:
+            with self._lock:
+                matrix, n = self._matrix, self.count
+            data = np.asarray(matrix[:n])
+            centroids = _kmeans(data, max(1, int(np.sqrt(n))))
+            # Assign in chunks to keep peak memory flat on big corpora
+            assign = np.empty(n, dtype=np.int32)
+            for i in range(0, n, 65536):
+                assign[i : i + 65536] = np.argmax(data[i : i + 65536] @ centroids.T, axis=1)
+
+            with self._lock, self._file_lock.hold(exclusive=True):
+                self._refresh()
+                if self._trained_at >= n:
+                    return  # another process saved a newer quantizer meanwhile
+                tmp = self._ivf_path + ".tmp"
+                with open(tmp, "wb") as f:
+                    np.savez(f, centroids=centroids, assign=assign, trained_at=n)
+                os.replace(tmp, self._ivf_path)
+                self._centroids, self._assign, self._trained_at = centroids, assign, n
+                self._ivf_mtime = self._ivf_stamp()
+                self._assign_tail()
+        finally:
+            with self._lock:
+                self._training = False
+
+    # ---- reads ----
+    def get_vectors(self, ids: Sequence[str]) -> np.ndarray:
+        with self._lock, self._file_lock.hold(exclusive=False):
+            self._refresh()
+            rows = [self._row[i] for i in ids]
+            if not rows:
+                return np.zeros((0, self.dim), np.float32)
+            return np.asarray(self._matrix[rows])
+
+    def search(
+        self,
+        query_vec: Sequence[float],
+        k: int,
+        *,
+        filter_fn: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        nprobe: int = LOCAL_INDEX_NPROBE,
+    ) -> List[Tuple[str, float]]:
+        q = _normalize(np.asarray(query_vec, dtype=np.float32))
+        with self._lock, self._file_lock.hold(exclusive=False):
+            self._refresh()
+            if self.count == 0:
+                return []
+            matrix = self._matrix[: self.count]
+
+            if self._centroids is not None and self.count > LOCAL_INDEX_EXACT_MAX:
+                probes = _top_k(self._centroids @ q, nprobe)
+                rows = np.flatnonzero(np.isin(self._assign[: self.count], probes))
+            else:
+                rows = np.arange(self.count)
+
+            if filter_fn is not None:
+                rows = np.array(
+                    [r for r in rows if filter_fn(self.docs.get(self.ids[r], {}))],
+                    dtype=np.int64,
+                )
+            if rows.size == 0:
+                return []
+
+            scores = np.asarray(matrix[rows]) @ q
+            best = _top_k(scores, k)
+            return [(self.ids[rows[i]], float(scores[i])) for i in best]
+
+    def __len__(self) -> int:
+        return self.count
+
+
+_indexes: Dict[str, LocalVectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_local_index(name: str, dim: int) -> LocalVectorIndex:
+    """
+    Process-wide index for `name`, caught up with other processes' writes.
+    """
+    with _indexes_lock:
+        index = _indexes.get(name)
+        if index is None:
+            index = _indexes[name] = LocalVectorIndex(os.path.join(LOCAL_INDEX_DIR, name), dim)
+    index.refresh()
+    return index
+
+
+def _reset_after_fork() -> None:
+    # A child must not share the parent's lock file description (or its
+    # training thread); it reopens the indexes on first use.
+    global _indexes_lock
+    _indexes.clear()
+    _indexes_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
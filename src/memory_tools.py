@@ -1,6 +1,10 @@
 # src/memory_tools.py
+from typing import List
+
 from fastmcp import FastMCP
-from .db import save_strategy_to_db, search_similar_strategies
+from .db import search_strategies
+from .blob_store import BLOB_FIELDS, blob_fields
+from .write_behind import lookup_strategies, lookup_strategy, persist_strategy
 
 from bson import ObjectId
 from .db_client import get_mongo_collection
@@ -11,27 +15,65 @@ app = FastMCP("memory")
 @app.tool
 def memory_save_strategy(strategy: dict) -> dict:
     """
-    Save strategy into MongoDB with embedding.
+    Save strategy into MongoDB with embedding (queued; returns its id).
     """
-    return save_strategy_to_db(strategy)
+    return persist_strategy(strategy)
 
 
 @app.tool
-def memory_search_similar(query: str, top_k: int = 3) -> dict:
+def memory_search_similar(
+    query: str,
+    top_k: int = 3,
+    mode: str = "vector",
+    company_type: str = "",
+    product_name: str = "",
+    tags: str = "",
+    created_after: str = "",
+    created_before: str = "",
+    include_duplicates: bool = False,
+    mmr_lambda: float = 1.0,
+) -> dict:
     """
-    Vector search strategies similar to query.
+    Search strategies similar to query.
+    mode: "vector", "lexical" (BM25) or "hybrid" (rank-fused).
+    Filters (all optional): company_type, product_name, comma-separated
+    tags (any of), created_after / created_before as ISO dates.
+    Near-duplicate runs are hidden unless include_duplicates is set.
+    mmr_lambda < 1 re-ranks for diversity (0 = most diverse, 1 = off).
     """
-    return {"results": search_similar_strategies(query, top_k)}
+    filters = {
+        "company_type": company_type,
+        "product_name": product_name,
+        "tags": tags,
+        "created_after": created_after,
+        "created_before": created_before,
+        "include_duplicates": include_duplicates,
+    }
+    try:
+        return search_strategies(query, top_k, mode, filters, mmr_lambda)
+    except ValueError as e:
+        return {"error": str(e)}
 
 
 
 @app.tool
-def memory_get_strategy_by_id(mongo_id: str) -> dict:
+def memory_get_strategy_by_id(mongo_id: str, fields: str = "") -> dict:
     """
-    Return exactly one saved strategy by Mongo `_id`
+    Return exactly one saved strategy by Mongo `_id`, without vectors.
+    The bulky fields are only loaded when asked for: `fields` is a comma
+    list of tavily_raw, strategy_json, strategy_markdown, or "all".
     """
+    doc = lookup_strategy(mongo_id, fields or None)
+    if doc is not None:
+        return doc
+
+    # Runs archived by workflows.strategy_pipeline live in their own collection
+    wanted = blob_fields(fields or None)
     coll = get_mongo_collection()
-    doc = coll.find_one({"_id": ObjectId(mongo_id)})
+    doc = coll.find_one(
+        {"_id": ObjectId(mongo_id)},
+        {f: 0 for f in BLOB_FIELDS if f not in wanted},
+    )
 
     if not doc:
         return {"error": "Not found"}
@@ -40,3 +82,17 @@ def memory_get_strategy_by_id(mongo_id: str) -> dict:
     doc["_id"] = str(doc["_id"])
     return doc
 
+
+@app.tool
+def memory_get_strategies(ids: List[str], view: str = "summary", fields: str = "") -> dict:
+    """
+    Fetch several saved strategies in one round trip, in the order given.
+    view: "summary" (inputs + preview), "roadmap" (+ prioritized features
+    and roadmap) or "full" (+ research, strategy JSON and markdown).
+    `fields` (comma list of dotted paths, e.g. "goal,strategy_json.prds")
+    overrides the view. Unknown ids come back as {"id", "error"}.
+    """
+    try:
+        return {"results": list(lookup_strategies(ids, view, fields or None))}
+    except ValueError as e:
+        return {"error": str(e)}
@@ -0,0 +1,123 @@
+# src/model_cascade.py
+"""
+Model tiers for strategy generation and per-tier counters.
+
+Generation starts on the first (cheapest) tier; sections that still fail
+validation after local repair are re-asked on the next tier, and so on.
+Counters cover latency, token usage, estimated cost and the share of
+requested sections each tier got right, so the tier list can be tuned.
+"""
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+STRATEGY_MODEL_TIERS = [
+    m.strip()
+    for m in os.getenv("STRATEGY_MODEL_TIERS", "gpt-5-nano,gpt-5-mini").split(",")
+    if m.strip()
+]
+
+# USD per 1M tokens: (input, output). Override/extend with STRATEGY_MODEL_PRICES
+# as JSON, e.g. '{"gpt-5": [1.25, 10.0]}'.
+MODEL_PRICES: Dict[str, List[float]] = {
+    "gpt-5-nano": [0.05, 0.40],
+    "gpt-5-mini": [0.25, 2.00],
+    "gpt-5": [1.25, 10.00],
+    "gpt-4.1-mini": [0.40, 1.60],
+}
+MODEL_PRICES.update(json.loads(os.getenv("STRATEGY_MODEL_PRICES", "{}")))
+
+
+def model_tiers(model: Optional[str] = None) -> List[str]:
+    """
+    Tiers to try, cheapest first. An explicit `model` starts the cascade
+    there (or in front of the strongest tier if it isn't listed).
+    """
+    tiers = STRATEGY_MODEL_TIERS or ["gpt-5-nano"]
+    if not model:
+        return list(tiers)
+    if model in tiers:
+        return tiers[tiers.index(model):]
+    return [model, tiers[-1]]
+
+
+def _usage_tokens(usage: Any) -> tuple:
+    if usage is None:
+        return 0, 0
+    if isinstance(usage, dict):
+        return int(usage.get("input_tokens") or 0), int(usage.get("output_tokens") or 0)
+    return int(getattr(usage, "input_tokens", 0) or 0), int(getattr(usage, "output_tokens", 0) or 0)
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    price_in, price_out = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (input_tokens * price_in + output_tokens * price_out) / 1_000_000
+
+
+class CascadeStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiers: Dict[str, Dict[str, float]] = {}
+
+    def _tier(self, model: str) -> Dict[str, float]:
+        tier = self._tiers.get(model)
+        if tier is None:
+            tier = self._tiers[model] = {
+                "calls": 0,
+                "errors": 0,
+                "seconds": 0.0,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "cost_usd": 0.0,
+                "sections_requested": 0,
+                "sections_valid": 0,
+            }
+        return tier
+
+    def record_call(self, model: str, seconds: float, usage: Any = None, error: bool = False) -> None:
+        """
+        One model call (cache hits are not counted here).
+        """
+        input_tokens, output_tokens = _usage_tokens(usage)
+        with self._lock:
+            tier = self._tier(model)
+            tier["calls"] += 1
+            tier["errors"] += int(error)
+            tier["seconds"] += seconds
+            tier["input_tokens"] += input_tokens
+            tier["output_tokens"] += output_tokens
+            tier["cost_usd"] += estimate_cost(model, input_tokens, output_tokens)
+
+    def record_sections(self, model: str, requested: int, valid: int) -> None:
+        with self._lock:
+            tier = self._tier(model)
+            tier["sections_requested"] += requested
+            tier["sections_valid"] += valid
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = {}
+            for model, tier in self._tiers.items():
+                s = dict(tier)
+                s["avg_latency"] = round(s["seconds"] / s["calls"], 3) if s["calls"] else None
+                s["success_rate"] = (
+                    round(s["sections_valid"] / s["sections_requested"], 3)
+                    if s["sections_requested"]
+                    else None
+                )
+                s["seconds"] = round(s["seconds"], 3)
+                s["cost_usd"] = round(s["cost_usd"], 6)
+                out[model] = s
+            return out
+
+
+_stats = CascadeStats()
+
+
+def get_cascade_stats() -> CascadeStats:
+    return _stats
+
+
+def cascade_stats() -> Dict[str, Any]:
+    return {"tiers": STRATEGY_MODEL_TIERS, "by_model": _stats.stats()}
@@ -0,0 +1,100 @@
+# src/quantization.py
+"""
+Helpers for storing strategy embeddings in less space.
+
+- `shorten`: Matryoshka-style truncation + renormalisation (what the
+  OpenAI `dimensions=` parameter does server-side).
+- `quantize_int8` / `quantize_binary`: scalar and 1-bit quantization.
+- `to_bson_vector`: BSON BinData vectors, which Atlas Vector Search
+  indexes natively and which are far smaller than an array of doubles.
+- `rescore`: exact cosine over full-precision vectors for the top
+  candidates returned by the compressed index.
+"""
+from typing import List, Sequence, Tuple
+
+import numpy as np
+from bson.binary import Binary, BinaryVectorDtype
+
+STORAGE_FORMATS = ("array", "float32", "int8", "binary")
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def shorten(vectors: np.ndarray, dims: int) -> np.ndarray:
+    return normalize(np.asarray(vectors, dtype=np.float32)[..., :dims])
+
+
+def quantize_int8(vectors: np.ndarray) -> np.ndarray:
+    """
+    Symmetric per-vector scaling into [-127, 127]. Cosine ranking only
+    depends on direction, so the per-vector scale can be dropped.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scale = np.abs(vectors).max(axis=-1, keepdims=True)
+    scale[scale == 0] = 1.0
+    return np.round(vectors / scale * 127).astype(np.int8)
+
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    # Sign bit per dimension, packed 8 per byte
+    return np.packbits(np.asarray(vectors) > 0, axis=-1)
+
+
+def to_bson_vector(vector: np.ndarray, storage: str):
+    vector = np.asarray(vector)
+    if storage == "array":
+        # Legacy layout: BSON array of doubles
+        return vector.astype(float).tolist()
+    if storage == "float32":
+        return Binary.from_vector(vector.astype(np.float32).tolist(), BinaryVectorDtype.FLOAT32)
+    if storage == "int8":
+        return Binary.from_vector(quantize_int8(vector).tolist(), BinaryVectorDtype.INT8)
+    if storage == "binary":
+        return Binary.from_vector(quantize_binary(vector).tolist(), BinaryVectorDtype.PACKED_BIT)
+    raise ValueError(f"Unknown vector storage format: {storage!r} (use one of {STORAGE_FORMATS})")
+
+
+def to_float32_blob(vector: np.ndarray) -> Binary:
+    # Full-precision copy for rescoring; not indexed, 4 bytes per dim
+    return Binary(np.asarray(vector, dtype=np.float32).tobytes())
+
+
+def from_float32_blob(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+def from_bson_vector(value) -> np.ndarray:
+    """
+    float32 vector back from any stored layout. int8 / binary are lossy
+    (direction only, binary as +/-1 per dimension).
+    """
+    if not isinstance(value, Binary):
+        return np.asarray(value, dtype=np.float32)
+    vector = value.as_vector()
+    if vector.dtype == BinaryVectorDtype.PACKED_BIT:
+        bits = np.unpackbits(np.asarray(vector.data, dtype=np.uint8))
+        return bits.astype(np.float32) * 2 - 1
+    return np.asarray(vector.data, dtype=np.float32)
+
+
+def rescore(
+    query: Sequence[float],
+    candidates: Sequence[np.ndarray],
+    top_k: int,
+) -> List[Tuple[int, float]]:
+    """
+    Exact cosine of `query` against `candidates`; returns (position, score)
+    for the best `top_k`, best first.
+    """
+    if not len(candidates):
+        return []
+    q = normalize(np.asarray(query, dtype=np.float32))
+    matrix = normalize(np.stack(candidates))
+    scores = matrix @ q
+    order = np.argsort(-scores)[:top_k]
+    return [(int(i), float(scores[i])) for i in order]
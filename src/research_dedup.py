@@ -0,0 +1,132 @@
+# src/research_dedup.py
+"""
+Cross-facet deduplication of Tavily results.
+
+1. URLs are canonicalized (scheme, www., tracking params, fragments,
+   trailing slashes) and exact repeats collapse into one result.
+2. Near-duplicate snippets (syndicated copies, mirrors) are found with
+   MinHash over word shingles and dropped.
+
+The highest-scored copy is kept and its `facets` field lists every facet
+that returned it.
+"""
+import hashlib
+import os
+import re
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import numpy as np
+
+RESEARCH_DEDUP_THRESHOLD = float(os.getenv("RESEARCH_DEDUP_THRESHOLD", "0.8"))
+SHINGLE_WORDS = 5
+MINHASH_PERMUTATIONS = 64
+
+_TRACKING_PARAMS = re.compile(r"^(utm_.*|gclid|fbclid|mc_cid|mc_eid|ref|ref_src|source)$")
+_WORD_RE = re.compile(r"\w+")
+
+_PRIME = np.uint64(4294967311)  # > 2**32, so (a*x + b) fits in uint64
+_rng = np.random.default_rng(1)
+_PERM_A = _rng.integers(1, 2**32, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 2**32, MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def canonicalize_url(url: str) -> str:
+    parts = urlsplit((url or "").strip())
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not _TRACKING_PARAMS.match(k.lower())
+    )
+    path = parts.path.rstrip("/") or "/"
+    # http/https and fragments never change the content we'd read
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def _shingles(text: str) -> np.ndarray:
+    words = _WORD_RE.findall((text or "").lower())
+    if len(words) < SHINGLE_WORDS:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i : i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(g.encode(), digest_size=4).digest(), "little") for g in set(grams)),
+        dtype=np.uint64,
+    )
+
+
+def minhash(text: str) -> np.ndarray:
+    shingles = _shingles(text)
+    if shingles.size == 0:
+        return np.full(MINHASH_PERMUTATIONS, np.iinfo(np.uint64).max, dtype=np.uint64)
+    hashed = (shingles[:, None] * _PERM_A + _PERM_B) % _PRIME
+    return hashed.min(axis=0)
+
+
+def dedupe_research(
+    tavily_raw: Dict[str, Any],
+    threshold: float = RESEARCH_DEDUP_THRESHOLD,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Returns (deduped tavily_raw, stats). Facet payloads are copied, not
+    mutated; each kept result gains a `facets` list.
+    """
+    items: List[Tuple[float, str, int, Dict[str, Any]]] = []
+    for name, facet in (tavily_raw or {}).items():
+        for i, result in enumerate((facet or {}).get("results") or []):
+            items.append((float(result.get("score") or 0.0), name, i, result))
+    # Best-scored copy wins; ties keep facet order
+    items.sort(key=lambda item: -item[0])
+
+    kept: Dict[Tuple[str, int], Dict[str, Any]] = {}
+    by_url: Dict[str, Dict[str, Any]] = {}
+    signatures: List[np.ndarray] = []
+    sig_owner: List[Dict[str, Any]] = []
+    removed_exact = removed_near = chars_removed = 0
+
+    for _, name, i, result in items:
+        url = canonicalize_url(result.get("url", "")) if result.get("url") else None
+        if url and url in by_url:
+            owner = by_url[url]
+            removed_exact += 1
+        else:
+            sig = minhash(f"{result.get('title', '')} {result.get('content', '')}")
+            owner = None
+            if signatures:
+                similarity = (np.stack(signatures) == sig).mean(axis=1)
+                best = int(similarity.argmax())
+                if similarity[best] >= threshold:
+                    owner = sig_owner[best]
+                    removed_near += 1
+            if owner is None:
+                owner = dict(result, facets=[name])
+                kept[(name, i)] = owner
+                signatures.append(sig)
+                sig_owner.append(owner)
+                if url:
+                    by_url[url] = owner
+                continue
+        chars_removed += len(result.get("content") or "")
+        if name not in owner["facets"]:
+            owner["facets"].append(name)
+
+    deduped = {}
+    for name, facet in (tavily_raw or {}).items():
+        facet = facet or {}
+        results = facet.get("results") or []
+        deduped[name] = dict(
+            facet, results=[kept[(name, i)] for i in range(len(results)) if (name, i) in kept]
+        )
+
+    stats = {
+        "results_before": len(items),
+        "results_after": len(kept),
+        "removed_exact": removed_exact,
+        "removed_near_duplicate": removed_near,
+        "chars_removed": chars_removed,
+    }
+    return deduped, stats
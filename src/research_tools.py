@@ -1,30 +1,57 @@
 # src/research_tools.py
-from typing import Any, Dict
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
 from fastmcp import FastMCP
 
-from .tavily_client import tavily_search
+from .async_utils import run_sync
+from .research_dedup import dedupe_research
+from .tavily_client import tavily_search, tavily_search_async
 
 app = FastMCP("research")
 
 
 # ---------- INTERNAL HELPERS (plain Python) ----------
 
+# Shared Tavily parameters for the three research facets
+_FACET_SEARCH_PARAMS: Dict[str, Any] = {
+    "topic": "general",
+    "search_depth": "basic",
+    "include_answer": "basic",
+    "max_results": 5,
+}
+
+
+def _pains_query(product_name: str, target_users: str, company_type: str) -> str:
+    return (
+        f"Top pain points and unmet needs for {target_users} "
+        f"working on or using {product_name} in {company_type} context"
+    )
+
+
+def _competitors_query(product_name: str, target_users: str, company_type: str) -> str:
+    return (
+        f"Key tools, platforms or competitors solving similar problems to "
+        f"{product_name} for {target_users} in a {company_type} context"
+    )
+
+
+def _trends_query(product_name: str, target_users: str, company_type: str) -> str:
+    return (
+        f"Recent trends, opportunities and risks in PM tooling / SaaS related to "
+        f"{product_name} for {target_users} in {company_type}"
+    )
+
+
 def _research_pains_core(
     product_name: str,
     target_users: str,
     company_type: str = "mid-size B2B SaaS",
 ) -> Dict[str, Any]:
-    query = (
-        f"Top pain points and unmet needs for {target_users} "
-        f"working on or using {product_name} in {company_type} context"
-    )
-    return tavily_search(
-        query,
-        topic="general",
-        search_depth="basic",
-        include_answer="basic",
-        max_results=5,
-    )
+    query = _pains_query(product_name, target_users, company_type)
+    return tavily_search(query, **_FACET_SEARCH_PARAMS)
 
 
 def _research_competitors_core(
@@ -32,17 +59,8 @@ def _research_competitors_core(
     target_users: str,
     company_type: str = "mid-size B2B SaaS",
 ) -> Dict[str, Any]:
-    query = (
-        f"Key tools, platforms or competitors solving similar problems to "
-        f"{product_name} for {target_users} in a {company_type} context"
-    )
-    return tavily_search(
-        query,
-        topic="general",
-        search_depth="basic",
-        include_answer="basic",
-        max_results=5,
-    )
+    query = _competitors_query(product_name, target_users, company_type)
+    return tavily_search(query, **_FACET_SEARCH_PARAMS)
 
 
 def _research_trends_core(
@@ -50,38 +68,79 @@ def _research_trends_core(
     target_users: str,
     company_type: str = "mid-size B2B SaaS",
 ) -> Dict[str, Any]:
-    query = (
-        f"Recent trends, opportunities and risks in PM tooling / SaaS related to "
-        f"{product_name} for {target_users} in {company_type}"
-    )
-    return tavily_search(
-        query,
-        topic="general",
-        search_depth="basic",
-        include_answer="basic",
-        max_results=5,
-    )
+    query = _trends_query(product_name, target_users, company_type)
+    return tavily_search(query, **_FACET_SEARCH_PARAMS)
 
 
-def build_research_bundle(
+# ---------- CONCURRENT RESEARCH ENGINE ----------
+
+# Max facets in flight at once and per-facet timeout (seconds).
+RESEARCH_MAX_CONCURRENCY = int(os.getenv("RESEARCH_MAX_CONCURRENCY", "3"))
+RESEARCH_FACET_TIMEOUT = float(os.getenv("RESEARCH_FACET_TIMEOUT", "30"))
+
+_FACET_QUERIES: Dict[str, Callable[[str, str, str], str]] = {
+    "pains": _pains_query,
+    "competitors": _competitors_query,
+    "trends": _trends_query,
+}
+
+
+async def build_research_bundle_async(
     product_name: str,
     target_users: str,
     goal: str,
     company_type: str = "mid-size B2B SaaS",
     constraints: str = "",
+    *,
+    max_concurrency: Optional[int] = None,
+    facet_timeout: Optional[float] = None,
+    dedupe: bool = True,
 ) -> Dict[str, Any]:
     """
-    Plain Python function used by the workflow.
+    Fan the pains / competitors / trends facets out in parallel.
+
+    A facet that fails or exceeds `facet_timeout` comes back as an empty
+    result with an `error` field instead of failing the whole bundle.
+    With `dedupe`, repeated and near-duplicate results across facets are
+    collapsed (see research_dedup) and `dedup_stats` reports what went.
     """
-    pains = _research_pains_core(product_name, target_users, company_type)
-    competitors = _research_competitors_core(product_name, target_users, company_type)
-    trends = _research_trends_core(product_name, target_users, company_type)
-
-    tavily_queries = {
-        "pains": pains["query"],
-        "competitors": competitors["query"],
-        "trends": trends["query"],
-    }
+    semaphore = asyncio.Semaphore(max_concurrency or RESEARCH_MAX_CONCURRENCY)
+    timeout = facet_timeout if facet_timeout is not None else RESEARCH_FACET_TIMEOUT
+
+    async def _run_facet(name: str, build_query: Callable[[str, str, str], str]):
+        query = build_query(product_name, target_users, company_type)
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(
+                    tavily_search_async(query, **_FACET_SEARCH_PARAMS),
+                    timeout=timeout,
+                )
+                status = "ok"
+            except asyncio.TimeoutError:
+                result = {"query": query, "results": [], "error": f"timed out after {timeout}s"}
+                status = "timeout"
+            except Exception as e:
+                result = {"query": query, "results": [], "error": str(e)}
+                status = "error"
+            timing = {"seconds": round(time.perf_counter() - start, 3), "status": status}
+            return name, result, timing
+
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(
+        *(_run_facet(name, build) for name, build in _FACET_QUERIES.items())
+    )
+    total = round(time.perf_counter() - start, 3)
+
+    tavily_raw = {name: result for name, result, _ in outcomes}
+    facet_timings = {name: timing for name, _, timing in outcomes}
+    facet_timings["total_seconds"] = total
+
+    tavily_queries = {name: result.get("query") for name, result in tavily_raw.items()}
+
+    dedup_stats = None
+    if dedupe:
+        tavily_raw, dedup_stats = dedupe_research(tavily_raw)
 
     return {
         "product_name": product_name,
@@ -90,14 +149,41 @@ def build_research_bundle(
         "company_type": company_type,
         "constraints": constraints,
         "tavily_queries": tavily_queries,
-        "tavily_raw": {
-            "pains": pains,
-            "competitors": competitors,
-            "trends": trends,
-        },
+        "tavily_raw": tavily_raw,
+        "facet_timings": facet_timings,
+        "dedup_stats": dedup_stats,
     }
 
 
+def build_research_bundle(
+    product_name: str,
+    target_users: str,
+    goal: str,
+    company_type: str = "mid-size B2B SaaS",
+    constraints: str = "",
+    *,
+    max_concurrency: Optional[int] = None,
+    facet_timeout: Optional[float] = None,
+    dedupe: bool = True,
+) -> Dict[str, Any]:
+    """
+    Plain Python function used by the workflow.
+    Sync entry point for the concurrent research engine.
+    """
+    return run_sync(
+        build_research_bundle_async(
+            product_name=product_name,
+            target_users=target_users,
+            goal=goal,
+            company_type=company_type,
+            constraints=constraints,
+            max_concurrency=max_concurrency,
+            facet_timeout=facet_timeout,
+            dedupe=dedupe,
+        )
+    )
+
+
 # ---------- TOOL WRAPPERS (FastMCP) ----------
 
 @app.tool
@@ -0,0 +1,222 @@
+# src/response_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(PROJECT_ROOT, ".cache"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+def make_key(namespace: str, payload: Dict[str, Any]) -> str:
+    """
+    Content address for a request: sha256 over the namespace plus all params.
+    """
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{namespace}:{blob}".encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """
+    Small SQLite-backed key/value cache with per-entry TTL and
+    size-bounded LRU eviction.
+
+    SQLite in WAL mode handles locking, so several worker processes can
+    point at the same file. Each thread (and each forked child) opens its
+    own connection.
+    """
+
+    def __init__(self, path: str, max_bytes: int = CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                expires_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+
+            -- Running total of entry sizes, so eviction doesn't SUM per write
+            CREATE TABLE IF NOT EXISTS totals (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                bytes INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO totals (id, bytes)
+                SELECT 0, COALESCE(SUM(size), 0) FROM entries;
+            CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+                UPDATE totals SET bytes = bytes + new.size WHERE id = 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+                UPDATE totals SET bytes = bytes - old.size WHERE id = 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS entries_resize AFTER UPDATE OF size ON entries BEGIN
+                UPDATE totals SET bytes = bytes + new.size - old.size WHERE id = 0;
+            END;
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    _COUNTERS = ("hits", "misses", "expired", "writes", "evictions")
+
+    def _count(self, namespace: str, field: str, n: int = 1) -> None:
+        with self._stats_lock:
+            ns = self._stats.setdefault(namespace, dict.fromkeys(self._COUNTERS, 0))
+            ns[field] += n
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self._count(namespace, "misses")
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at < now:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._count(namespace, "expired")
+            self._count(namespace, "misses")
+            return None
+        conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count(namespace, "hits")
+        return value
+
+    def set(
+        self,
+        namespace: str,
+        key: str,
+        value: bytes,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """
+        ttl None keeps the entry until evicted; ttl <= 0 stores nothing
+        (and drops any previous value).
+        """
+        conn = self._conn()
+        if ttl is not None and ttl <= 0:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        # Upsert rather than REPLACE so the size triggers see the old row
+        conn.execute(
+            "INSERT INTO entries "
+            "(key, namespace, value, size, created_at, accessed_at, expires_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET namespace = excluded.namespace, "
+            "value = excluded.value, size = excluded.size, "
+            "created_at = excluded.created_at, accessed_at = excluded.accessed_at, "
+            "expires_at = excluded.expires_at",
+            (key, namespace, sqlite3.Binary(value), len(value), now, now, expires_at),
+        )
+        self._count(namespace, "writes")
+        self._evict(conn)
+
+    def get_json(self, namespace: str, key: str) -> Optional[Any]:
+        value = self.get(namespace, key)
+        return None if value is None else json.loads(value)
+
+    def set_json(
+        self, namespace: str, key: str, value: Any, ttl: Optional[float] = None
+    ) -> None:
+        blob = json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+        self.set(namespace, key, blob, ttl=ttl)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        (total,) = conn.execute("SELECT bytes FROM totals WHERE id = 0").fetchone()
+        excess = total - self.max_bytes
+        if excess <= 0:
+            return
+
+        victims = []
+        for key, namespace, size in conn.execute(
+            "SELECT key, namespace, size FROM entries ORDER BY accessed_at ASC"
+        ):
+            victims.append((key, namespace))
+            excess -= size
+            if excess <= 0:
+                break
+
+        conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k, _ in victims])
+        for _, namespace in victims:
+            self._count(namespace, "evictions")
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        if namespace is None:
+            self._conn().execute("DELETE FROM entries")
+        else:
+            self._conn().execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+
+    def stats(self, namespace: Optional[str] = None) -> Dict[str, Any]:
+        """
+        In-process hit/miss counters plus on-disk entry counts and bytes.
+        """
+        conn = self._conn()
+        if namespace is None:
+            rows = conn.execute(
+                "SELECT namespace, COUNT(*), COALESCE(SUM(size), 0) "
+                "FROM entries GROUP BY namespace"
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT namespace, COUNT(*), COALESCE(SUM(size), 0) "
+                "FROM entries WHERE namespace = ? GROUP BY namespace",
+                (namespace,),
+            ).fetchall()
+        disk = {ns: {"entries": n, "bytes": b} for ns, n, b in rows}
+
+        with self._stats_lock:
+            counters = {ns: dict(c) for ns, c in self._stats.items()}
+
+        names = set(disk) | set(counters)
+        if namespace is not None:
+            names = {namespace}
+
+        out: Dict[str, Any] = {}
+        for ns in sorted(names):
+            c = counters.get(ns) or dict.fromkeys(self._COUNTERS, 0)
+            lookups = c["hits"] + c["misses"]
+            out[ns] = {
+                **c,
+                "hit_ratio": round(c["hits"] / lookups, 3) if lookups else None,
+                **disk.get(ns, {"entries": 0, "bytes": 0}),
+            }
+        return out
+
+
+_cache: Optional[DiskCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> DiskCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DiskCache(os.path.join(CACHE_DIR, "responses.sqlite3"))
+    return _cache
@@ -0,0 +1,192 @@
+# src/search_filters.py
+"""
+Metadata filters for strategy search.
+
+A filter dict may hold:
+  - company_type / product_name: a value or a list of values (any of)
+  - tags: a tag or a list of tags (any of)
+  - created_after / created_before: datetime or ISO date string
+  - include_duplicates: also return strategies marked as near-duplicates
+    (dedup.py), which search hides by default
+The same filter becomes the `$vectorSearch` pre-filter (so the ANN
+candidates are drawn only from matching documents), a plain Mongo query
+for counting and post-filtering, and a predicate for the local backend.
+
+`num_candidates` scales the ANN search with the filter's selectivity:
+a narrow filter leaves HNSW fewer matching neighbours per hop, so it
+gets a larger candidate pool, and a small enough match set is searched
+exactly instead.
+"""
+import math
+import os
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+# Candidate pool per requested result with no (or a non-selective) filter
+VECTOR_CANDIDATE_FACTOR = int(os.getenv("VECTOR_CANDIDATE_FACTOR", "10"))
+VECTOR_MIN_CANDIDATES = int(os.getenv("VECTOR_MIN_CANDIDATES", "50"))
+VECTOR_MAX_CANDIDATES = 10000  # Atlas limit
+# At or below this many matching docs, filtered searches run exact (ENN)
+VECTOR_EXACT_MAX = int(os.getenv("VECTOR_EXACT_MAX", "2000"))
+
+FILTER_KEYS = ("company_type", "product_name", "tags", "created_after", "created_before", "include_duplicates")
+# Fields the vector index and the B-tree indexes must cover
+FILTER_FIELDS = ("company_type", "product_name", "tags", "created_at", "duplicate")
+# Matches docs not marked as near-duplicates (including those saved before dedup)
+_NOT_DUPLICATE = {"duplicate": {"$ne": True}}
+
+
+def parse_datetime(value: Any) -> Optional[datetime]:
+    """
+    datetime / ISO string -> aware UTC datetime (None stays None).
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        dt = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+def normalize_tags(tags: Any) -> List[str]:
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    return sorted({t.strip().lower() for t in tags if t and t.strip()})
+
+
+def _values(value: Any) -> List[str]:
+    values = value if isinstance(value, (list, tuple, set)) else [value]
+    return [v.strip() for v in values if isinstance(v, str) and v.strip()]
+
+
+def normalize_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Validated filter with empty entries dropped; {} means "no filter".
+    """
+    if not filters:
+        return {}
+    unknown = [k for k in filters if k not in FILTER_KEYS]
+    if unknown:
+        raise ValueError(f"Unknown search filters {unknown}; expected some of {FILTER_KEYS}")
+
+    clean: Dict[str, Any] = {}
+    for key in ("company_type", "product_name"):
+        values = _values(filters.get(key))
+        if values:
+            clean[key] = values
+    tags = normalize_tags(filters.get("tags"))
+    if tags:
+        clean["tags"] = tags
+    for key in ("created_after", "created_before"):
+        dt = parse_datetime(filters.get(key))
+        if dt is not None:
+            clean[key] = dt
+    if "created_after" in clean and "created_before" in clean and clean["created_after"] > clean["created_before"]:
+        raise ValueError("created_after is later than created_before")
+    if filters.get("include_duplicates"):
+        clean["include_duplicates"] = True
+    return clean
+
+
+def to_mongo_filter(filters: Dict[str, Any], hide_duplicates: bool = False) -> Dict[str, Any]:
+    """
+    MQL for a normalized filter; valid both as a `$vectorSearch` filter
+    and as a find / count query. `hide_duplicates` adds the clause that
+    leaves out near-duplicates.
+    """
+    clauses = []
+    for key in ("company_type", "product_name", "tags"):
+        values = filters.get(key)
+        if values:
+            clauses.append({key: {"$eq": values[0]}} if len(values) == 1 else {key: {"$in": values}})
+    created = {}
+    if "created_after" in filters:
+        created["$gte"] = filters["created_after"]
+    if "created_before" in filters:
+        created["$lte"] = filters["created_before"]
+    if created:
+        clauses.append({"created_at": created})
+    if hide_duplicates:
+        clauses.append(_NOT_DUPLICATE)
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def matcher(filters: Dict[str, Any], hide_duplicates: bool = False) -> Optional[Callable[[Dict[str, Any]], bool]]:
+    """
+    Predicate over stored payloads (local backend); None without a filter.
+    """
+    if not to_mongo_filter(filters, hide_duplicates):
+        return None
+
+    def matches(doc: Dict[str, Any]) -> bool:
+        if hide_duplicates and doc.get("duplicate"):
+            return False
+        for key in ("company_type", "product_name"):
+            if key in filters and doc.get(key) not in filters[key]:
+                return False
+        if "tags" in filters and not set(filters["tags"]) & set(doc.get("tags") or []):
+            return False
+        if "created_after" in filters or "created_before" in filters:
+            try:
+                created = parse_datetime(doc.get("created_at"))
+            except ValueError:
+                return False
+            if created is None:
+                return False
+            if "created_after" in filters and created < filters["created_after"]:
+                return False
+            if "created_before" in filters and created > filters["created_before"]:
+                return False
+        return True
+
+    return matches
+
+
+def num_candidates(limit: int, matched: Optional[int] = None, total: Optional[int] = None) -> Optional[int]:
+    """
+    ANN candidate pool for `limit` results when `matched` of `total` docs
+    pass the filter. None means "search exactly" (small match set).
+    """
+    base = max(VECTOR_MIN_CANDIDATES, limit * VECTOR_CANDIDATE_FACTOR)
+    if matched is None or not total:
+        return min(VECTOR_MAX_CANDIDATES, base)
+    if matched <= VECTOR_EXACT_MAX:
+        return None
+    selectivity = matched / total
+    # Grows as 1/sqrt(selectivity): 4x the pool for a filter keeping 1/16
+    scaled = math.ceil(base / math.sqrt(max(selectivity, 1e-4)))
+    return max(limit, min(VECTOR_MAX_CANDIDATES, scaled, matched))
+
+
+def vector_search_stage(
+    query_vector: Any,
+    *,
+    path: str,
+    limit: int,
+    index: str = "vector_index",
+    mongo_filter: Optional[Dict[str, Any]] = None,
+    candidates: Optional[int] = None,
+    exact: bool = False,
+) -> Dict[str, Any]:
+    """
+    `$vectorSearch` stage; the filter key is left out when there is none
+    (Atlas rejects `filter: null`).
+    """
+    stage: Dict[str, Any] = {
+        "index": index,
+        "path": path,
+        "queryVector": query_vector,
+        "limit": limit,
+    }
+    if exact:
+        stage["exact"] = True
+    else:
+        stage["numCandidates"] = max(limit, candidates or min(VECTOR_MAX_CANDIDATES, limit * VECTOR_CANDIDATE_FACTOR))
+    if mongo_filter:
+        stage["filter"] = mongo_filter
+    return {"$vectorSearch": stage}
@@ -0,0 +1,168 @@
+# src/singleflight.py
+import asyncio
+import concurrent.futures
+import copy
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _Flight:
+    # An async call shared by callers on any event loop
+    __slots__ = ("future", "loop", "task", "waiters")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.loop = loop
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 1
+
+
+class SharedCallCancelled(RuntimeError):
+    """
+    The shared call was cancelled under a waiting caller (e.g. its event
+    loop shut down); raised instead of CancelledError so the caller's own
+    error handling sees it.
+    """
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls: the first caller for a key runs
+    `fn`, everyone else arriving while it is in flight waits and gets the
+    same result (or the same exception). Followers get a deep copy so
+    nobody can mutate another caller's result.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[str, _Flight] = {}
+        self._stats = {"calls": 0, "executions": 0, "deduplicated": 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self._stats["deduplicated"] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._stats["executions"] += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async flavour of `do`. Calls are shared across event loops (the MCP
+        server's, the shared sync loop, throwaway ones) through a
+        concurrent.futures.Future. `fn` runs as its own task on the first
+        caller's loop: if that caller is cancelled (e.g. a wait_for
+        timeout) it keeps running for the others, and is only cancelled
+        once nobody is waiting.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._stats["calls"] += 1
+            flight = self._async_calls.get(key)
+            if flight is not None:
+                self._stats["deduplicated"] += 1
+                flight.waiters += 1
+                leader = False
+            else:
+                flight = self._async_calls[key] = _Flight(loop)
+                self._stats["executions"] += 1
+                leader = True
+        if leader:
+            flight.task = loop.create_task(self._fly(key, flight, fn))
+
+        waiting = asyncio.wrap_future(flight.future)
+        # Nobody may read the outcome after a cancel; don't log it as unretrieved
+        waiting.add_done_callback(lambda f: f.cancelled() or f.exception())
+        try:
+            result = await asyncio.shield(waiting)
+        except asyncio.CancelledError:
+            self._leave(key, flight)
+            raise
+        return result if leader else copy.deepcopy(result)
+
+    async def _fly(self, key: str, flight: _Flight, fn: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            flight.future.set_exception(SharedCallCancelled(f"{self.name}: shared call was cancelled"))
+        except BaseException as e:
+            flight.future.set_exception(e)
+        else:
+            flight.future.set_result(result)
+        finally:
+            with self._lock:
+                if self._async_calls.get(key) is flight:
+                    del self._async_calls[key]
+
+    def _leave(self, key: str, flight: _Flight) -> None:
+        # A cancelled caller; the last one out cancels the work
+        with self._lock:
+            flight.waiters -= 1
+            if flight.waiters > 0 or flight.future.done():
+                return
+            if self._async_calls.get(key) is flight:
+                del self._async_calls[key]
+        if flight.task is not None and not flight.loop.is_closed():
+            flight.loop.call_soon_threadsafe(flight.task.cancel)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "in_flight": len(self._calls) + len(self._async_calls),
+            }
+
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def get_group(name: str) -> SingleFlight:
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            group = _groups[name] = SingleFlight(name)
+    return group
+
+
+def singleflight_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Per-group counters; `deduplicated` is the number of calls that shared
+    another caller's in-flight request instead of making their own.
+    """
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {g.name: g.stats() for g in groups}
@@ -0,0 +1,345 @@
+# src/strategy_schema.py
+"""
+Section-level validation and local repair for the strategy JSON.
+
+Validation works per top-level section so a bad `prds` list can be
+regenerated on its own instead of redoing the whole document. Repairs
+are cheap, deterministic coercions (string -> list, "4" -> 4, missing
+roadmap months, wrapped objects) tried before any model is re-asked.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Echoed inputs, then generated sections in the order the prompt asks for them
+STRATEGY_INPUT_FIELDS = ("product_name", "target_users", "goal", "company_type", "constraints")
+STRATEGY_SECTIONS = (
+    "market_overview",
+    "competitor_analysis",
+    "user_pain_analysis",
+    "market_gaps",
+    "feature_ideas",
+    "prioritized_features",
+    "three_month_roadmap",
+    "prds",
+)
+
+# Expected shape of each section, used in re-ask prompts
+SECTION_SHAPES: Dict[str, Any] = {
+    "market_overview": "",
+    "competitor_analysis": "",
+    "user_pain_analysis": "",
+    "market_gaps": [""],
+    "feature_ideas": [{"name": "", "description": "", "solves_gap": "", "solves_pain": ""}],
+    "prioritized_features": [
+        {
+            "name": "",
+            "description": "",
+            "score": {"impact": 1, "complexity": 1, "effort": 1, "overall_priority": 1},
+        }
+    ],
+    "three_month_roadmap": {"month_1": [], "month_2": [], "month_3": []},
+    "prds": [
+        {
+            "feature_name": "",
+            "description": "",
+            "target_users": [],
+            "motivation": "",
+            "acceptance_criteria": [],
+            "risks": [],
+        }
+    ],
+}
+
+# Problem reported for a section that is absent (e.g. truncated output)
+SECTION_MISSING = "missing"
+
+_TEXT_SECTIONS = ("market_overview", "competitor_analysis", "user_pain_analysis")
+_MONTHS = ("month_1", "month_2", "month_3")
+_SCORE_FIELDS = ("impact", "complexity", "effort")
+
+
+# ---- VALIDATION ----
+def validate_section(key: str, value: Any) -> Optional[str]:
+    """
+    Return a short problem description, or None if the section is usable.
+    """
+    if value is None:
+        return SECTION_MISSING
+    if key in _TEXT_SECTIONS:
+        if not isinstance(value, str) or not value.strip():
+            return "expected a non-empty string"
+        return None
+    if key == "market_gaps":
+        if not isinstance(value, list) or not value:
+            return "expected a non-empty list of strings"
+        if not all(isinstance(v, str) and v.strip() for v in value):
+            return "every gap must be a non-empty string"
+        return None
+    if key == "feature_ideas":
+        return _validate_named_list(value, "name")
+    if key == "prioritized_features":
+        problem = _validate_named_list(value, "name")
+        if problem:
+            return problem
+        for f in value:
+            score = f.get("score")
+            if not isinstance(score, dict):
+                return f"feature {f['name']!r} has no score object"
+            for field in _SCORE_FIELDS:
+                if not isinstance(score.get(field), int) or not 1 <= score[field] <= 5:
+                    return f"feature {f['name']!r}: {field} must be an integer 1-5"
+            if not isinstance(score.get("overall_priority"), int) or score["overall_priority"] < 1:
+                return f"feature {f['name']!r}: overall_priority must be a positive integer"
+        return None
+    if key == "three_month_roadmap":
+        if not isinstance(value, dict):
+            return "expected an object with month_1..month_3"
+        if not all(isinstance(value.get(m), list) for m in _MONTHS):
+            return "month_1, month_2 and month_3 must all be lists"
+        if not any(value[m] for m in _MONTHS):
+            return "roadmap is empty"
+        return None
+    if key == "prds":
+        problem = _validate_named_list(value, "feature_name")
+        if problem:
+            return problem
+        for prd in value:
+            if not isinstance(prd.get("acceptance_criteria"), list):
+                return f"PRD {prd['feature_name']!r}: acceptance_criteria must be a list"
+        return None
+    return None
+
+
+def _validate_named_list(value: Any, name_field: str) -> Optional[str]:
+    if not isinstance(value, list) or not value:
+        return "expected a non-empty list of objects"
+    for item in value:
+        if not isinstance(item, dict):
+            return "every item must be an object"
+        if not isinstance(item.get(name_field), str) or not item[name_field].strip():
+            return f"every item needs a non-empty {name_field!r}"
+    return None
+
+
+def validate_strategy(strategy: Dict[str, Any]) -> Dict[str, str]:
+    """
+    {section: problem} for every section that is missing or malformed.
+    """
+    problems = {}
+    for key in STRATEGY_SECTIONS:
+        problem = validate_section(key, strategy.get(key))
+        if problem:
+            problems[key] = problem
+    return problems
+
+
+# ---- REFINEMENT ----
+# Sections each section is derived from; a change propagates downstream.
+SECTION_DEPENDS_ON: Dict[str, Tuple[str, ...]] = {
+    "market_overview": (),
+    "competitor_analysis": (),
+    "user_pain_analysis": (),
+    "market_gaps": ("market_overview", "competitor_analysis", "user_pain_analysis"),
+    "feature_ideas": ("market_gaps",),
+    "prioritized_features": ("feature_ideas",),
+    "three_month_roadmap": ("prioritized_features",),
+    "prds": ("prioritized_features",),
+}
+
+# Inputs the Tavily queries are built from: changing one needs new research
+RESEARCH_INPUTS = ("product_name", "target_users", "company_type")
+
+# Sections an input feeds directly (downstream sections follow)
+INPUT_AFFECTS: Dict[str, Tuple[str, ...]] = {
+    "product_name": STRATEGY_SECTIONS,
+    "target_users": STRATEGY_SECTIONS,
+    "company_type": STRATEGY_SECTIONS,
+    "goal": ("market_gaps",),
+    "constraints": ("prioritized_features",),
+}
+
+# Words in extra instructions that point at a section
+SECTION_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "market_overview": ("market overview", "market size", "trend", "why now"),
+    "competitor_analysis": ("competitor", "competition", "rival", "alternative"),
+    "user_pain_analysis": ("pain", "frustration", "user need"),
+    "market_gaps": ("gap", "opportunit", "whitespace"),
+    "feature_ideas": ("feature", "idea"),
+    "prioritized_features": ("priorit", "score", "rank", "impact", "effort", "complexity"),
+    "three_month_roadmap": ("roadmap", "timeline", "month", "milestone", "quarter"),
+    "prds": ("prd", "requirement", "acceptance criteria", "spec"),
+}
+# Instructions that name no section are treated as steering the synthesis
+# (gaps onward) rather than the research summaries.
+_DEFAULT_INSTRUCTION_SECTIONS = ("market_gaps",)
+
+
+def with_downstream(sections) -> List[str]:
+    """
+    `sections` plus everything derived from them, in document order.
+    """
+    affected = set(sections)
+    for key in STRATEGY_SECTIONS:  # document order is a topological order
+        if any(dep in affected for dep in SECTION_DEPENDS_ON[key]):
+            affected.add(key)
+    return [key for key in STRATEGY_SECTIONS if key in affected]
+
+
+def _normalized(value: Any) -> str:
+    text = " ".join(str(value or "").split()).lower()
+    return "" if text in ("none", "none specified") else text
+
+
+def changed_inputs(previous: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """
+    Input fields (plus "extra_instructions") whose values differ, ignoring
+    whitespace, case and "none specified" placeholders.
+    """
+    fields = STRATEGY_INPUT_FIELDS + ("extra_instructions",)
+    return [f for f in fields if _normalized(previous.get(f)) != _normalized(current.get(f))]
+
+
+def affected_sections(changed_fields, extra_instructions: str = "") -> List[str]:
+    """
+    Sections to regenerate when `changed_fields` (input names, including
+    "extra_instructions") differ from the parent strategy.
+    """
+    direct: set = set()
+    for field in changed_fields:
+        if field == "extra_instructions":
+            text = (extra_instructions or "").lower()
+            named = [k for k, words in SECTION_KEYWORDS.items() if any(w in text for w in words)]
+            direct.update(named or _DEFAULT_INSTRUCTION_SECTIONS)
+        else:
+            direct.update(INPUT_AFFECTS.get(field, ()))
+    return with_downstream(direct)
+
+
+# ---- LOCAL REPAIR ----
+def _as_text(value: Any) -> Any:
+    if isinstance(value, list) and all(isinstance(v, str) for v in value):
+        return "\n".join(f"- {v}" for v in value)
+    return value
+
+
+def _as_str_list(value: Any) -> Any:
+    if isinstance(value, str):
+        items = [re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", line) for line in value.splitlines()]
+        return [item for item in items if item.strip()]
+    if isinstance(value, list):
+        out = []
+        for item in value:
+            if isinstance(item, dict):
+                item = item.get("description") or item.get("name") or item.get("gap")
+            if item is not None:
+                out.append(str(item))
+        return out
+    return value
+
+
+def _as_object_list(value: Any) -> Any:
+    if isinstance(value, dict):
+        # A single object, or an object keyed by name
+        if all(isinstance(v, dict) for v in value.values()) and value:
+            return list(value.values())
+        return [value]
+    return value
+
+
+def _as_int(value: Any) -> Any:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, float):
+        return int(round(value))
+    if isinstance(value, str):
+        match = re.search(r"\d+(?:\.\d+)?", value)
+        if match:
+            return int(round(float(match.group())))
+    return value
+
+
+def _repair_scores(features: List[Any]) -> List[Any]:
+    for f in features:
+        if not isinstance(f, dict) or not isinstance(f.get("score"), dict):
+            continue
+        score = f["score"]
+        for field in _SCORE_FIELDS:
+            v = _as_int(score.get(field))
+            score[field] = min(5, max(1, v)) if isinstance(v, int) and not isinstance(v, bool) else v
+        score["overall_priority"] = _as_int(score.get("overall_priority"))
+    # Missing or duplicate priorities: re-rank in current order
+    ranks = [
+        f["score"].get("overall_priority")
+        for f in features
+        if isinstance(f, dict) and isinstance(f.get("score"), dict)
+    ]
+    valid = all(isinstance(r, int) and r >= 1 for r in ranks)
+    if ranks and (not valid or len(set(ranks)) != len(ranks)):
+        keyed = [f for f in features if isinstance(f, dict) and isinstance(f.get("score"), dict)]
+        keyed.sort(key=lambda f: f["score"]["overall_priority"]
+                   if isinstance(f["score"].get("overall_priority"), int) else 999)
+        for rank, f in enumerate(keyed, start=1):
+            f["score"]["overall_priority"] = rank
+    return features
+
+
+def _repair_roadmap(value: Any) -> Any:
+    if not isinstance(value, dict):
+        return value
+    out = {}
+    for k, v in value.items():
+        match = re.search(r"(\d)", str(k))
+        key = f"month_{match.group(1)}" if match else k
+        out[key] = [v] if isinstance(v, str) else _as_str_list(v) if isinstance(v, list) else v
+    for month in _MONTHS:
+        out.setdefault(month, [])
+    return out
+
+
+def _repair_prds(value: Any) -> Any:
+    value = _as_object_list(value)
+    if not isinstance(value, list):
+        return value
+    for prd in value:
+        if not isinstance(prd, dict):
+            continue
+        if not prd.get("feature_name"):
+            prd["feature_name"] = prd.get("title") or prd.get("name") or prd.get("feature")
+        for field in ("target_users", "acceptance_criteria", "risks"):
+            if isinstance(prd.get(field), str):
+                prd[field] = _as_str_list(prd[field])
+    return value
+
+
+def repair_section(key: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if key in _TEXT_SECTIONS:
+        return _as_text(value)
+    if key == "market_gaps":
+        return _as_str_list(value)
+    if key == "feature_ideas":
+        return _as_object_list(value)
+    if key == "prioritized_features":
+        value = _as_object_list(value)
+        return _repair_scores(value) if isinstance(value, list) else value
+    if key == "three_month_roadmap":
+        return _repair_roadmap(value)
+    if key == "prds":
+        return _repair_prds(value)
+    return value
+
+
+def repair_strategy(strategy: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Apply local repairs to invalid sections; returns (strategy, repaired keys).
+    """
+    strategy = dict(strategy)
+    repaired = []
+    for key in STRATEGY_SECTIONS:
+        if key in strategy and validate_section(key, strategy[key]):
+            fixed = repair_section(key, strategy[key])
+            if validate_section(key, fixed) is None:
+                strategy[key] = fixed
+                repaired.append(key)
+    return strategy, repaired
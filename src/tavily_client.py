@@ -1,22 +1,108 @@
 import os
-from typing import Any, Dict, List, Optional
-from tavily import TavilyClient
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from tavily import AsyncTavilyClient, TavilyClient
 
 from dotenv import load_dotenv
 load_dotenv()
 
-
-_tavily_client: Optional[TavilyClient] = None
+from . import clients
+from .async_utils import run_blocking
+from .response_cache import get_cache, make_key
+from .singleflight import get_group
 
 
 def get_tavily_client() -> TavilyClient:
-    global _tavily_client
-    if _tavily_client is None:
-        api_key = os.getenv("TAVILY_API_KEY")
-        if not api_key:
-            raise RuntimeError("TAVILY_API_KEY not set")
-        _tavily_client = TavilyClient(api_key=api_key)
-    return _tavily_client
+    return clients.get_tavily()
+
+
+def get_async_tavily_client() -> AsyncTavilyClient:
+    return clients.get_async_tavily()
+
+
+# ---- RESPONSE CACHE ----
+# Per-endpoint TTLs (seconds). Search results go stale faster than page content.
+TAVILY_CACHE_TTLS = {
+    "search": float(os.getenv("TAVILY_SEARCH_TTL", str(6 * 3600))),
+    "extract": float(os.getenv("TAVILY_EXTRACT_TTL", str(24 * 3600))),
+    "crawl": float(os.getenv("TAVILY_CRAWL_TTL", str(24 * 3600))),
+}
+TAVILY_CACHE_DISABLED = os.getenv("TAVILY_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _cached_call(
+    endpoint: str,
+    params: Dict[str, Any],
+    fetch: Callable[[], Dict[str, Any]],
+    use_cache: bool,
+) -> Dict[str, Any]:
+    """
+    Serve `endpoint` from the on-disk cache when possible.
+
+    `use_cache=False` bypasses the lookup but still stores the fresh
+    response, so it doubles as a forced refresh. Identical requests that
+    miss at the same time share one network call.
+    """
+    namespace = f"tavily:{endpoint}"
+    key = make_key(namespace, params)
+
+    if TAVILY_CACHE_DISABLED:
+        return get_group(namespace).do(key, fetch)
+
+    cache = get_cache()
+    if use_cache:
+        cached = cache.get_json(namespace, key)
+        if cached is not None:
+            return cached
+
+    def fetch_and_store() -> Dict[str, Any]:
+        result = fetch()
+        cache.set_json(namespace, key, result, ttl=TAVILY_CACHE_TTLS[endpoint])
+        return result
+
+    return get_group(namespace).do(key, fetch_and_store)
+
+
+async def _cached_call_async(
+    endpoint: str,
+    params: Dict[str, Any],
+    fetch: Callable[[], Awaitable[Dict[str, Any]]],
+    use_cache: bool,
+) -> Dict[str, Any]:
+    """
+    Async twin of `_cached_call`; SQLite access runs on the blocking pool.
+    """
+    namespace = f"tavily:{endpoint}"
+    key = make_key(namespace, params)
+
+    if TAVILY_CACHE_DISABLED:
+        return await get_group(namespace).do_async(key, fetch)
+
+    cache = get_cache()
+    if use_cache:
+        cached = await run_blocking(cache.get_json, namespace, key)
+        if cached is not None:
+            return cached
+
+    async def fetch_and_store() -> Dict[str, Any]:
+        result = await fetch()
+        await run_blocking(
+            cache.set_json, namespace, key, result, ttl=TAVILY_CACHE_TTLS[endpoint]
+        )
+        return result
+
+    return await get_group(namespace).do_async(key, fetch_and_store)
+
+
+def tavily_cache_stats() -> Dict[str, Any]:
+    cache = get_cache()
+    return {
+        endpoint: cache.stats(f"tavily:{endpoint}").get(f"tavily:{endpoint}", {})
+        for endpoint in TAVILY_CACHE_TTLS
+    }
 
 
 def tavily_search(
@@ -27,19 +113,68 @@ def tavily_search(
     include_answer: bool | str = "basic",
     max_results: int = 5,
     time_range: Optional[str] = None,
+    use_cache: bool = True,
 ) -> Dict[str, Any]:
     """
     Thin wrapper over Tavily /search.
     """
-    client = get_tavily_client()
-    return client.search(
-        query=query,
-        topic=topic,
-        search_depth=search_depth,
-        include_answer=include_answer,
-        max_results=max_results,
-        time_range=time_range,
-    )
+    params = {
+        "query": _normalize_query(query),
+        "topic": topic,
+        "search_depth": search_depth,
+        "include_answer": include_answer,
+        "max_results": max_results,
+        "time_range": time_range,
+    }
+
+    def fetch() -> Dict[str, Any]:
+        client = get_tavily_client()
+        return client.search(
+            query=query,
+            topic=topic,
+            search_depth=search_depth,
+            include_answer=include_answer,
+            max_results=max_results,
+            time_range=time_range,
+        )
+
+    return _cached_call("search", params, fetch, use_cache)
+
+
+async def tavily_search_async(
+    query: str,
+    *,
+    topic: str = "general",
+    search_depth: str = "basic",
+    include_answer: bool | str = "basic",
+    max_results: int = 5,
+    time_range: Optional[str] = None,
+    use_cache: bool = True,
+) -> Dict[str, Any]:
+    """
+    Non-blocking Tavily /search; shares the cache with `tavily_search`.
+    """
+    params = {
+        "query": _normalize_query(query),
+        "topic": topic,
+        "search_depth": search_depth,
+        "include_answer": include_answer,
+        "max_results": max_results,
+        "time_range": time_range,
+    }
+
+    async def fetch() -> Dict[str, Any]:
+        client = get_async_tavily_client()
+        return await client.search(
+            query=query,
+            topic=topic,
+            search_depth=search_depth,
+            include_answer=include_answer,
+            max_results=max_results,
+            time_range=time_range,
+        )
+
+    return await _cached_call_async("search", params, fetch, use_cache)
 
 
 def tavily_extract(
@@ -47,13 +182,23 @@ def tavily_extract(
     *,
     extract_depth: str = "basic",
     format: str = "markdown",
+    use_cache: bool = True,
 ) -> Dict[str, Any]:
-    client = get_tavily_client()
-    return client.extract(
-        urls=urls,
-        extract_depth=extract_depth,
-        format=format,
-    )
+    params = {
+        "urls": sorted([urls] if isinstance(urls, str) else urls),
+        "extract_depth": extract_depth,
+        "format": format,
+    }
+
+    def fetch() -> Dict[str, Any]:
+        client = get_tavily_client()
+        return client.extract(
+            urls=urls,
+            extract_depth=extract_depth,
+            format=format,
+        )
+
+    return _cached_call("extract", params, fetch, use_cache)
 
 
 def tavily_crawl(
@@ -62,11 +207,22 @@ def tavily_crawl(
     instructions: Optional[str] = None,
     max_depth: int = 1,
     limit: int = 50,
+    use_cache: bool = True,
 ) -> Dict[str, Any]:
-    client = get_tavily_client()
-    return client.crawl(
-        url=url,
-        instructions=instructions,
-        max_depth=max_depth,
-        limit=limit,
-    )
+    params = {
+        "url": url.strip(),
+        "instructions": _normalize_query(instructions) if instructions else None,
+        "max_depth": max_depth,
+        "limit": limit,
+    }
+
+    def fetch() -> Dict[str, Any]:
+        client = get_tavily_client()
+        return client.crawl(
+            url=url,
+            instructions=instructions,
+            max_depth=max_depth,
+            limit=limit,
+        )
+
+    return _cached_call("crawl", params, fetch, use_cache)
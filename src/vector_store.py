@@ -1,47 +1,33 @@
 import os
 from typing import List, Dict, Any
-from pymongo import MongoClient
-from openai import OpenAI
 
-_client = None
-_db = None
-_collection = None
-_embed_client = None
+import numpy as np
+from bson import ObjectId
 
+from . import clients
+from .embeddings import embed_texts
+from .local_index import get_local_index, use_local_backend
+from .search_filters import num_candidates, vector_search_stage
 
-def _get_collection():
-    global _client, _db, _collection
-    if _collection is None:
-        uri = os.getenv("MONGODB_URI")
-        db_name = os.getenv("MONGODB_DB", "ai_product_strategist")
-        coll_name = os.getenv("MONGODB_COLLECTION", "research")
-
-        if not uri:
-            raise RuntimeError("MONGODB_URI not set")
+EMBED_MODEL = "text-embedding-3-small"
+EMBED_DIMENSIONS = 1536
 
-        _client = MongoClient(uri)
-        _db = _client[db_name]
-        _collection = _db[coll_name]
-    return _collection
 
-
-def _get_embed_client() -> OpenAI:
-    global _embed_client
-    if _embed_client is None:
-        _embed_client = OpenAI()
-    return _embed_client
+def _get_collection():
+    db_name = os.getenv("MONGODB_DB", "ai_product_strategist")
+    coll_name = os.getenv("MONGODB_COLLECTION", "research")
+    return clients.get_mongo()[db_name][coll_name]
 
 
 def embed_text(texts: List[str]) -> List[List[float]]:
     """
     Uses OpenAI embeddings; change model if needed.
     """
-    client = _get_embed_client()
-    resp = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=texts,
-    )
-    return [d.embedding for d in resp.data]
+    return embed_texts(texts, model=EMBED_MODEL).tolist()
+
+
+def _local_index_name() -> str:
+    return "vector_store_" + os.getenv("MONGODB_COLLECTION", "research")
 
 
 def add_documents(
@@ -54,7 +40,6 @@ def add_documents(
     """
     Each doc: {"text": "...", "metadata": {...}}
     """
-    coll = _get_collection()
     texts = [d["text"] for d in docs]
     vectors = embed_text(texts)
 
@@ -73,8 +58,17 @@ def add_documents(
                 "metadata": base_meta,
             }
         )
-    if to_insert:
-        coll.insert_many(to_insert)
+    if not to_insert:
+        return
+    if use_local_backend():
+        index = get_local_index(_local_index_name(), EMBED_DIMENSIONS)
+        index.add(
+            [str(ObjectId()) for _ in to_insert],
+            np.asarray([d["embedding"] for d in to_insert]),
+            [{"text": d["text"], "metadata": d["metadata"]} for d in to_insert],
+        )
+        return
+    _get_collection().insert_many(to_insert)
 
 
 def search_similar(
@@ -84,7 +78,6 @@ def search_similar(
     product: str | None = None,
     topic: str | None = None,
 ) -> List[Dict[str, Any]]:
-    coll = _get_collection()
     [query_vec] = embed_text([query])
 
     filter_query: Dict[str, Any] = {}
@@ -93,19 +86,25 @@ def search_similar(
     if topic:
         filter_query["metadata.topic"] = topic
 
-    # You'll need to set up a vector index in Atlas and update this
-    # to use $vectorSearch or similar, but this is the conceptual structure.
+    if use_local_backend():
+        index = get_local_index(_local_index_name(), EMBED_DIMENSIONS)
+
+        def matches(doc: Dict[str, Any]) -> bool:
+            meta = doc.get("metadata", {})
+            return all(meta.get(f.split(".", 1)[1]) == v for f, v in filter_query.items())
+
+        hits = index.search(query_vec, k, filter_fn=matches if filter_query else None)
+        return [{**index.docs[doc_id], "score": score} for doc_id, score in hits]
+
+    # Index + filter fields: python -m src.index_bootstrap
     pipeline = [
-        {
-            "$vectorSearch": {
-                "index": "vector_index",
-                "path": "embedding",
-                "queryVector": query_vec,
-                "numCandidates": 50,
-                "limit": k,
-                "filter": filter_query or None,
-            }
-        },
+        vector_search_stage(
+            query_vec,
+            path="embedding",
+            limit=k,
+            mongo_filter=filter_query,
+            candidates=num_candidates(k),
+        ),
         {
             "$project": {
                 "_id": 0,
@@ -115,7 +114,7 @@ def search_similar(
             }
         },
     ]
-    docs = list(coll.aggregate(pipeline))
+    docs = list(_get_collection().aggregate(pipeline))
 
     for d in docs:
         if "_id" in d:
@@ -1,26 +1,23 @@
 # src/workflows.py
-import json
-import os
 from typing import Any, Dict
 
 from fastmcp import FastMCP
 from openai import OpenAI
+from src import clients
 from src.db_client import save_strategy_run
 
-from src.db import save_strategy_to_db
+from src.write_behind import persist_strategy
 
 
 from .research_tools import build_research_bundle
+from .context_packer import pack_research
 
 
 app = FastMCP("strategy")
 
 
 def _get_openai_client() -> OpenAI:
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY not set")
-    return OpenAI(api_key=api_key)
+    return clients.get_openai()
 
 
 # @app.tool
@@ -105,7 +102,7 @@ def strategy_pipeline(
     constraints: str = "",
 ) -> Dict[str, Any]:
     # 1) Run Tavily research bundle
-    research = research_bundle(
+    research = build_research_bundle(
         product_name=product_name,
         target_users=target_users,
         goal=goal,
@@ -115,6 +112,7 @@ def strategy_pipeline(
 
     # 2) Call OpenAI to generate the strategy markdown
     client = _get_openai_client()
+    research_context = pack_research(research["tavily_raw"])["context"]
 
     prompt = f"""
 You are a senior AI Product Strategist.
@@ -128,7 +126,7 @@ You are helping define the strategy for a product called:
 
 You are given Tavily web research (JSON) with pains, competitors and trends:
 
-{json.dumps(research["tavily_raw"], indent=2)}
+{research_context}
 
 Using this, write a clear strategy document in markdown with the following sections:
 
@@ -156,11 +154,11 @@ points where helpful.
     archive_id = save_strategy_run(research)
 
     # 4) Save embedded strategy (with vector) – goes to `strategies`
-    vec_result = save_strategy_to_db(research)
+    vec_result = persist_strategy(research)
 
     # 5) Add metadata for debugging / UI, but keep it safe
     research["mongo_archive_id"] = archive_id
-    research["vector_saved"] = bool(vec_result.get("inserted"))
+    research["vector_saved"] = vec_result.get("status") in ("ok", "queued")
 
     return research
 
@@ -0,0 +1,487 @@
+# src/write_behind.py
+"""
+Write-behind persistence for strategy saves.
+
+`persist_strategy` appends the document to a local append-only log
+(fsynced) and returns at once with a client-side ObjectId. A background
+thread embeds and inserts queued documents in batches (`insert_many`),
+retrying with exponential backoff while Mongo is unreachable. Inserted
+ids are acknowledged in the same log; on restart every un-acknowledged
+document is replayed. Inserts are idempotent by `_id`, so a replay after
+a crash between insert and ack does not duplicate anything.
+
+Outages (network, timeouts, rate limits) back the whole batch off. Any
+other failure may come from a single document, so the batch is split in
+halves until the failing documents are isolated and the rest is written.
+A document that fails on its own WRITE_BEHIND_MAX_ATTEMPTS times moves
+to the dead-letter file (dead_letter.jsonl) and stops blocking the queue.
+
+Processes sharing WRITE_BEHIND_DIR (UI, MCP server, batch runner) each
+own one log slot (strategies.log, strategies.1.log, ...) under an
+exclusive lock, and on start adopt the slots of processes that are gone.
+No process compacts or truncates a log another live process writes to.
+Forked children start their own queue.
+"""
+import atexit
+import glob
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import openai
+from bson import ObjectId
+from pymongo.errors import ConnectionFailure, PyMongoError
+
+from .async_utils import run_blocking
+from .blob_store import BLOB_FIELDS, blob_fields, preview
+from .db import (
+    get_strategy,
+    get_strategy_async,
+    insert_strategy_batch,
+    iter_strategies,
+    iter_strategies_async,
+    prepare_strategy_doc,
+    project_fields,
+    resolve_fields,
+    save_strategy_to_db,
+    save_strategy_to_db_async,
+)
+from .response_cache import CACHE_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, one process per directory
+    fcntl = None
+
+# "write_behind" (queue + background insert) or "sync" (insert on the request path)
+STRATEGY_SAVE_MODE = os.getenv("STRATEGY_SAVE_MODE", "write_behind").lower()
+WRITE_BEHIND_DIR = os.getenv("WRITE_BEHIND_DIR", os.path.join(CACHE_DIR, "write_behind"))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "32"))
+# How long the worker waits for more documents before a partial batch
+WRITE_BEHIND_FLUSH_MS = float(os.getenv("WRITE_BEHIND_FLUSH_MS", "200"))
+WRITE_BEHIND_MAX_BACKOFF = float(os.getenv("WRITE_BEHIND_MAX_BACKOFF", "60"))
+WRITE_BEHIND_FSYNC = os.getenv("WRITE_BEHIND_FSYNC", "1").lower() in ("1", "true", "yes")
+# Truncate the log once it is fully acknowledged and larger than this
+WRITE_BEHIND_COMPACT_BYTES = int(os.getenv("WRITE_BEHIND_COMPACT_BYTES", str(8 * 1024 * 1024)))
+# Failed inserts of a document on its own before it is dead-lettered
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "5"))
+
+_BASE_BACKOFF = 0.5
+_EXIT_FLUSH_SECONDS = 5.0
+
+
+def _slot_path(directory: str, slot: int) -> str:
+    return os.path.join(directory, "strategies.log" if slot == 0 else f"strategies.{slot}.log")
+
+
+def _try_lock(log_path: str):
+    """
+    Open file holding the exclusive lock on `log_path`, or None if a live
+    process owns it. The lock lives in a side file because compaction
+    replaces the log itself.
+    """
+    lock = open(log_path + ".lock", "a")
+    if fcntl is None:
+        return lock
+    try:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return None
+    return lock
+
+
+def _transient(e: Exception) -> bool:
+    """
+    Outage or throttling: retry the batch as is after a backoff. Anything
+    else may be caused by one document in it.
+    """
+    if isinstance(
+        e, (ConnectionFailure, OSError, openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+    ):
+        return True
+    return isinstance(e, PyMongoError) and (e.timeout or e.has_error_label("RetryableWriteError"))
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        directory: str = WRITE_BEHIND_DIR,
+        insert: Callable[[List[Dict[str, Any]]], None] = insert_strategy_batch,
+    ):
+        self._insert = insert
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        # id -> {"doc", "enqueued_at", "attempts"}, in enqueue order
+        self._pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._stats = {
+            "enqueued": 0,
+            "replayed": 0,
+            "written": 0,
+            "batches": 0,
+            "failures": 0,
+            "consecutive_failures": 0,
+            "last_error": None,
+            "isolated_failures": 0,
+            "dead_lettered": 0,
+            "last_dead_letter": None,
+            "last_write_lag_seconds": None,
+            "max_write_lag_seconds": 0.0,
+        }
+
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        for slot in itertools.count():
+            self._log_path = _slot_path(directory, slot)
+            self._lock = _try_lock(self._log_path)
+            if self._lock is not None:
+                break
+        self._dead_letter_path = os.path.join(directory, "dead_letter.jsonl")
+        self._replay()
+        self._log = open(self._log_path, "a", encoding="utf-8")
+
+        self._thread = threading.Thread(target=self._run, name="strategy-write-behind", daemon=True)
+        self._thread.start()
+
+    # ---- log ----
+    def _orphans(self) -> List[tuple]:
+        # [(path, lock)] of other slots whose process is gone
+        found = []
+        for path in sorted(glob.glob(os.path.join(self._directory, "strategies*.log"))):
+            if path == self._log_path or fcntl is None:
+                continue
+            lock = _try_lock(path)
+            if lock is not None:
+                found.append((path, lock))
+        return found
+
+    def _replay(self) -> None:
+        orphans = self._orphans()
+        for path in [self._log_path, *(path for path, _ in orphans)]:
+            self._read_log(path)
+        self._stats["replayed"] = len(self._pending)
+
+        # Compact: keep only what still has to be written
+        tmp = self._log_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for doc_id, entry in self._pending.items():
+                f.write(
+                    self._record(
+                        "put", id=doc_id, doc=entry["doc"], ts=entry["enqueued_at"], attempts=entry["attempts"]
+                    )
+                )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._log_path)
+        # Adopted entries are in our log now (a crash before this only replays them twice)
+        for path, lock in orphans:
+            os.remove(path)
+            lock.close()
+
+    def _read_log(self, path: str) -> None:
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line from a crash
+                    if record.get("op") == "put":
+                        self._pending[record["id"]] = {
+                            "doc": record["doc"],
+                            "enqueued_at": record.get("ts", time.time()),
+                            "attempts": record.get("attempts", 0),
+                        }
+                    elif record.get("op") == "fail" and record.get("id") in self._pending:
+                        self._pending[record["id"]]["attempts"] += 1
+                    elif record.get("op") == "ack":
+                        for doc_id in record.get("ids", []):
+                            self._pending.pop(doc_id, None)
+
+    @staticmethod
+    def _record(op: str, **fields: Any) -> str:
+        return json.dumps({"op": op, **fields}, ensure_ascii=False, default=str) + "\n"
+
+    def _append(self, line: str) -> None:
+        # Caller holds self._cond
+        self._log.write(line)
+        self._log.flush()
+        if WRITE_BEHIND_FSYNC:
+            os.fsync(self._log.fileno())
+
+    # ---- API ----
+    def enqueue(self, doc: Dict[str, Any]) -> str:
+        """
+        Durably queue `doc` (no vector) and return its id.
+        """
+        doc_id = str(doc.get("_id") or ObjectId())
+        doc = {k: v for k, v in doc.items() if k != "_id"}
+        now = time.time()
+        with self._cond:
+            self._append(self._record("put", id=doc_id, doc=doc, ts=now))
+            self._pending[doc_id] = {"doc": doc, "enqueued_at": now, "attempts": 0}
+            self._stats["enqueued"] += 1
+            self._cond.notify_all()
+        return doc_id
+
+    def pending_doc(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            entry = self._pending.get(doc_id)
+            return dict(entry["doc"]) if entry else None
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the queue is empty; False on timeout.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending, timeout)
+
+    def close(self, timeout: float = _EXIT_FLUSH_SECONDS) -> None:
+        self.flush(timeout)
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            # Frees the slot for another queue in this process (tests, reloads)
+            with self._cond:
+                self._log.close()
+                self._lock.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            s = dict(self._stats)
+            s["depth"] = len(self._pending)
+            oldest = next(iter(self._pending.values()), None)
+            s["lag_seconds"] = round(time.time() - oldest["enqueued_at"], 3) if oldest else 0.0
+            s["log_path"] = self._log_path
+            s["log_bytes"] = 0 if self._log.closed else self._log.tell()
+            s["dead_letter_path"] = self._dead_letter_path
+        return s
+
+    # ---- worker ----
+    def _next_batch(self) -> List[str]:
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending or self._stop.is_set())
+            if len(self._pending) < WRITE_BEHIND_BATCH_SIZE and not self._stop.is_set():
+                # Give concurrent saves a moment to join the batch
+                self._cond.wait(WRITE_BEHIND_FLUSH_MS / 1000.0)
+            return list(self._pending)[:WRITE_BEHIND_BATCH_SIZE]
+
+    def _write(self, ids: List[str]) -> int:
+        """
+        Insert `ids`, splitting the batch in halves on a non-transient
+        failure; returns how many were written. Transient errors propagate.
+        """
+        with self._cond:
+            docs = [dict(self._pending[i]["doc"], _id=i) for i in ids]
+        try:
+            self._insert(docs)
+        except Exception as e:
+            if _transient(e):
+                raise
+            if len(ids) > 1:
+                mid = len(ids) // 2
+                return self._write(ids[:mid]) + self._write(ids[mid:])
+            self._failed(ids[0], e)
+            return 0
+        self._acked(ids)
+        return len(ids)
+
+    def _failed(self, doc_id: str, error: Exception) -> None:
+        message = f"{type(error).__name__}: {error}"
+        with self._cond:
+            entry = self._pending[doc_id]
+            entry["attempts"] += 1
+            self._stats["isolated_failures"] += 1
+            self._stats["last_error"] = message
+            if entry["attempts"] < WRITE_BEHIND_MAX_ATTEMPTS:
+                self._append(self._record("fail", id=doc_id))
+                return
+            with open(self._dead_letter_path, "a", encoding="utf-8") as f:
+                record = self._record(
+                    "dead", id=doc_id, doc=entry["doc"], error=message, attempts=entry["attempts"], ts=time.time()
+                )
+                f.write(record)
+                f.flush()
+                os.fsync(f.fileno())
+            # Acked so a replay skips it; the dead-letter file keeps the document
+            self._append(self._record("ack", ids=[doc_id]))
+            del self._pending[doc_id]
+            self._stats["dead_lettered"] += 1
+            self._stats["last_dead_letter"] = {"id": doc_id, "error": message}
+            self._cond.notify_all()
+
+    def _acked(self, ids: List[str]) -> None:
+        now = time.time()
+        with self._cond:
+            self._append(self._record("ack", ids=ids))
+            lags = [now - self._pending.pop(i)["enqueued_at"] for i in ids]
+            self._stats["written"] += len(ids)
+            self._stats["batches"] += 1
+            self._stats["last_write_lag_seconds"] = round(max(lags), 3)
+            self._stats["max_write_lag_seconds"] = round(
+                max(self._stats["max_write_lag_seconds"], max(lags)), 3
+            )
+            if not self._pending and self._log.tell() > WRITE_BEHIND_COMPACT_BYTES:
+                self._log.truncate(0)
+                self._log.seek(0)
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        backoff = 0.0
+        while not self._stop.is_set():
+            ids = self._next_batch()
+            if not ids:
+                continue
+            try:
+                written = self._write(ids)
+            except Exception as e:
+                written = 0
+                with self._cond:
+                    self._stats["last_error"] = f"{type(e).__name__}: {e}"
+            if written:
+                backoff = 0.0
+                with self._cond:
+                    self._stats["consecutive_failures"] = 0
+                continue
+            backoff = min(WRITE_BEHIND_MAX_BACKOFF, backoff * 2 or _BASE_BACKOFF)
+            with self._cond:
+                self._stats["failures"] += 1
+                self._stats["consecutive_failures"] += 1
+            # Jittered so several workers don't hammer a recovering server together
+            self._stop.wait(backoff * random.uniform(0.5, 1.0))
+
+
+_queue: Optional[WriteBehindQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_write_behind() -> WriteBehindQueue:
+    """
+    Process-wide queue; created (and the log replayed) on first use.
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = WriteBehindQueue()
+    return _queue
+
+
+def _close_queue() -> None:
+    if _queue is not None:
+        _queue.close()
+
+
+def _reset_after_fork() -> None:
+    # The worker thread doesn't exist in a forked child, and the parent
+    # still owns its log slot; the child claims its own on first use.
+    global _queue, _queue_lock
+    _queue = None
+    _queue_lock = threading.Lock()
+
+
+atexit.register(_close_queue)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def start_write_behind() -> None:
+    """
+    Replay unsent saves at process start instead of on the first new save.
+    """
+    if STRATEGY_SAVE_MODE == "write_behind":
+        get_write_behind()
+
+
+def write_behind_stats() -> Dict[str, Any]:
+    if STRATEGY_SAVE_MODE != "write_behind":
+        return {"mode": STRATEGY_SAVE_MODE}
+    return dict(get_write_behind().stats(), mode=STRATEGY_SAVE_MODE)
+
+
+# ---- SAVE ENTRY POINTS ----
+def persist_strategy(strategy: dict) -> Dict[str, Any]:
+    """
+    Save a pipeline result. In write-behind mode this only appends to the
+    local log; the returned id is the document's final `_id`.
+    """
+    if STRATEGY_SAVE_MODE != "write_behind":
+        return save_strategy_to_db(strategy)
+    doc_id = get_write_behind().enqueue(prepare_strategy_doc(strategy))
+    return {"status": "queued", "inserted": False, "backend": "write_behind", "id": doc_id}
+
+
+async def persist_strategy_async(strategy: dict) -> Dict[str, Any]:
+    if STRATEGY_SAVE_MODE != "write_behind":
+        return await save_strategy_to_db_async(strategy)
+    # The fsync can take a few ms; keep it off the event loop
+    return await run_blocking(persist_strategy, strategy)
+
+
+def _pending_view(doc: Dict[str, Any], doc_id: str, fields) -> Dict[str, Any]:
+    # Same shape as a stored strategy: preview always, bulky fields on request
+    wanted = blob_fields(fields)
+    view = {k: v for k, v in doc.items() if k not in BLOB_FIELDS or k in wanted}
+    return dict(view, preview=preview(doc.get("strategy_markdown")), id=doc_id)
+
+
+def lookup_strategy(doc_id: str, fields=None):
+    """
+    `get_strategy` that also sees saves still waiting in the queue.
+    """
+    if STRATEGY_SAVE_MODE == "write_behind":
+        doc = get_write_behind().pending_doc(doc_id)
+        if doc is not None:
+            return _pending_view(doc, doc_id, fields)
+    return get_strategy(doc_id, fields)
+
+
+async def lookup_strategy_async(doc_id: str, fields=None):
+    if STRATEGY_SAVE_MODE == "write_behind":
+        doc = await run_blocking(get_write_behind().pending_doc, doc_id)
+        if doc is not None:
+            return _pending_view(doc, doc_id, fields)
+    return await get_strategy_async(doc_id, fields)
+
+
+def _pending_docs(ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    if STRATEGY_SAVE_MODE != "write_behind":
+        return {}
+    queue = get_write_behind()
+    found = {}
+    for doc_id in dict.fromkeys(ids):
+        doc = queue.pending_doc(doc_id)
+        if doc is not None:
+            found[doc_id] = dict(doc, preview=preview(doc.get("strategy_markdown")))
+    return found
+
+
+def lookup_strategies(ids: List[str], view: str = "summary", fields=None):
+    """
+    `iter_strategies` that also sees saves still waiting in the queue.
+    """
+    paths = resolve_fields(view, fields)
+    pending = _pending_docs(ids)
+    stored = iter_strategies([i for i in ids if i not in pending], view, paths)
+    for doc_id in ids:
+        if doc_id in pending:
+            yield dict(project_fields(pending[doc_id], paths), id=doc_id)
+        else:
+            yield next(stored)
+
+
+async def lookup_strategies_async(ids: List[str], view: str = "summary", fields=None):
+    paths = resolve_fields(view, fields)
+    pending = await run_blocking(_pending_docs, ids)
+    stored = iter_strategies_async([i for i in ids if i not in pending], view, paths)
+    for doc_id in ids:
+        if doc_id in pending:
+            yield dict(project_fields(pending[doc_id], paths), id=doc_id)
+        else:
+            yield await stored.__anext__()
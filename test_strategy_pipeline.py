@@ -1,6 +1,7 @@
 import json
 
 from src.research_tools import build_research_bundle
+from src.context_packer import pack_research
 from src.llm_client import generate_full_strategy_struct, render_strategy_markdown
 from src.db import save_strategy_to_db
 
@@ -20,7 +21,9 @@ def main():
         constraints=constraints,
     )
 
-    tavily_raw_json = json.dumps(research["tavily_raw"], indent=2)
+    packed = pack_research(research["tavily_raw"])
+    tavily_raw_json = packed["context"]
+    print("Research context tokens:", packed["stats"])
 
     print("Calling LLM for full strategy JSON...")
     strategy_struct = generate_full_strategy_struct(
@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+import pytest
+
+from src import batch_runner
+
+
+class FakePipeline:
+    def __init__(self, monkeypatch, research_status="ok", unresolved=None):
+        self.calls = {"research": 0, "generate": 0, "save": 0}
+        self.research_status = research_status
+        self.unresolved = unresolved or {}
+        self.fail_generate = False
+        monkeypatch.setattr(batch_runner, "build_research_bundle_async", self.research)
+        monkeypatch.setattr(batch_runner, "generate_full_strategy_struct_async", self.generate)
+        monkeypatch.setattr(batch_runner, "render_strategy_markdown", lambda s: "# " + s["product_name"])
+        monkeypatch.setattr(batch_runner, "save_strategy_to_db_async", self.save)
+
+    async def research(self, **inputs):
+        self.calls["research"] += 1
+        return {
+            "product_name": inputs["product_name"],
+            "tavily_raw": {"market": {"results": []}},
+            "facet_timings": {"market": {"status": self.research_status}},
+        }
+
+    async def generate(self, **inputs):
+        self.calls["generate"] += 1
+        if self.fail_generate:
+            raise RuntimeError("model down")
+        return {"product_name": inputs["product_name"], "_cascade": {"unresolved": self.unresolved}}
+
+    async def save(self, record):
+        self.calls["save"] += 1
+        return {"status": "ok", "id": record["product_name"]}
+
+
+ITEMS = [
+    {"product_name": "Acme", "target_users": "teams", "goal": "grow"},
+    {"product_name": "Zenith", "target_users": "shops", "goal": "retain", "tags": "b2b, retail"},
+]
+
+
+@pytest.fixture
+def items(tmp_path):
+    path = tmp_path / "items.jsonl"
+    path.write_text("".join(json.dumps(item) + "\n" for item in ITEMS))
+    return batch_runner.load_items(str(path))
+
+
+def _run(items, tmp_path):
+    out = tmp_path / "out.ndjson"
+    summary = asyncio.run(batch_runner.run_batch(items, str(out), checkpoint_dir=str(tmp_path / "ckpt")))
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    return summary, rows
+
+
+def test_load_items_assigns_stable_ids(tmp_path, items):
+    assert items[0]["company_type"] == "mid-size B2B SaaS"
+    assert items[1]["tags"] == ["b2b", "retail"]
+    assert len({item["id"] for item in items}) == 2
+    csv_path = tmp_path / "items.csv"
+    csv_path.write_text("product_name,target_users,goal\nAcme,teams,grow\n")
+    assert batch_runner.load_items(str(csv_path))[0]["id"] == items[0]["id"]
+    csv_path.write_text("product_name,target_users,goal\nAcme,,grow\n")
+    with pytest.raises(ValueError, match="target_users"):
+        batch_runner.load_items(str(csv_path))
+
+
+def test_resumes_from_the_last_checkpoint(monkeypatch, tmp_path, items):
+    fake = FakePipeline(monkeypatch)
+    fake.fail_generate = True
+    summary, rows = _run(items, tmp_path)
+    assert summary["errors"] == 2 and {row["stage"] for row in rows} == {"generate"}
+
+    fake.fail_generate = False
+    summary, rows = _run(items, tmp_path)
+    assert summary["ok"] == 2 and summary["resumed_stages"] == 2
+    assert fake.calls == {"research": 2, "generate": 4, "save": 2}
+
+    # Items already written as ok are skipped entirely
+    summary, _ = _run(items, tmp_path)
+    assert summary["skipped_already_done"] == 2 and fake.calls["research"] == 2
+
+
+def test_failed_facets_are_not_checkpointed(monkeypatch, tmp_path, items):
+    fake = FakePipeline(monkeypatch, research_status="timeout")
+    summary, rows = _run(items[:1], tmp_path)
+    assert summary["errors"] == 1 and "IncompleteStage" in rows[0]["error"]
+    fake.research_status = "ok"
+    summary, _ = _run(items[:1], tmp_path)
+    assert summary["ok"] == 1 and summary["resumed_stages"] == 0 and fake.calls["research"] == 2
+
+
+def test_unresolved_sections_fail_the_item(monkeypatch, tmp_path, items):
+    FakePipeline(monkeypatch, unresolved={"prds": "missing"})
+    summary, rows = _run(items[:1], tmp_path)
+    assert summary["errors"] == 1 and rows[0]["stage"] == "generate"
+    monkeypatch.setattr(batch_runner, "BATCH_ALLOW_UNRESOLVED", True)
+    summary, _ = _run(items[:1], tmp_path)
+    assert summary["ok"] == 1
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from src import context_packer
+from src.context_packer import count_tokens, pack_research
+
+
+@pytest.fixture(autouse=True)
+def chars_per_token(monkeypatch):
+    # Deterministic ~4 chars/token counting, no tiktoken download
+    monkeypatch.setattr(context_packer, "_encoder", False)
+
+
+def _raw(n=6):
+    return {
+        "market": {
+            "answer": "The market is growing.",
+            "query": "dropped",
+            "results": [
+                {"title": f"T{i}", "url": f"https://x.com/{i}", "content": "word " * 100, "score": i / 10, "raw": "z" * 50}
+                for i in range(n)
+            ],
+        }
+    }
+
+
+def test_only_used_fields_survive():
+    packed = pack_research(_raw(2), token_budget=10_000, max_content_chars=40)
+    context = json.loads(packed["context"])
+    assert set(context["market"]) == {"answer", "results"}
+    assert set(context["market"]["results"][0]) == {"title", "url", "content"}
+    assert len(context["market"]["results"][0]["content"]) <= 40
+    assert packed["stats"]["tokens_after"] < packed["stats"]["tokens_before"]
+
+
+def test_budget_drops_lowest_scored_results_first():
+    packed = pack_research(_raw(), token_budget=200)
+    stats = packed["stats"]
+    assert stats["tokens_after"] <= 200 == stats["budget"]
+    assert stats["results_dropped"] > 0
+    kept = [r["title"] for r in json.loads(packed["context"])["market"]["results"]]
+    assert kept == [f"T{i}" for i in range(6 - stats["results_kept"], 6)]
+    assert count_tokens(packed["context"]) == stats["tokens_after"]
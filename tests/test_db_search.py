@@ -0,0 +1,156 @@
+import hashlib
+
+import numpy as np
+import pytest
+from pymongo.errors import OperationFailure
+
+from src import db, lexical_index, local_index
+from src.quantization import to_float32_blob
+
+DIM = 8
+
+
+def _unit(*weights):
+    v = np.zeros(DIM, np.float32)
+    v[: len(weights)] = weights
+    return v / np.linalg.norm(v)
+
+
+def _fake_embed(text):
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], "little")
+    return np.random.default_rng(seed).normal(size=DIM).astype(np.float32).tolist()
+
+
+@pytest.fixture
+def local_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(local_index, "VECTOR_BACKEND", "local")
+    monkeypatch.setattr(local_index, "LOCAL_INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(local_index, "_indexes", {})
+    monkeypatch.setattr(lexical_index, "_indexes", {})
+    monkeypatch.setattr(db, "EMBED_DIMENSIONS", DIM)
+    monkeypatch.setattr(db, "embed_text", _fake_embed)
+    return db._local_strategies()
+
+
+# ---- local backend ----
+def test_local_hits_use_the_atlas_score_scale(local_db):
+    local_db.add(["a", "b"], np.stack([_unit(1), _unit(-1)]), [{"product_name": "A"}, {"product_name": "B"}])
+    hits = db._search_local(_unit(1).tolist(), 2)
+    assert [h["product_name"] for h in hits] == ["A", "B"]
+    assert hits[0]["score"] == pytest.approx(1.0)
+    assert hits[1]["score"] == pytest.approx(0.0)
+
+
+# ---- rescoring ----
+def test_rescore_puts_legacy_and_quantized_hits_on_one_scale(monkeypatch):
+    monkeypatch.setattr(db, "VECTOR_STORAGE", "int8")
+    monkeypatch.setattr(db, "RESCORE_FACTOR", 4)
+    query = _unit(1)
+    close, far = _unit(1, 0.5), _unit(1, 2)
+    results = [
+        # Saved before quantization: no vector_full, index score on another scale
+        {"id": "legacy", "score": 0.99, "vector": far.tolist()},
+        {"id": "quantized", "score": 0.6, "vector": b"int8 bytes", "vector_full": to_float32_blob(close)},
+    ]
+    rescored = db._rescore_results(query.tolist(), results, 2)
+    assert [d["id"] for d in rescored] == ["quantized", "legacy"]
+    assert rescored[0]["score"] == pytest.approx((1 + float(close @ query)) / 2)
+    assert rescored[1]["score"] == pytest.approx((1 + float(far @ query)) / 2)
+
+
+def test_pipeline_projects_legacy_vectors_only_when_scoring_in_python(monkeypatch):
+    monkeypatch.setattr(db, "VECTOR_STORAGE", "int8")
+    monkeypatch.setattr(db, "RESCORE_FACTOR", 4)
+    project = db._vector_search_pipeline(_unit(1).tolist(), 2)[1]["$project"]
+    assert project["vector_full"] == 1 and "$cond" in project["vector"]
+    monkeypatch.setattr(db, "VECTOR_STORAGE", "array")
+    project = db._vector_search_pipeline(_unit(1).tolist(), 2)[1]["$project"]
+    assert "vector" not in project and "vector_full" not in project
+
+
+# ---- hybrid search ----
+def test_fuse_ranks_hits_found_by_both_first():
+    vector_hits = [{"id": "v", "score": 0.9}, {"id": "both", "score": 0.8}]
+    lexical_hits = [{"id": "both", "score": 7.0}, {"id": "l", "score": 3.0}]
+    fused = db._fuse(vector_hits, lexical_hits, 3)
+    assert [h["id"] for h in fused] == ["both", "v", "l"]
+    assert fused[0]["vector_score"] == 0.8 and fused[0]["lexical_score"] == 7.0
+    assert fused[1]["lexical_score"] is None and fused[2]["vector_score"] is None
+
+
+def test_hybrid_search_combines_both_rankers(local_db, monkeypatch):
+    monkeypatch.setattr(db, "embed_text", lambda text: _unit(1).tolist())
+    local_db.add(
+        ["semantic", "keyword"],
+        np.stack([_unit(1, 0.1), _unit(-1, 1)]),
+        [
+            {"product_name": "Zenith", "strategy_markdown": "pricing for teams"},
+            {"product_name": "Acme Rocket", "strategy_markdown": "acme rocket launch plan"},
+        ],
+    )
+    assert db.search_strategies("acme rocket", 1, mode="vector")["results"][0]["id"] == "semantic"
+    assert db.search_strategies("acme rocket", 1, mode="lexical")["results"][0]["id"] == "keyword"
+    out = db.search_strategies("acme rocket", 2, mode="hybrid")
+    assert {h["id"] for h in out["results"]} == {"semantic", "keyword"}
+    assert set(out["timings"]) >= {"embed", "vector", "lexical", "fusion"}
+    with pytest.raises(ValueError):
+        db.search_strategies("acme", mode="fuzzy")
+
+
+# ---- near-duplicates ----
+class FakeStrategies:
+    """Atlas collection whose vector index has no filter fields."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.filtered_attempts = 0
+
+    def aggregate(self, pipeline):
+        if "filter" in pipeline[0]["$vectorSearch"]:
+            self.filtered_attempts += 1
+            raise OperationFailure("Path 'product_name' needs to be indexed as filter")
+        return [dict(doc) for doc in self.docs]
+
+
+def test_stored_candidates_scope_in_python_without_filter_fields(monkeypatch):
+    monkeypatch.setattr(local_index, "VECTOR_BACKEND", "atlas")
+    monkeypatch.setitem(db._duplicate_filter, "missing_since", None)
+    col = FakeStrategies(
+        [
+            {"id": "other", "product_name": "Zenith", "vector": _unit(1).tolist()},
+            {"id": "hidden", "product_name": "Acme", "duplicate": True, "vector": _unit(1).tolist()},
+            {"id": "same", "product_name": "Acme", "vector": _unit(1, 1).tolist(), "version": 2},
+        ]
+    )
+    monkeypatch.setattr(db, "get_mongo_client", lambda: {"ai_product_strategist": {"strategies": col}})
+
+    for _ in range(2):
+        candidates = db._stored_candidates(_unit(1).tolist(), {"product_name": "Acme"})
+        assert [c["id"] for c in candidates] == ["same"]
+        assert candidates[0]["similarity"] == pytest.approx(float(_unit(1, 1) @ _unit(1)))
+        assert "vector" not in candidates[0]
+    # The filtered search is not retried until the index is re-probed
+    assert col.filtered_attempts == 1 and db._duplicate_filter_missing()
+
+
+def test_compact_duplicates_spares_versions_of_one_lineage(local_db):
+    local_db.add(
+        ["a", "b", "c", "d"],
+        np.stack([_unit(1), _unit(1, 0.01), _unit(1, 0.02), _unit(1)]),
+        [
+            {"product_name": "Acme"},
+            {"product_name": "Acme"},
+            {"product_name": "Acme", "parent_id": "a"},
+            {"product_name": "Zenith"},
+        ],
+    )
+    report = db.compact_duplicates(mode="mark", threshold=0.95, dry_run=True)
+    assert report["sample"] == [{"keep": "a", "duplicates": ["b"]}]
+    assert not local_db.docs["b"].get("duplicate")
+
+    report = db.compact_duplicates(mode="mark", threshold=0.95)
+    assert report["marked"] == 1 and report["scanned"] == 4
+    assert local_db.docs["b"]["duplicate_of"] == "a"
+    assert not local_db.docs["c"].get("duplicate") and not local_db.docs["d"].get("duplicate")
+    # Marked docs are out of the next pass
+    assert db.compact_duplicates(mode="mark", threshold=0.95)["scanned"] == 3
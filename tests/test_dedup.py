@@ -0,0 +1,21 @@
+import numpy as np
+
+from src.dedup import leader_clusters
+
+
+def test_leader_clusters():
+    vectors = np.array(
+        [[1, 0, 0], [0.99, 0.1, 0], [0, 1, 0], [0, 0.99, 0.05], [0, 0, 1], [1, 0.01, 0]], dtype=np.float32
+    )
+    assert leader_clusters(vectors, threshold=0.95) == [[0, 1, 5], [2, 3]]
+
+
+def test_leader_claims_members_before_later_rows():
+    # 1 is close to both 0 and 2, but 0 leads first and claims it
+    vectors = np.array([[1, 0], [0.97, 0.24], [0.88, 0.47]], dtype=np.float32)
+    assert leader_clusters(vectors, threshold=0.96) == [[0, 1]]
+
+
+def test_no_duplicates():
+    assert leader_clusters(np.eye(3, dtype=np.float32), threshold=0.9) == []
+    assert leader_clusters(np.zeros((0, 3), dtype=np.float32)) == []
@@ -0,0 +1,64 @@
+import threading
+
+import httpx
+import openai
+import pytest
+
+from src.embeddings import EmbeddingBatcher
+
+
+class FakeEmbed:
+    def __init__(self, bad=()):
+        self.bad = set(bad)
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, model, texts, dimensions):
+        with self.lock:
+            self.calls.append(list(texts))
+        if self.bad & set(texts):
+            raise ValueError("input too long")
+        return [[float(len(t)), float(dimensions or 0)] for t in texts]
+
+
+def test_concurrent_requests_share_one_call():
+    embed = FakeEmbed()
+    batcher = EmbeddingBatcher(embed, window_ms=100)
+    futures = [batcher.submit("m", [f"text {i}", "x" * i]) for i in range(5)]
+    results = [f.result(5) for f in futures]
+    assert len(embed.calls) == 1
+    assert results[3] == [[6.0, 0.0], [3.0, 0.0]]
+    assert batcher.stats()["texts_per_call"] == 10
+
+
+def test_groups_by_model_and_respects_max_inputs():
+    embed = FakeEmbed()
+    batcher = EmbeddingBatcher(embed, window_ms=100, max_inputs=3)
+    futures = [batcher.submit("m", ["a", "b"]) for _ in range(3)] + [batcher.submit("other", ["c"], 8)]
+    for f in futures:
+        f.result(5)
+    assert all(len(call) <= 3 for call in embed.calls)
+    assert futures[-1].result() == [[1.0, 8.0]]
+
+
+def test_bad_input_only_fails_its_own_request():
+    embed = FakeEmbed(bad={"bad"})
+    batcher = EmbeddingBatcher(embed, window_ms=100)
+    good = batcher.submit("m", ["good"])
+    bad = batcher.submit("m", ["bad"])
+    assert good.result(5) == [[4.0, 0.0]]
+    with pytest.raises(ValueError):
+        bad.result(5)
+    assert batcher.stats()["isolated_retries"] == 1
+
+
+def test_outage_fails_the_batch_without_retries():
+    def down(model, texts, dimensions):
+        raise openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com"))
+
+    batcher = EmbeddingBatcher(down, window_ms=100)
+    futures = [batcher.submit("m", [t]) for t in ("a", "b")]
+    for f in futures:
+        with pytest.raises(openai.APIConnectionError):
+            f.result(5)
+    assert batcher.stats()["api_calls"] == 1
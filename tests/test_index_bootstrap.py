@@ -0,0 +1,48 @@
+import copy
+
+from src import index_bootstrap
+
+
+class FakeCollection:
+    def __init__(self, existing=None):
+        self.existing = existing
+        self.created, self.updated = [], []
+
+    def list_search_indexes(self, name):
+        return [{"name": name, "latestDefinition": self.existing}] if self.existing else []
+
+    def create_search_index(self, model):
+        self.created.append(model)
+
+    def update_search_index(self, name, definition):
+        self.updated.append(definition)
+
+
+def _as_atlas_echoes(definition):
+    # Atlas fills in defaults and reorders fields in latestDefinition
+    echoed = copy.deepcopy(definition)
+    for field in echoed["fields"]:
+        if field["type"] == "vector":
+            field.setdefault("quantization", "none")
+            field["similarity"] = field["similarity"].upper()
+    echoed["fields"].reverse()
+    return echoed
+
+
+def test_normalized_echo_is_unchanged():
+    definition = index_bootstrap.strategy_vector_index()
+    col = FakeCollection(_as_atlas_echoes(definition))
+    assert index_bootstrap._ensure_vector_index(col, "vector_index", definition) == "unchanged"
+    assert col.updated == []
+
+
+def test_drift_and_missing_index():
+    definition = index_bootstrap.strategy_vector_index()
+    drifted = _as_atlas_echoes(definition)
+    drifted["fields"] = [f for f in drifted["fields"] if f["type"] == "vector"]
+    col = FakeCollection(drifted)
+    assert index_bootstrap._ensure_vector_index(col, "vector_index", definition) == "updated"
+    assert col.updated == [definition]
+
+    col = FakeCollection()
+    assert index_bootstrap._ensure_vector_index(col, "vector_index", definition) == "created"
@@ -0,0 +1,37 @@
+import pytest
+
+from src.json_repair import loads_tolerant
+
+
+def test_valid_json_passes_through():
+    assert loads_tolerant('{"a": [1, 2], "b": "x"}') == {"a": [1, 2], "b": "x"}
+
+
+def test_fences_and_prose_are_stripped():
+    text = 'Here you go:\n```json\n{"a": 1}\n```\nAnything else?'
+    assert loads_tolerant(text) == {"a": 1}
+
+
+def test_trailing_commas():
+    assert loads_tolerant('{"a": [1, 2,], "b": {"c": 3,},}') == {"a": [1, 2], "b": {"c": 3}}
+
+
+def test_unescaped_quotes_and_newlines_in_strings():
+    text = '{"title": "The "best" plan", "body": "line one\nline two"}'
+    assert loads_tolerant(text) == {"title": 'The "best" plan', "body": "line one\nline two"}
+
+
+def test_truncated_output_keeps_complete_members():
+    text = '{"summary": "done", "features": [{"name": "a"}, {"name": "b"}], "risks": ["unfini'
+    parsed = loads_tolerant(text)
+    assert parsed["summary"] == "done"
+    assert parsed["features"] == [{"name": "a"}, {"name": "b"}]
+
+
+def test_mismatched_closer_is_fixed():
+    assert loads_tolerant('{"a": [1, 2}') == {"a": [1, 2]}
+
+
+def test_no_object_raises():
+    with pytest.raises(ValueError):
+        loads_tolerant("no json here")
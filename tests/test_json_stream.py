@@ -0,0 +1,35 @@
+import json
+
+from src.json_stream import IncrementalJSONObjectParser
+
+DOC = {"summary": "a, b and {c}", "features": [{"name": "x", "tags": ["1", "2"]}], "score": 3, "done": True}
+
+
+def test_members_are_emitted_as_they_complete():
+    parser = IncrementalJSONObjectParser()
+    assert parser.feed('{"summary": "a, b') == []
+    assert parser.feed('", "features": [1,') == [("summary", "a, b")]
+    assert parser.feed(" 2]}") == [("features", [1, 2])]
+    assert parser.done
+
+
+def test_any_chunking_yields_the_whole_document():
+    text = "```json\n" + json.dumps(DOC) + "\n```"
+    for size in (1, 3, 7, len(text)):
+        parser = IncrementalJSONObjectParser()
+        members = []
+        for i in range(0, len(text), size):
+            members.extend(parser.feed(text[i : i + size]))
+        assert dict(members) == DOC
+        assert parser.done
+
+
+def test_escaped_quotes_do_not_end_strings():
+    parser = IncrementalJSONObjectParser()
+    assert parser.feed(r'{"a": "say \"hi\", then go", "b": 1}') == [("a", 'say "hi", then go'), ("b", 1)]
+
+
+def test_malformed_member_is_skipped_and_input_after_the_end_ignored():
+    parser = IncrementalJSONObjectParser()
+    assert parser.feed('{"a": nope, "b": 2}') == [("b", 2)]
+    assert parser.feed(', "c": 3}') == []
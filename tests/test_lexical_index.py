@@ -0,0 +1,41 @@
+from src.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+
+def _index():
+    index = LexicalIndex()
+    index.add("1", {"product_name": "Acme Onboarding", "goal": "activation", "strategy_markdown": "onboarding flows"})
+    index.add("2", {"product_name": "Zenith CRM", "goal": "retention", "strategy_markdown": "mentions acme once"})
+    index.add("3", {"product_name": "Other", "goal": "growth", "strategy_markdown": "nothing relevant"})
+    return index
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("The CRM for B2B-SaaS, and more!") == ["crm", "b2b", "saas", "more"]
+
+
+def test_field_weights_rank_name_hits_first():
+    hits = _index().search("acme", 5)
+    assert [doc_id for doc_id, _ in hits] == ["1", "2"]
+    assert hits[0][1] > hits[1][1]
+
+
+def test_allowed_and_excluded():
+    index = _index()
+    assert [d for d, _ in index.search("acme", 5, allowed={"2"})] == ["2"]
+    assert [d for d, _ in index.search("acme", 5, excluded={"1"})] == ["2"]
+
+
+def test_add_is_idempotent_and_tracks_membership():
+    index = _index()
+    index.add("1", {"product_name": "changed"})
+    assert len(index) == 3
+    assert "1" in index and "4" not in index
+    assert index.search("changed", 5) == []
+    assert index.search("", 5) == []
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "a"]], k=60)
+    assert [doc_id for doc_id, _ in fused][:2] in (["a", "b"], ["b", "a"])
+    assert fused[-1][0] == "c"
+    assert fused[0][1] == 1 / 61 + 1 / 62
@@ -0,0 +1,64 @@
+import asyncio
+
+from src import llm_client
+
+VALID = {
+    "market_overview": "Growing market.",
+    "competitor_analysis": "Two incumbents.",
+    "user_pain_analysis": "Slow onboarding.",
+    "market_gaps": ["No self-serve tier"],
+    "feature_ideas": [{"name": "Wizard", "description": "Guided setup"}],
+    "prioritized_features": [
+        {"name": "Wizard", "score": {"impact": 5, "complexity": 2, "effort": 2, "overall_priority": 1}}
+    ],
+    "three_month_roadmap": {"month_1": ["Wizard"], "month_2": [], "month_3": []},
+    "prds": [{"feature_name": "Wizard", "acceptance_criteria": ["Done in 5 minutes"]}],
+}
+
+
+def _fake_tiers(monkeypatch, replies):
+    """Each tier answers from `replies[model]`; records which sections it was asked for."""
+    asked = []
+
+    async def regenerate(problems, strategy, model, generation_args, use_cache, counts):
+        asked.append((model, sorted(problems)))
+        return dict(replies.get(model, {}))
+
+    monkeypatch.setattr(llm_client, "_regenerate_sections", regenerate)
+    return asked
+
+
+def _cascade(strategy, tiers):
+    counts = {"calls": 0, "hits": 0}
+    return asyncio.run(llm_client._apply_cascade(dict(strategy), tiers, {}, False, counts))
+
+
+def test_valid_output_stays_on_the_first_tier(monkeypatch):
+    asked = _fake_tiers(monkeypatch, {})
+    out = _cascade(VALID, ["nano", "mini"])
+    assert asked == []
+    assert out["_cascade"]["tiers"] == ["nano"] and out["_cascade"]["unresolved"] == {}
+
+
+def test_local_repair_before_any_re_ask(monkeypatch):
+    asked = _fake_tiers(monkeypatch, {})
+    out = _cascade(dict(VALID, market_gaps="No self-serve tier"), ["nano", "mini"])
+    assert asked == []
+    assert out["market_gaps"] == ["No self-serve tier"]
+    assert "market_gaps" in out["_cascade"]["repaired_locally"]
+
+
+def test_only_failed_sections_escalate(monkeypatch):
+    asked = _fake_tiers(monkeypatch, {"mini": {"market_overview": "Fixed overview."}})
+    out = _cascade(dict(VALID, market_overview="  "), ["nano", "mini", "full"])
+    assert asked == [("mini", ["market_overview"])]
+    assert out["market_overview"] == "Fixed overview."
+    assert out["_cascade"]["escalated"] == {"mini": ["market_overview"]}
+    assert out["_cascade"]["unresolved"] == {}
+
+
+def test_leftovers_are_reported_not_raised(monkeypatch):
+    asked = _fake_tiers(monkeypatch, {"mini": {"market_overview": ""}})
+    out = _cascade(dict(VALID, market_overview="  "), ["nano", "mini"])
+    assert asked == [("mini", ["market_overview"])]
+    assert set(out["_cascade"]["unresolved"]) == {"market_overview"}
@@ -0,0 +1,73 @@
+import time
+
+import numpy as np
+import pytest
+
+from src import local_index
+from src.local_index import LocalVectorIndex
+
+
+def _unit(i, dim=8):
+    v = np.zeros(dim, np.float32)
+    v[i] = 1.0
+    return v
+
+
+def test_add_search_update_and_reopen(tmp_path):
+    index = LocalVectorIndex(str(tmp_path), 8)
+    index.add(["a", "b", "c"], np.stack([_unit(0), _unit(1), _unit(0) + _unit(1)]),
+              [{"kind": "x"}, {"kind": "y"}, {"kind": "x"}])
+    hits = index.search(_unit(0), 2)
+    assert [doc_id for doc_id, _ in hits] == ["a", "c"]
+    assert hits[0][1] == pytest.approx(1.0)
+    assert index.search(_unit(0), 5, filter_fn=lambda d: d["kind"] == "y")[0][0] == "b"
+
+    index.update("b", {"kind": "z"})
+    with pytest.raises(KeyError):
+        index.update("missing", {})
+
+    reopened = LocalVectorIndex(str(tmp_path), 8)
+    assert len(reopened) == 3 and reopened.docs["b"] == {"kind": "z"}
+    assert np.allclose(reopened.get_vectors(["b"]), [_unit(1)])
+    with pytest.raises(ValueError):
+        LocalVectorIndex(str(tmp_path), 4)
+
+
+def test_instances_see_each_others_writes(tmp_path):
+    # Two handles on one directory, as two processes would have
+    first = LocalVectorIndex(str(tmp_path), 8)
+    second = LocalVectorIndex(str(tmp_path), 8)
+    first.add(["a"], _unit(0)[None])
+    second.add(["b"], _unit(1)[None])
+    first.update("b", {"seen": True})
+    assert [doc_id for doc_id, _ in first.search(_unit(1), 1)] == ["b"]
+    assert second.search(_unit(0), 1)[0][0] == "a"
+    second.refresh()
+    assert second.docs["b"] == {"seen": True} and second.ids == ["a", "b"]
+
+
+def test_torn_tail_is_ignored_and_cut_by_the_next_write(tmp_path):
+    index = LocalVectorIndex(str(tmp_path), 8)
+    index.add(["a"], _unit(0)[None])
+    with open(tmp_path / "docs.jsonl", "a") as f:
+        f.write('{"id": "half')
+    reopened = LocalVectorIndex(str(tmp_path), 8)
+    assert reopened.ids == ["a"]
+    reopened.add(["b"], _unit(1)[None])
+    assert LocalVectorIndex(str(tmp_path), 8).ids == ["a", "b"]
+
+
+def test_ivf_trains_in_the_background(tmp_path, monkeypatch):
+    monkeypatch.setattr(local_index, "LOCAL_INDEX_EXACT_MAX", 50)
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 8)).astype(np.float32)
+    index = LocalVectorIndex(str(tmp_path), 8)
+    index.add([str(i) for i in range(200)], vectors)
+    deadline = time.time() + 10
+    while index._training and time.time() < deadline:
+        time.sleep(0.01)
+    assert index._trained_at == 200 and (tmp_path / "ivf.npz").exists()
+    # Rows added after training are routed to a cluster and found
+    index.add(["new"], _unit(3)[None] * 10)
+    assert index.search(_unit(3), 1, nprobe=index._centroids.shape[0])[0][0] == "new"
+    assert LocalVectorIndex(str(tmp_path), 8)._assign.shape[0] == 201
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from src.mmr import check_lambda, mmr, mmr_enabled, scale_scores
+
+
+def test_check_lambda_range():
+    assert check_lambda(0) == 0.0
+    assert not mmr_enabled(1.0)
+    assert mmr_enabled(0.5)
+    with pytest.raises(ValueError):
+        check_lambda(1.5)
+
+
+def test_scale_scores():
+    assert np.allclose(scale_scores([1.0, 2.0, 3.0]), [0.0, 0.5, 1.0])
+    assert np.allclose(scale_scores([2.0, 2.0]), [1.0, 1.0])
+
+
+def test_lambda_one_keeps_the_ranking():
+    vectors = np.eye(4, dtype=np.float32)
+    assert mmr([0.1, 0.9, 0.5, 0.3], vectors, 4, 1.0) == [1, 2, 3, 0]
+
+
+def test_near_copy_is_pushed_down():
+    # 0 and 1 are the same direction; 2 is orthogonal and a bit less relevant
+    vectors = np.array([[1, 0], [1, 0.01], [0, 1]], dtype=np.float32)
+    scores = [0.9, 0.89, 0.8]
+    assert mmr(scores, vectors, 2, 1.0) == [0, 1]
+    assert mmr(scores, vectors, 2, 0.5) == [0, 2]
+
+
+def test_k_larger_than_candidates_and_zero_vectors():
+    vectors = np.array([[0, 0], [1, 0]], dtype=np.float32)
+    assert sorted(mmr([0.5, 0.4], vectors, 5, 0.3)) == [0, 1]
+    assert mmr([], np.zeros((0, 2), np.float32), 3, 0.5) == []
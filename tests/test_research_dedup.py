@@ -0,0 +1,39 @@
+from src.research_dedup import canonicalize_url, dedupe_research, minhash
+
+TEXT = (
+    "Onboarding assistants guide new users through setup, surface the features "
+    "they need first and measurably raise activation in the first week of use."
+)
+
+
+def test_canonicalize_url():
+    assert canonicalize_url("http://www.Example.com/a/?utm_source=x&b=2&a=1#top") == "https://example.com/a?a=1&b=2"
+    assert canonicalize_url("https://example.com:8080") == "https://example.com:8080/"
+
+
+def test_minhash_similarity():
+    same = (minhash(TEXT) == minhash(TEXT + " Read more.")).mean()
+    other = (minhash(TEXT) == minhash("A completely unrelated sentence about pricing pages and churn.")).mean()
+    assert same > 0.8 > other
+
+
+def test_dedupe_keeps_best_copy_and_records_facets():
+    raw = {
+        "market": {"answer": "x", "results": [
+            {"url": "https://www.a.com/post?utm_medium=x", "title": "A", "content": "first copy", "score": 0.5},
+            {"url": "https://b.com/1", "title": "B", "content": TEXT, "score": 0.9},
+        ]},
+        "competitors": {"results": [
+            {"url": "http://a.com/post/", "title": "A", "content": "second copy", "score": 0.7},
+            {"url": "https://mirror.com/b", "title": "B", "content": TEXT + " Read more.", "score": 0.4},
+        ]},
+    }
+    deduped, stats = dedupe_research(raw)
+    assert stats["results_before"] == 4 and stats["results_after"] == 2
+    assert stats["removed_exact"] == 1 and stats["removed_near_duplicate"] == 1
+    assert [r["content"] for r in deduped["market"]["results"]] == [TEXT]
+    assert [r["content"] for r in deduped["competitors"]["results"]] == ["second copy"]
+    assert deduped["competitors"]["results"][0]["facets"] == ["competitors", "market"]
+    assert deduped["market"]["answer"] == "x"
+    # Input is not mutated
+    assert "facets" not in raw["market"]["results"][1]
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+from src.response_cache import DiskCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DiskCache(str(tmp_path / "cache.db"), max_bytes=100)
+
+
+def _total(cache):
+    return cache._conn().execute("SELECT bytes FROM totals").fetchone()[0]
+
+
+def test_round_trip_and_stats(cache):
+    assert cache.get("ns", "k") is None
+    cache.set_json("ns", "k", {"a": [1, 2]})
+    assert cache.get_json("ns", "k") == {"a": [1, 2]}
+    stats = cache.stats("ns")["ns"]
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["entries"] == 1
+
+
+def test_ttl(cache, monkeypatch):
+    cache.set("ns", "short", b"x", ttl=10)
+    cache.set("ns", "forever", b"y")
+    later = time.time() + 60
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert cache.get("ns", "short") is None
+    assert cache.get("ns", "forever") == b"y"
+
+
+def test_non_positive_ttl_stores_nothing(cache):
+    cache.set("ns", "k", b"old")
+    cache.set("ns", "k", b"new", ttl=0)
+    cache.set("ns", "other", b"new", ttl=-5)
+    assert cache.get("ns", "k") is None
+    assert cache.get("ns", "other") is None
+    assert _total(cache) == 0
+
+
+def test_lru_eviction_keeps_recently_used(cache):
+    for i in range(4):
+        cache.set("ns", f"k{i}", b"x" * 30)
+        cache.get("ns", "k0")  # keep k0 hot
+    assert cache.get("ns", "k0") is not None
+    assert cache.get("ns", "k1") is None
+    assert _total(cache) <= 100
+
+
+def test_running_total_tracks_every_write(cache, tmp_path):
+    cache.set("ns", "a", b"x" * 10)
+    cache.set("ns", "a", b"x" * 4)  # overwrite
+    cache.set("ns", "b", b"x" * 6)
+    assert _total(cache) == 10
+    cache.clear("ns")
+    assert _total(cache) == 0
+    # A second handle on the same file (another process) sees the same total
+    cache.set("ns", "c", b"x" * 7)
+    assert _total(DiskCache(str(tmp_path / "cache.db"))) == 7
@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from src import search_filters as sf
+
+
+def test_normalize_filters():
+    clean = sf.normalize_filters(
+        {"company_type": " SaaS ", "product_name": ["a", ""], "tags": "B2B, ai ,b2b", "created_after": "2024-01-01"}
+    )
+    assert clean == {
+        "company_type": ["SaaS"],
+        "product_name": ["a"],
+        "tags": ["ai", "b2b"],
+        "created_after": datetime(2024, 1, 1, tzinfo=timezone.utc),
+    }
+    assert sf.normalize_filters({"tags": [], "company_type": None}) == {}
+
+
+def test_normalize_filters_rejects_bad_input():
+    with pytest.raises(ValueError):
+        sf.normalize_filters({"colour": "red"})
+    with pytest.raises(ValueError):
+        sf.normalize_filters({"created_after": "2024-02-01", "created_before": "2024-01-01"})
+
+
+def test_to_mongo_filter():
+    assert sf.to_mongo_filter({}) == {}
+    assert sf.to_mongo_filter({"tags": ["ai"]}) == {"tags": {"$eq": "ai"}}
+    clean = sf.normalize_filters({"company_type": ["a", "b"], "created_before": "2024-01-01"})
+    assert sf.to_mongo_filter(clean, hide_duplicates=True) == {
+        "$and": [
+            {"company_type": {"$in": ["a", "b"]}},
+            {"created_at": {"$lte": datetime(2024, 1, 1, tzinfo=timezone.utc)}},
+            {"duplicate": {"$ne": True}},
+        ]
+    }
+
+
+def test_matcher_agrees_with_the_filter():
+    assert sf.matcher({}) is None
+    match = sf.matcher(sf.normalize_filters({"tags": ["ai"], "created_after": "2024-01-01"}), hide_duplicates=True)
+    assert match({"tags": ["ai", "x"], "created_at": "2024-06-01T00:00:00Z"})
+    assert not match({"tags": ["x"], "created_at": "2024-06-01"})
+    assert not match({"tags": ["ai"], "created_at": "2023-06-01"})
+    assert not match({"tags": ["ai"], "created_at": "not a date"})
+    assert not match({"tags": ["ai"], "created_at": "2024-06-01", "duplicate": True})
+
+
+def test_num_candidates_scales_with_selectivity(monkeypatch):
+    monkeypatch.setattr(sf, "VECTOR_EXACT_MAX", 100)
+    unfiltered = sf.num_candidates(10)
+    assert sf.num_candidates(10, matched=50, total=10_000) is None
+    narrow = sf.num_candidates(10, matched=625, total=10_000)
+    assert narrow == 4 * unfiltered
+    assert sf.num_candidates(10, matched=9_999_999, total=10_000_000) <= sf.VECTOR_MAX_CANDIDATES
+
+
+def test_vector_search_stage():
+    stage = sf.vector_search_stage([0.1], path="vector", limit=5)["$vectorSearch"]
+    assert "filter" not in stage and stage["numCandidates"] >= 5
+    exact = sf.vector_search_stage([0.1], path="vector", limit=5, exact=True, mongo_filter={"a": 1})["$vectorSearch"]
+    assert exact["exact"] is True and "numCandidates" not in exact and exact["filter"] == {"a": 1}
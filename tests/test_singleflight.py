@@ -0,0 +1,114 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.singleflight import SharedCallCancelled, SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    group = SingleFlight("test")
+    runs = []
+
+    async def fetch():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return {"value": 1}
+
+    async def main():
+        return await asyncio.gather(*(group.do_async("k", fetch) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert runs == [1]
+    assert all(r == {"value": 1} for r in results)
+    # Followers get copies
+    assert len({id(r) for r in results}) == 5
+    assert group.stats()["deduplicated"] == 4 and group.stats()["in_flight"] == 0
+
+
+def test_leader_cancellation_does_not_reach_followers():
+    group = SingleFlight("test")
+    runs = []
+
+    async def fetch():
+        runs.append(1)
+        await asyncio.sleep(0.1)
+        return "done"
+
+    async def main():
+        leader = asyncio.create_task(asyncio.wait_for(group.do_async("k", fetch), 0.01))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(group.do_async("k", fetch))
+        with pytest.raises(asyncio.TimeoutError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "done"
+    assert runs == [1]
+
+
+def test_work_is_cancelled_once_nobody_waits():
+    group = SingleFlight("test")
+
+    async def main():
+        state = {"cancelled": False}
+
+        async def fetch():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+
+        calls = [asyncio.create_task(group.do_async("k", fetch)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for call in calls:
+            call.cancel()
+        await asyncio.gather(*calls, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        assert state["cancelled"]
+        assert group.stats()["in_flight"] == 0
+
+        # The key is free again: the next call runs afresh
+        async def quick():
+            return 2
+
+        assert await group.do_async("k", quick) == 2
+
+    asyncio.run(main())
+
+
+def test_cancelled_shared_call_raises_shared_call_cancelled_across_loops():
+    group = SingleFlight("test")
+    started = threading.Event()
+    box = {}
+
+    async def fetch():
+        started.set()
+        await asyncio.sleep(10)
+
+    def other_loop():
+        async def follow():
+            started.wait()
+            try:
+                await group.do_async("k", fetch)
+            except BaseException as e:
+                box["error"] = e
+
+        asyncio.run(follow())
+
+    async def main():
+        leader = asyncio.create_task(group.do_async("k", fetch))
+        thread = threading.Thread(target=other_loop)
+        thread.start()
+        await asyncio.to_thread(started.wait)
+        while group._async_calls["k"].waiters < 2:
+            await asyncio.sleep(0.001)
+        # Cancel the work itself (e.g. its loop shutting down), not a caller
+        group._async_calls["k"].task.cancel()
+        with pytest.raises(SharedCallCancelled):
+            await leader
+        await asyncio.to_thread(thread.join)
+
+    asyncio.run(main())
+    assert isinstance(box["error"], SharedCallCancelled)
@@ -0,0 +1,110 @@
+import json
+import os
+
+import pytest
+from pymongo.errors import ConnectionFailure
+
+from src import write_behind
+from src.write_behind import WriteBehindQueue
+
+
+@pytest.fixture(autouse=True)
+def fast(monkeypatch):
+    monkeypatch.setattr(write_behind, "WRITE_BEHIND_FLUSH_MS", 0)
+    monkeypatch.setattr(write_behind, "WRITE_BEHIND_FSYNC", False)
+
+
+class FakeInsert:
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.inserted = []
+
+    def __call__(self, docs):
+        if self.fail is not None:
+            error = self.fail(docs)
+            if error is not None:
+                raise error
+        self.inserted.extend(docs)
+
+
+def _ops(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["op"] for line in f]
+
+
+def test_enqueue_is_written_and_acked(tmp_path):
+    insert = FakeInsert()
+    queue = WriteBehindQueue(str(tmp_path), insert)
+    doc_id = queue.enqueue({"product_name": "a"})
+    assert queue.flush(5)
+    queue.close()
+    assert insert.inserted == [{"product_name": "a", "_id": doc_id}]
+    assert _ops(queue.stats()["log_path"]) == ["put", "ack"]
+    assert queue.stats()["written"] == 1 and queue.stats()["depth"] == 0
+
+
+def test_unacked_docs_are_replayed_and_the_log_compacted(tmp_path):
+    down = FakeInsert(fail=lambda docs: ConnectionFailure("down"))
+    queue = WriteBehindQueue(str(tmp_path), down)
+    ids = [queue.enqueue({"n": i}) for i in range(3)]
+    queue.close(timeout=0.2)
+    assert down.inserted == []
+    assert queue.pending_doc(ids[0]) == {"n": 0}
+
+    up = FakeInsert()
+    queue = WriteBehindQueue(str(tmp_path), up)
+    # Replay rewrote the log to exactly the pending puts
+    assert _ops(queue.stats()["log_path"])[:3] == ["put"] * 3
+    assert queue.stats()["replayed"] == 3
+    assert queue.flush(5)
+    queue.close()
+    assert [d["_id"] for d in up.inserted] == ids
+
+    queue = WriteBehindQueue(str(tmp_path), FakeInsert())
+    assert queue.stats()["replayed"] == 0
+    assert _ops(queue.stats()["log_path"]) == []
+    queue.close()
+
+
+def test_log_is_truncated_once_drained(tmp_path, monkeypatch):
+    monkeypatch.setattr(write_behind, "WRITE_BEHIND_COMPACT_BYTES", 0)
+    queue = WriteBehindQueue(str(tmp_path), FakeInsert())
+    queue.enqueue({"n": 1})
+    assert queue.flush(5)
+    queue.close()
+    assert os.path.getsize(queue.stats()["log_path"]) == 0
+
+
+def test_failing_document_is_isolated_and_dead_lettered(tmp_path, monkeypatch):
+    monkeypatch.setattr(write_behind, "WRITE_BEHIND_MAX_ATTEMPTS", 1)
+    insert = FakeInsert(fail=lambda docs: ValueError("bad doc") if any(d.get("bad") for d in docs) else None)
+    queue = WriteBehindQueue(str(tmp_path), insert)
+    good = [queue.enqueue({"n": i}) for i in range(3)]
+    bad = queue.enqueue({"bad": True})
+    assert queue.flush(5)
+    queue.close()
+
+    assert sorted(d["_id"] for d in insert.inserted) == sorted(good)
+    stats = queue.stats()
+    assert stats["dead_lettered"] == 1 and stats["last_dead_letter"]["id"] == bad
+    with open(stats["dead_letter_path"], encoding="utf-8") as f:
+        (record,) = [json.loads(line) for line in f]
+    assert record["id"] == bad and record["doc"] == {"bad": True}
+
+    # Dead letters are acked: a restart doesn't retry them
+    queue = WriteBehindQueue(str(tmp_path), FakeInsert())
+    assert queue.stats()["replayed"] == 0
+    queue.close()
+
+
+def test_failed_attempts_survive_a_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(write_behind, "WRITE_BEHIND_MAX_ATTEMPTS", 100)
+    queue = WriteBehindQueue(str(tmp_path), FakeInsert(fail=lambda docs: ValueError("bad")))
+    doc_id = queue.enqueue({"n": 1})
+    queue.close(timeout=0.3)
+    attempts = queue._pending[doc_id]["attempts"]
+    assert attempts >= 1
+
+    queue = WriteBehindQueue(str(tmp_path), FakeInsert(fail=lambda docs: ConnectionFailure("down")))
+    assert queue._pending[doc_id]["attempts"] == attempts
+    queue.close(timeout=0.1)
@@ -2,7 +2,6 @@
 
 import os
 import sys
-import json
 import textwrap
 from datetime import datetime
 
@@ -17,8 +16,19 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 from src.research_tools import build_research_bundle
-from src.llm_client import generate_full_strategy_struct, render_strategy_markdown
-from src.db import save_strategy_to_db, search_similar_strategies
+from src.context_packer import pack_research
+from src.llm_client import (
+    GENERATION_MODE,
+    GENERATION_MODES,
+    STRATEGY_SECTIONS,
+    generate_full_strategy_struct,
+    refine_strategy_struct,
+    render_strategy_markdown,
+    stream_full_strategy_struct,
+)
+from src.strategy_schema import RESEARCH_INPUTS, affected_sections, changed_inputs
+from src.db import search_similar_strategies, search_strategies
+from src.write_behind import lookup_strategy, persist_strategy, start_write_behind
 
 
 # -------------------------------------------------------------------
@@ -31,7 +41,29 @@ def run_full_strategy_pipeline(
     company_type: str,
     constraints: str,
     extra_instructions: str = "",
+    on_progress=None,
+    generation_mode=None,
+    use_cache=True,
+    parent=None,
 ):
+    """
+    With `on_progress`, the strategy is streamed and the callback receives
+    the partial result after research and after every finished section.
+    With `parent` (an earlier result) and unchanged research inputs, the
+    run is a refinement: research is reused and only affected sections
+    are regenerated; the result is saved as a new version of the parent.
+    """
+    inputs = dict(
+        product_name=product_name,
+        target_users=target_users,
+        goal=goal,
+        company_type=company_type,
+        constraints=constraints,
+        extra_instructions=extra_instructions,
+    )
+    if parent is not None and not set(changed_inputs(parent, inputs)) & set(RESEARCH_INPUTS):
+        return refine_strategy_pipeline(parent, on_progress=on_progress, use_cache=use_cache, **inputs)
+
     # 1) Tavily research
     research = build_research_bundle(
         product_name=product_name,
@@ -40,11 +72,17 @@ def run_full_strategy_pipeline(
         company_type=company_type,
         constraints=constraints,
     )
+    if on_progress:
+        research["pending_sections"] = list(STRATEGY_SECTIONS)
+        on_progress(research)
 
-    tavily_raw_json = json.dumps(research["tavily_raw"], indent=2)
+    # Compact, token-budgeted research context for the prompt
+    packed = pack_research(research["tavily_raw"])
+    tavily_raw_json = packed["context"]
+    research["context_tokens"] = packed["stats"]
 
     # 2) LLM → full structured strategy JSON
-    strategy_struct = generate_full_strategy_struct(
+    generation_args = dict(
         product_name=product_name,
         target_users=target_users,
         goal=goal,
@@ -52,8 +90,96 @@ def run_full_strategy_pipeline(
         constraints=constraints or "none specified",
         tavily_raw_json=tavily_raw_json,
         extra_instructions=extra_instructions or "",
+        generation_mode=generation_mode,
+        use_cache=use_cache,
+    )
+    if on_progress is None:
+        strategy_struct = generate_full_strategy_struct(**generation_args)
+    else:
+        strategy_struct = {}
+        for event in stream_full_strategy_struct(**generation_args):
+            if event["type"] == "done":
+                strategy_struct = event["strategy"]
+                research["generation_metrics"] = event["metrics"]
+                continue
+            strategy_struct[event["key"]] = event["value"]
+            pending = [k for k in STRATEGY_SECTIONS if k not in strategy_struct]
+            research["pending_sections"] = pending
+            research["strategy_json"] = strategy_struct
+            research["strategy_markdown"] = render_strategy_markdown(strategy_struct, pending=set(pending))
+            on_progress(research)
+        research.pop("pending_sections", None)
+    research["llm_cache"] = strategy_struct.pop("_cache", None)
+    research["model_cascade"] = strategy_struct.pop("_cascade", None)
+    research["extra_instructions"] = extra_instructions or ""
+    if parent is not None:
+        research["parent_id"] = (parent.get("mongo_save") or {}).get("id")
+        research["version"] = parent.get("version", 1) + 1
+
+    return _finish_strategy_run(research, strategy_struct)
+
+
+def refine_strategy_pipeline(
+    parent: dict,
+    product_name: str,
+    target_users: str,
+    goal: str,
+    company_type: str,
+    constraints: str,
+    extra_instructions: str = "",
+    on_progress=None,
+    use_cache=True,
+):
+    """
+    Refinement of an earlier pipeline result: reuses its Tavily research and
+    strategy JSON, regenerates only the sections the changed inputs affect,
+    and saves a new version linked to the parent.
+    """
+    research = {
+        k: v
+        for k, v in parent.items()
+        if k not in ("strategy_json", "strategy_markdown", "mongo_save", "generation_metrics")
+    }
+    research.update(
+        goal=goal,
+        constraints=constraints,
+        extra_instructions=extra_instructions or "",
+        parent_id=(parent.get("mongo_save") or {}).get("id"),
+        version=parent.get("version", 1) + 1,
+    )
+    previous = parent.get("strategy_json") or {}
+    if on_progress:
+        changed = changed_inputs(parent, research)
+        research["pending_sections"] = affected_sections(changed, extra_instructions)
+        research["strategy_json"] = previous
+        research["strategy_markdown"] = render_strategy_markdown(
+            previous, pending=set(research["pending_sections"])
+        )
+        on_progress(research)
+
+    packed = pack_research(research.get("tavily_raw") or {})
+    research["context_tokens"] = packed["stats"]
+    strategy_struct = refine_strategy_struct(
+        previous=previous,
+        product_name=product_name,
+        target_users=target_users,
+        goal=goal,
+        company_type=company_type,
+        constraints=constraints or "none specified",
+        tavily_raw_json=packed["context"],
+        extra_instructions=extra_instructions or "",
+        previous_extra_instructions=parent.get("extra_instructions", ""),
+        use_cache=use_cache,
     )
+    research.pop("pending_sections", None)
+    research["llm_cache"] = strategy_struct.pop("_cache", None)
+    research["model_cascade"] = strategy_struct.pop("_cascade", None)
+    research["refinement"] = strategy_struct.pop("_refinement", None)
 
+    return _finish_strategy_run(research, strategy_struct)
+
+
+def _finish_strategy_run(research: dict, strategy_struct: dict) -> dict:
     # 3) Render markdown for human-readable view
     strategy_markdown = render_strategy_markdown(strategy_struct)
 
@@ -64,7 +190,7 @@ def run_full_strategy_pipeline(
     # 5) Save to Mongo, but don't crash UI if it fails
     mongo_status = {"status": "skipped"}
     try:
-        mongo_status = save_strategy_to_db(research)
+        mongo_status = persist_strategy(research)
     except Exception as e:
         mongo_status = {"status": "error", "error": str(e)}
 
@@ -76,6 +202,138 @@ def run_full_strategy_pipeline(
     return research
 
 
+# -------------------------------------------------------------------
+# Strategy Studio result tabs (re-rendered as sections stream in)
+# -------------------------------------------------------------------
+def _render_overview_tab(result: dict):
+    st.subheader("Strategy overview")
+    st.markdown(result.get("strategy_markdown", "_Generating…_"))
+
+
+def _render_research_tab(result: dict):
+    st.subheader("Tavily research – pains / competitors / trends")
+
+    tavily_raw = result.get("tavily_raw", {})
+    pains = tavily_raw.get("pains", {})
+    competitors = tavily_raw.get("competitors", {})
+    trends = tavily_raw.get("trends", {})
+
+    facet_timings = result.get("facet_timings", {})
+    if facet_timings:
+        st.caption(
+            "Research time: "
+            + " · ".join(
+                f"{name} {t['seconds']}s ({t['status']})"
+                for name, t in facet_timings.items()
+                if isinstance(t, dict)
+            )
+            + f" · total {facet_timings.get('total_seconds', '?')}s"
+        )
+
+    dedup_stats = result.get("dedup_stats")
+    if dedup_stats:
+        st.caption(
+            f"Deduplication: {dedup_stats['results_before']} → {dedup_stats['results_after']} results "
+            f"({dedup_stats['removed_exact']} repeated URLs, "
+            f"{dedup_stats['removed_near_duplicate']} near-duplicates, "
+            f"{dedup_stats['chars_removed']} chars removed)"
+        )
+
+    context_tokens = result.get("context_tokens")
+    if context_tokens:
+        st.caption(
+            f"Prompt context: {context_tokens['tokens_before']} → "
+            f"{context_tokens['tokens_after']} tokens "
+            f"(budget {context_tokens['budget']}, "
+            f"{context_tokens['results_dropped']} low-score results dropped)"
+        )
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.markdown("##### Pain points")
+        if pains:
+            st.write("**Query:**", pains.get("query"))
+            st.json(pains.get("results", []))
+        else:
+            st.info("No pains data.")
+
+    with col2:
+        st.markdown("##### Competitors")
+        if competitors:
+            st.write("**Query:**", competitors.get("query"))
+            st.json(competitors.get("results", []))
+        else:
+            st.info("No competitor data.")
+
+    with col3:
+        st.markdown("##### Trends")
+        if trends:
+            st.write("**Query:**", trends.get("query"))
+            st.json(trends.get("results", []))
+        else:
+            st.info("No trend data.")
+
+
+def _render_json_tab(result: dict):
+    st.subheader("Full strategy JSON (matches abstract)")
+    st.json(result.get("strategy_json", {}))
+
+
+def _render_prds_tab(result: dict):
+    st.subheader("PRDs for top features")
+
+    if "prds" in result.get("pending_sections", []):
+        st.info("Generating PRDs…")
+        return
+
+    prds = result.get("strategy_json", {}).get("prds", [])
+    if not prds:
+        st.info("No PRDs found in JSON.")
+    else:
+        for i, prd in enumerate(prds, start=1):
+            title = prd.get("title", f"Feature {i}")
+            with st.expander(f"PRD #{i}: {title}"):
+                st.write("**Feature title:**", title)
+                st.write("**Description:**", prd.get("description", "—"))
+                st.write("**Target users:**", prd.get("target_users", "—"))
+                st.write("**Motivation:**", prd.get("motivation", "—"))
+                st.write("**Acceptance criteria:**")
+                ac = prd.get("acceptance_criteria", [])
+                if isinstance(ac, list):
+                    for item in ac:
+                        st.markdown(f"- {item}")
+                else:
+                    st.write(ac or "—")
+                st.write("**Risks / assumptions:**", prd.get("risks", "—"))
+
+
+def _render_roadmap_tab(result: dict):
+    st.subheader("3-month roadmap")
+
+    if "three_month_roadmap" in result.get("pending_sections", []):
+        st.info("Generating roadmap…")
+        return
+
+    roadmap = result.get("strategy_json", {}).get("three_month_roadmap", {})
+    if not roadmap:
+        st.info("No roadmap found in JSON.")
+    else:
+        for key in ["month_1", "month_2", "month_3"]:
+            if key in roadmap:
+                st.markdown(f"#### {key.replace('_', ' ').title()}")
+                st.write(roadmap[key])
+
+
+STRATEGY_TABS = [
+    ("📄 Strategy overview", _render_overview_tab),
+    ("🔎 Research (Tavily)", _render_research_tab),
+    ("🧱 Strategy JSON", _render_json_tab),
+    ("📑 PRDs", _render_prds_tab),
+    ("🗺️ 3-month roadmap", _render_roadmap_tab),
+]
+
+
 # -------------------------------------------------------------------
 # Streamlit config
 # -------------------------------------------------------------------
@@ -87,6 +345,9 @@ st.set_page_config(
 if "page" not in st.session_state:
     st.session_state["page"] = "Home"
 
+# Saves queued before a restart are replayed in the background
+start_write_behind()
+
 # Simple session history (current session only)
 if "runs" not in st.session_state:
     st.session_state["runs"] = []  # list of dicts
@@ -227,15 +488,58 @@ elif page == "Strategy Studio":
             height=60,
         )
 
+        generation_mode = st.radio(
+            "Generation mode",
+            list(GENERATION_MODES),
+            index=list(GENERATION_MODES).index(GENERATION_MODE),
+            horizontal=True,
+            help="Sectioned runs smaller per-section calls in parallel (faster); "
+            "monolithic asks for the whole strategy in one call.",
+        )
+
+        use_cache = st.checkbox(
+            "Reuse cached results for identical inputs",
+            value=True,
+            help="Untick to force a fresh model call.",
+        )
+
         run_button = st.button("🚀 Generate Strategy", type="primary")
+        refine_button = st.button(
+            "♻️ Refine last strategy",
+            disabled=not st.session_state["runs"],
+            help="Reuses the last run's research and regenerates only the sections "
+            "affected by changed goal, constraints or extra instructions.",
+        )
 
     # Place where results will render
     st.markdown("---")
 
-    if run_button:
+    if run_button or refine_button:
         if not product_name.strip() or not target_users.strip() or not goal.strip():
             st.error("Please fill in Product name, Target users, and Goal.")
         else:
+            summary_area = st.empty()
+            results_area = st.container()
+            view = {}
+
+            def show_result(partial: dict):
+                # Tabs appear once research lands, then refill per section
+                if not view:
+                    with results_area:
+                        tabs = st.tabs([label for label, _ in STRATEGY_TABS] + ["🧠 Vector memory"])
+                    view["panes"] = [tab.empty() for tab in tabs[:-1]]
+                    view["memory_tab"] = tabs[-1]
+                for pane, (_, render) in zip(view["panes"], STRATEGY_TABS):
+                    with pane.container():
+                        render(partial)
+
+                pending = partial.get("pending_sections")
+                if pending is not None:
+                    done = len(STRATEGY_SECTIONS) - len(pending)
+                    summary_area.info(
+                        f"Streaming strategy… {done}/{len(STRATEGY_SECTIONS)} sections ready"
+                    )
+
             with st.spinner("Running Tavily research and generating full strategy..."):
                 try:
                     result = run_full_strategy_pipeline(
@@ -245,6 +549,10 @@ elif page == "Strategy Studio":
                         company_type=company_type,
                         constraints=constraints,
                         extra_instructions=extra_instructions,
+                        on_progress=show_result,
+                        generation_mode=generation_mode,
+                        use_cache=use_cache,
+                        parent=st.session_state["runs"][-1] if refine_button else None,
                     )
                 except Exception as e:
                     st.error(f"Something went wrong while generating the strategy: {e}")
@@ -253,117 +561,62 @@ elif page == "Strategy Studio":
             if result:
                 # Save to session history
                 st.session_state["runs"].append(result)
+                show_result(result)
 
                 strategy_json = result.get("strategy_json", {})
-                strategy_markdown = result.get("strategy_markdown", "")
-                tavily_raw = result.get("tavily_raw", {})
                 mongo_status = result.get("mongo_save", {})
+                metrics = result.get("generation_metrics", {})
 
                 # Summary strip
-                st.success("Strategy generated successfully.")
-                meta_col1, meta_col2, meta_col3 = st.columns(3)
-                with meta_col1:
-                    st.metric("Product", strategy_json.get("product_name", "—"))
-                with meta_col2:
-                    st.metric("Target users", "Defined")
-                with meta_col3:
-                    st.metric("Mongo save status", mongo_status.get("status", "unknown"))
-
-                # Tabs: overview, research, JSON, PRDs, roadmap, memory
-                tab_overview, tab_research, tab_json, tab_prds, tab_roadmap, tab_memory = st.tabs(
-                    [
-                        "📄 Strategy overview",
-                        "🔎 Research (Tavily)",
-                        "🧱 Strategy JSON",
-                        "📑 PRDs",
-                        "🗺️ 3-month roadmap",
-                        "🧠 Vector memory",
-                    ]
-                )
-
-                # 1) Overview
-                with tab_overview:
-                    st.subheader("Strategy overview")
-                    st.markdown(strategy_markdown)
-
-                # 2) Research
-                with tab_research:
-                    st.subheader("Tavily research – pains / competitors / trends")
-
-                    pains = tavily_raw.get("pains", {})
-                    competitors = tavily_raw.get("competitors", {})
-                    trends = tavily_raw.get("trends", {})
-
-                    col1, col2, col3 = st.columns(3)
-
-                    with col1:
-                        st.markdown("##### Pain points")
-                        if pains:
-                            st.write("**Query:**", pains.get("query"))
-                            st.json(pains.get("results", []))
-                        else:
-                            st.info("No pains data.")
-
-                    with col2:
-                        st.markdown("##### Competitors")
-                        if competitors:
-                            st.write("**Query:**", competitors.get("query"))
-                            st.json(competitors.get("results", []))
-                        else:
-                            st.info("No competitor data.")
-
-                    with col3:
-                        st.markdown("##### Trends")
-                        if trends:
-                            st.write("**Query:**", trends.get("query"))
-                            st.json(trends.get("results", []))
-                        else:
-                            st.info("No trend data.")
-
-                # 3) Raw JSON
-                with tab_json:
-                    st.subheader("Full strategy JSON (matches abstract)")
-                    st.json(strategy_json)
-
-                # 4) PRDs
-                with tab_prds:
-                    st.subheader("PRDs for top features")
-
-                    prds = strategy_json.get("prds", [])
-                    if not prds:
-                        st.info("No PRDs found in JSON.")
-                    else:
-                        for i, prd in enumerate(prds, start=1):
-                            title = prd.get("title", f"Feature {i}")
-                            with st.expander(f"PRD #{i}: {title}"):
-                                st.write("**Feature title:**", title)
-                                st.write("**Description:**", prd.get("description", "—"))
-                                st.write("**Target users:**", prd.get("target_users", "—"))
-                                st.write("**Motivation:**", prd.get("motivation", "—"))
-                                st.write("**Acceptance criteria:**")
-                                ac = prd.get("acceptance_criteria", [])
-                                if isinstance(ac, list):
-                                    for item in ac:
-                                        st.markdown(f"- {item}")
-                                else:
-                                    st.write(ac or "—")
-                                st.write("**Risks / assumptions:**", prd.get("risks", "—"))
-
-                # 5) Roadmap
-                with tab_roadmap:
-                    st.subheader("3-month roadmap")
-
-                    roadmap = strategy_json.get("three_month_roadmap", {})
-                    if not roadmap:
-                        st.info("No roadmap found in JSON.")
+                with summary_area.container():
+                    llm_cache = result.get("llm_cache") or {}
+                    if llm_cache.get("hit"):
+                        st.success("Strategy served from cache (no model call).")
+                    elif llm_cache.get("hits"):
+                        st.success(
+                            f"Strategy generated successfully "
+                            f"({llm_cache['hits']}/{llm_cache['calls']} sections served from cache)."
+                        )
                     else:
-                        for key in ["month_1", "month_2", "month_3"]:
-                            if key in roadmap:
-                                st.markdown(f"#### {key.replace('_', ' ').title()}")
-                                st.write(roadmap[key])
+                        st.success("Strategy generated successfully.")
+                    refinement = result.get("refinement")
+                    if refinement:
+                        st.caption(
+                            f"Version {result.get('version', 1)} · changed: "
+                            f"{', '.join(refinement['changed_fields']) or 'nothing'} · "
+                            f"regenerated: {', '.join(refinement['regenerated']) or 'nothing'}"
+                        )
+                    cascade = result.get("model_cascade") or {}
+                    if cascade.get("unresolved"):
+                        st.warning(
+                            "Some sections are still incomplete: "
+                            + ", ".join(cascade["unresolved"])
+                        )
+                    elif cascade.get("escalated"):
+                        st.caption(
+                            "Escalated to a stronger model: "
+                            + "; ".join(
+                                f"{model} ({', '.join(keys)})"
+                                for model, keys in cascade["escalated"].items()
+                            )
+                        )
+                    meta_col1, meta_col2, meta_col3, meta_col4 = st.columns(4)
+                    with meta_col1:
+                        st.metric("Product", strategy_json.get("product_name", "—"))
+                    with meta_col2:
+                        st.metric("Target users", "Defined")
+                    with meta_col3:
+                        st.metric("Mongo save status", mongo_status.get("status", "unknown"))
+                    with meta_col4:
+                        ttfs = metrics.get("time_to_first_section")
+                        st.metric(
+                            "Time to first section",
+                            f"{ttfs:.1f}s" if ttfs is not None else "—",
+                            help=f"Full generation took {metrics.get('total_seconds', '?')}s",
+                        )
 
                 # 6) Vector memory
-                with tab_memory:
+                with view["memory_tab"]:
                     st.subheader("Vector memory – semantic search")
                     st.write("MongoDB save status:", mongo_status)
 
@@ -396,7 +649,7 @@ elif page == "Strategy Studio":
                                         f"Result #{idx} – {r.get('product_name', 'Unknown product')} "
                                         f"(score: {round(r.get('score', 0), 3)})"
                                     ):
-                                        st.markdown(r.get("strategy_markdown", "No markdown stored."))
+                                        st.markdown((r.get("preview") or "No markdown stored.") + " ...")
 
 
 # -------------------------------------------------------------------
@@ -415,20 +668,91 @@ elif page == "Memory Search":
         help="Describe the type of strategy you’re looking for.",
     )
     top_k = st.slider("Number of results", 1, 10, 5)
+    mmr_lambda = st.slider(
+        "Relevance vs. diversity (MMR λ)",
+        0.0,
+        1.0,
+        0.5,
+        step=0.05,
+        help="1.0 keeps the plain ranking. Lower values re-rank a larger candidate set "
+        "so near-identical strategies don't fill the results.",
+    )
+    mode = st.radio(
+        "Search mode",
+        ["hybrid", "vector", "lexical"],
+        horizontal=True,
+        help="Hybrid fuses vector similarity with keyword (BM25) matches, "
+        "so exact product or competitor names rank well.",
+    )
+
+    with st.expander("Filters"):
+        f_col1, f_col2 = st.columns(2)
+        with f_col1:
+            filter_company = st.text_input("Company type (exact)", value="")
+            filter_tags = st.text_input("Tags (comma-separated, any of)", value="")
+        with f_col2:
+            filter_product = st.text_input("Product name (exact)", value="")
+            filter_after = st.date_input("Created on or after", value=None)
+        filter_duplicates = st.checkbox(
+            "Include near-duplicates",
+            value=False,
+            help="Regenerated runs nearly identical to a saved strategy are hidden by default.",
+        )
+    search_filters = {
+        "company_type": filter_company,
+        "product_name": filter_product,
+        "tags": filter_tags,
+        "created_after": filter_after.isoformat() if filter_after else None,
+        "include_duplicates": filter_duplicates,
+    }
 
     if st.button("Run memory search"):
         with st.spinner("Searching vector memory..."):
             try:
-                results = search_similar_strategies(query, top_k=top_k)
+                # Kept in the session so "Load full strategy" survives the rerun
+                st.session_state["memory_search"] = search_strategies(
+                    query, top_k=top_k, mode=mode, filters=search_filters, mmr_lambda=mmr_lambda
+                )
             except Exception as e:
+                st.session_state.pop("memory_search", None)
                 st.error(f"Error during vector search: {e}")
-            else:
-                if not results:
-                    st.info("No results found. Try a broader query.")
-                else:
-                    for idx, r in enumerate(results, start=1):
-                        with st.expander(
-                            f"Result #{idx} – {r.get('product_name', 'Unknown product')} "
-                            f"(score: {round(r.get('score', 0), 3)})"
-                        ):
-                            st.markdown(r.get("strategy_markdown", "No markdown stored."))
+
+    search = st.session_state.get("memory_search")
+    if search:
+        results = search["results"]
+        st.caption(
+            "Latency: "
+            + " · ".join(
+                f"{stage} {seconds * 1000:.0f} ms"
+                for stage, seconds in search["timings"].items()
+            )
+        )
+        if search.get("mmr"):
+            st.caption(
+                f"Diversity re-ranking: λ {search['mmr']['lambda']:.2f} over "
+                f"{search['mmr']['candidates']} candidates"
+            )
+        plan = search.get("plan") or {}
+        if plan.get("matched") is not None:
+            st.caption(
+                f"Filter matched {plan['matched']} of {plan['total']} strategies · "
+                + ("exact search" if plan["exact"] else f"{plan['numCandidates']} ANN candidates")
+            )
+        if not results:
+            st.info("No results found. Try a broader query.")
+        else:
+            full_texts = st.session_state.setdefault("memory_full_text", {})
+            for idx, r in enumerate(results, start=1):
+                with st.expander(
+                    f"Result #{idx} – {r.get('product_name', 'Unknown product')} "
+                    f"(score: {round(r.get('score', 0), 3)})"
+                ):
+                    if r["id"] in full_texts:
+                        st.markdown(full_texts[r["id"]])
+                        continue
+                    st.markdown((r.get("preview") or "No markdown stored.") + " ...")
+                    # The full markdown lives in the compressed blob; fetch on demand
+                    if st.button("Load full strategy", key=f"load_full_{r['id']}"):
+                        doc = lookup_strategy(r["id"], fields=("strategy_markdown",)) or {}
+                        full_texts[r["id"]] = doc.get("strategy_markdown") or "No markdown stored."
+                        st.markdown(full_texts[r["id"]])